@@ -0,0 +1,85 @@
+# benchmarks/_common.py
+"""
+Utilidades compartidas por los scripts de benchmarks/: la raíz del repositorio
+en sys.path (para importar utils.* al ejecutar `python benchmarks/<script>.py`),
+los generadores de datos sintéticos y la medición de tiempos.
+"""
+
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+COUNTRIES = np.array(['Mexico', 'United States'])
+
+
+def generate_hourly(n_rows, n_series, freq='h', null_fraction=0.0, seed=0):
+    """
+    Genera n_rows filas (date, keyword, country, interest) repartidas entre
+    n_series series, una cada `freq`, con ceros al inicio y al final de algunas
+    series como los datos de Trends y una fracción `null_fraction` de nulos.
+    Las columnas quedan sin tipar (ver utils.schema.apply_schema).
+    """
+    rng = np.random.default_rng(seed)
+    points = math.ceil(n_rows / n_series)
+    dates = pd.date_range(end='2024-06-30 23:00', periods=points, freq=freq)
+    series = np.repeat(np.arange(n_series), points)[:n_rows]
+    position = np.tile(np.arange(points), n_series)[:n_rows]
+
+    level = rng.uniform(0, 60, n_series)[series]
+    interest = np.clip(np.round(level + rng.normal(0, 10, n_rows)), 0, 100)
+    start = rng.integers(0, max(1, points // 5), n_series)[series]
+    end = points - rng.integers(0, max(1, points // 10), n_series)[series]
+    interest[(position < start) | (position >= end)] = 0
+    if null_fraction:
+        interest[rng.random(n_rows) < null_fraction] = np.nan
+
+    keywords = np.array([f"kw{i:06d}" for i in range(n_series)])
+    return pd.DataFrame({
+        'date': dates.values[position],
+        'keyword': keywords[series],
+        'country': COUNTRIES[np.arange(n_series) % 2][series],
+        'interest': interest,
+    })
+
+
+def generate_daily(n_rows, days=60, drop_fraction=0.0, categorical=False, seed=0):
+    """
+    Genera unos n_rows keyword-días con el formato de salida de
+    calculate_daily_stats; `drop_fraction` elimina días al azar de cada serie.
+    """
+    rng = np.random.default_rng(seed)
+    n_series = max(1, n_rows // days)
+    keywords = np.repeat([f"kw{i:07d}" for i in range(n_series)], days)
+    countries = np.repeat(COUNTRIES[np.arange(n_series) % 2], days)
+    df = pd.DataFrame({
+        'day': np.tile(pd.date_range('2024-01-01', periods=days, freq='D').values, n_series),
+        'keyword': pd.Categorical(keywords) if categorical else keywords,
+        'country': pd.Categorical(countries) if categorical else countries,
+    })
+    if drop_fraction:
+        df = df[rng.random(len(df)) >= drop_fraction].reset_index(drop=True)
+    n = len(df)
+    df['max_interest'] = rng.uniform(0, 100, n)
+    df['min_interest'] = df['max_interest'] * rng.uniform(0, 1, n)
+    df['mean_interest'] = (df['max_interest'] + df['min_interest']) / 2
+    df['median_interest'] = df['mean_interest'] * rng.uniform(0.5, 1.5, n)
+    return df
+
+
+def timed(fn, *args, repeat=1, **kwargs):
+    """Mejor tiempo (s) de `repeat` ejecuciones de fn(*args, **kwargs) y el último resultado."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
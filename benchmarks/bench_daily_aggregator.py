@@ -0,0 +1,90 @@
+# benchmarks/bench_daily_aggregator.py
+"""
+Compara la agregación diaria de los snapshots de Drive concatenándolos antes de
+calculate_daily_stats (flujo anterior) frente a DailyStatsAggregator, que los
+agrega uno a uno. Muestra tiempo y pico de memoria (tracemalloc) de cada flujo y
+comprueba que el resultado es el mismo.
+
+Cada snapshot contiene las últimas `--window` días de datos horarios (cada 6 h) de
+todas las series, desplazado medio día respecto al anterior, como los snapshots
+reales que se solapan entre sí.
+
+Uso: python benchmarks/bench_daily_aggregator.py [--snapshots 60] [--series 200 1000] [--window 7]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import _common  # noqa: F401  (raíz del repositorio en sys.path)
+from utils.backends import frames_equivalent
+from utils.daily_aggregator import DailyStatsAggregator
+from utils.preprocess_keys import calculate_daily_stats
+from utils.schema import apply_schema, concat_with_schema
+
+
+def generate_snapshots(n_snapshots, n_series, window, seed=0):
+    """Genera los snapshots tipados (SNAPSHOT_SCHEMA) uno a uno."""
+    rng = np.random.default_rng(seed)
+    keywords = np.array([f"kw{i:05d}" for i in range(n_series)])
+    countries = np.where(np.arange(n_series) % 2 == 0, 'Mexico', 'United States')
+    origin = pd.Timestamp('2024-03-01') - pd.Timedelta(days=window)
+    total_points = window * 4 + 2 * n_snapshots + 1
+    levels = rng.integers(0, 101, (n_series, total_points)).astype('float64')
+    for i in range(n_snapshots):
+        end = pd.Timestamp('2024-03-01') + pd.Timedelta(hours=12 * i)
+        dates = pd.date_range(end=end, periods=window * 4, freq='6h')
+        yield apply_schema(pd.DataFrame({
+            'date': np.tile(dates.values, n_series),
+            'keyword': np.repeat(keywords, len(dates)),
+            'country': np.repeat(countries, len(dates)),
+            # El mismo punto (serie, fecha) tiene el mismo valor en todos los snapshots
+            'interest': levels[:, (dates - origin) // pd.Timedelta(hours=6)].ravel(),
+        }))
+
+
+def concat_then_aggregate(snapshots):
+    return calculate_daily_stats(concat_with_schema(list(snapshots)))
+
+
+def streaming_aggregate(snapshots):
+    aggregator = DailyStatsAggregator()
+    for snapshot in snapshots:
+        aggregator.update(snapshot)
+    return aggregator.result()
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--snapshots', type=int, default=60)
+    parser.add_argument('--series', type=int, nargs='+', default=[200, 1000])
+    parser.add_argument('--window', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'series':>8} {'filas':>10} {'grupos':>8} {'concat (s)':>11} {'pico MB':>9} "
+          f"{'streaming (s)':>14} {'pico MB':>9}  igual")
+    for n_series in args.series:
+        rows = args.snapshots * n_series * args.window * 4
+        t_concat, m_concat, expected = measure(
+            concat_then_aggregate, generate_snapshots(args.snapshots, n_series, args.window))
+        t_stream, m_stream, result = measure(
+            streaming_aggregate, generate_snapshots(args.snapshots, n_series, args.window))
+        print(f"{n_series:>8} {rows:>10} {len(result):>8} {t_concat:>11.2f} {m_concat:>9.1f} "
+              f"{t_stream:>14.2f} {m_stream:>9.1f}  {frames_equivalent(expected, result)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/bench_pipeline_offline.py
+"""
+Ejecuta el pipeline completo de google_trends_data.py (__main__) sin red, con los
+sustitutos locales de utils.offline (GOOGLE_OFFLINE=1), y muestra el tiempo total
+y las llamadas atendidas por cada servicio simulado.
+
+Sin --cache-dir los artefactos de las etapas se guardan en un directorio temporal,
+así que todas las etapas se ejecutan; con --cache-dir se conservan y una segunda
+ejecución sólo repite las etapas cuyas entradas cambiaron.
+
+Uso: python benchmarks/bench_pipeline_offline.py [--keywords 100] [--snapshots 60]
+         [--latency 0.05] [--trends-latency 0.2] [--error-rate 0] [--cache-dir DIR]
+         [--stages ingest preprocess fetch publish] [--verbose]
+"""
+
+import argparse
+import base64
+import logging
+import os
+import runpy
+import sys
+import tempfile
+import time
+
+from _common import ROOT
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--keywords', type=int, default=100)
+    parser.add_argument('--snapshots', type=int, default=60)
+    parser.add_argument('--snapshot-days', type=int, default=7)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--trends-latency', type=float, default=0.2)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cache-dir', default=None,
+                        help="Directorio base para las cachés locales (por defecto no se usan)")
+    parser.add_argument('--stages', nargs='*', default=[], help="Etapas del pipeline (por defecto todas)")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    os.environ.update({
+        'GOOGLE_OFFLINE': '1',
+        'OFFLINE_KEYWORDS': str(args.keywords),
+        'OFFLINE_SNAPSHOTS': str(args.snapshots),
+        'OFFLINE_SNAPSHOT_DAYS': str(args.snapshot_days),
+        'OFFLINE_LATENCY': str(args.latency),
+        'OFFLINE_TRENDS_LATENCY': str(args.trends_latency),
+        'OFFLINE_429_RATE': str(args.error_rate),
+        'OFFLINE_SEED': str(args.seed),
+        # Secrets ficticios: en modo offline no se leen
+        'SECRET_FOLDER_ID': 'offline-keywords',
+        'SECRET_FOLDER_ID_DF': 'offline-series',
+        'SECRET_CREDS_FILE': 'offline-credentials.json',
+        'SPREADSHEET_ID_KW': 'offline-kw',
+        'SPREADSHEET_ID_BBDD': 'offline-bbdd',
+        'SPREADSHEET_ID_TRENDS': 'offline-trends',
+        'SPREADSHEET_ID_KEYWORDS': 'offline-keywords-interest',
+        'GOOGLE_SHEETS_CREDS_BASE64': base64.b64encode(b'{}').decode('ascii'),
+    })
+    if args.cache_dir:
+        os.environ.update({
+            'TRENDS_CACHE_DIR': os.path.join(args.cache_dir, 'trends_cache'),
+            'TRENDS_STORE_PATH': os.path.join(args.cache_dir, 'trends_store', 'series.pkl'),
+            'SNAPSHOT_CACHE_DIR': os.path.join(args.cache_dir, 'snapshot_cache'),
+            'SHEETS_FINGERPRINT_DIR': os.path.join(args.cache_dir, 'sheets_fingerprints'),
+            'PIPELINE_ARTIFACTS_DIR': os.path.join(args.cache_dir, 'pipeline_artifacts'),
+        })
+    else:
+        artifacts_dir = tempfile.TemporaryDirectory()
+        os.environ['PIPELINE_ARTIFACTS_DIR'] = artifacts_dir.name
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    from utils.offline import call_stats
+
+    start = time.perf_counter()
+    exit_code = 0
+    script = os.path.join(ROOT, 'google_trends_data.py')
+    sys.argv = [script] + args.stages
+    try:
+        runpy.run_path(script, run_name='__main__')
+    except SystemExit as e:
+        exit_code = e.code or 0
+    elapsed = time.perf_counter() - start
+    logging.disable(logging.NOTSET)
+
+    print(f"Pipeline offline: {elapsed:.2f} s (código de salida {exit_code})")
+    for kind, count in sorted(call_stats.items()):
+        print(f"  {kind:<22} {count:>6}")
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+# benchmarks/bench_preprocess_keys.py
+"""
+Mide cómo escalan las funciones de utils.preprocess_keys (calculate_daily_stats,
+obtener_top_por_modo, get_best_vids_metric y preprocesar_keys) con el número de
+filas horarias y de series, y guarda tiempo y pico de memoria en JSON para poder
+comparar versiones.
+
+Para cada combinación de --rows y --series se generan datos horarios sintéticos
+(date, keyword, country, interest) ya tipados como en la ingesta (SNAPSHOT_SCHEMA).
+Se omiten las combinaciones con menos de --min-hours horas por serie.
+
+Por defecto se recorre la rejilla completa, de 1k a 10M filas y de 10 a 10k
+series (varias horas y bastante memoria en las combinaciones de 10M filas; con
+--no-memory se evita el coste de tracemalloc). Para una pasada rápida:
+    python benchmarks/bench_preprocess_keys.py --rows 1000 10000 100000 --series 10 100 1000
+
+Uso:
+    python benchmarks/bench_preprocess_keys.py [--rows 1000 10000 100000 1000000 10000000]
+        [--series 10 100 1000 10000] [--functions ...] [--backend pandas|polars]
+        [--output bench_preprocess_keys.json] [--compare resultados_anteriores.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from _common import generate_hourly
+from utils.preprocess_keys import (
+    calculate_daily_stats,
+    get_best_vids_metric,
+    obtener_top_por_modo,
+    preprocesar_keys
+)
+from utils.schema import apply_schema
+
+FUNCTIONS = ['calculate_daily_stats', 'obtener_top_por_modo', 'get_best_vids_metric', 'preprocesar_keys']
+
+
+def _measure(fn, make_args, repeat, memory):
+    """Mejor tiempo de `repeat` ejecuciones y pico de memoria (MB) de una ejecución con tracemalloc."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        args = make_args()
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    peak_mb = None
+    if memory:
+        args = make_args()
+        tracemalloc.start()
+        fn(*args)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return best, peak_mb, result
+
+
+def _output_rows(result):
+    if isinstance(result, tuple):
+        return sum(len(r) for r in result)
+    if isinstance(result, dict):
+        return sum(len(r) for r in result.values())
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    return None
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_case(n_rows, n_series, functions, backend, repeat, memory, seed):
+    raw = apply_schema(generate_hourly(n_rows, n_series, seed=seed))
+    daily = calculate_daily_stats(raw.copy(), backend=backend)
+    cases = {
+        'calculate_daily_stats': (lambda df: calculate_daily_stats(df, backend=backend), lambda: (raw.copy(),)),
+        'obtener_top_por_modo': (lambda df: obtener_top_por_modo(df, top_n=15, backend=backend), lambda: (daily.copy(),)),
+        'get_best_vids_metric': (get_best_vids_metric, lambda: (daily,)),
+        'preprocesar_keys': (lambda df: preprocesar_keys(df, backend=backend), lambda: (raw.copy(),)),
+    }
+    results = []
+    for name in functions:
+        fn, make_args = cases[name]
+        seconds, peak_mb, result = _measure(fn, make_args, repeat, memory)
+        results.append({
+            'function': name,
+            'rows': n_rows,
+            'series': n_series,
+            'seconds': round(seconds, 6),
+            'peak_mb': None if peak_mb is None else round(peak_mb, 3),
+            'output_rows': _output_rows(result),
+        })
+        print(f"{name:<24} {n_rows:>10} {n_series:>7} {seconds:>10.3f} "
+              f"{'-' if peak_mb is None else f'{peak_mb:.1f}':>9}", flush=True)
+    return results
+
+
+def compare(results, previous_path):
+    """Muestra la razón de tiempos frente a un JSON anterior (>1 = más lento ahora)."""
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = {(r['function'], r['rows'], r['series']): r for r in json.load(f)['results']}
+    print(f"\nComparación con {previous_path}:")
+    for r in results:
+        old = previous.get((r['function'], r['rows'], r['series']))
+        if old and old['seconds'] > 0:
+            print(f"{r['function']:<24} {r['rows']:>10} {r['series']:>7}  x{r['seconds'] / old['seconds']:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000, 1000000, 10000000])
+    parser.add_argument('--series', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--functions', nargs='+', choices=FUNCTIONS, default=FUNCTIONS)
+    parser.add_argument('--backend', choices=['pandas', 'polars'], default='pandas')
+    parser.add_argument('--min-hours', type=int, default=24)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--no-memory', action='store_true', help="No medir el pico de memoria (más rápido)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_preprocess_keys.json')
+    parser.add_argument('--compare', default=None, help="JSON de una ejecución anterior")
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    print(f"{'función':<24} {'filas':>10} {'series':>7} {'tiempo (s)':>10} {'pico MB':>9}")
+    results = []
+    for n_rows in args.rows:
+        for n_series in args.series:
+            if n_rows / n_series < args.min_hours:
+                continue
+            results += run_case(n_rows, n_series, args.functions, args.backend, args.repeat,
+                                not args.no_memory, args.seed)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'backend': args.backend,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResultados guardados en {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
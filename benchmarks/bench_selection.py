@@ -0,0 +1,72 @@
+# benchmarks/bench_selection.py
+"""
+Mide la selección de series de preprocesar_keys y filter_recent_high_median_interest
+(pertenencia por MultiIndex.isin / reindex) frente a las versiones originales con
+DataFrame.apply por fila, y muestra el tiempo por fila para comprobar que escalan
+linealmente.
+
+Uso: python benchmarks/bench_selection.py [--sizes 10000 100000 1000000 4000000] [--skip-original-above 100000]
+"""
+
+import argparse
+
+import pandas as pd
+
+from _common import generate_daily, timed
+from utils.preprocess_keys import filter_recent_high_median_interest
+
+
+def seleccion_isin(df, index):
+    return df[pd.MultiIndex.from_frame(df[['keyword', 'country']]).isin(index)]
+
+
+def seleccion_apply(df, index):
+    """Versión original de preprocesar_keys."""
+    return df[df.apply(lambda row: (row['keyword'], row['country']) in index, axis=1)]
+
+
+def filter_recent_apply(dataframe, days_threshold=30, percentile_threshold=25, date_column='day',
+                        median_column='median_interest', group_by_columns=['keyword', 'country']):
+    """Versión original de filter_recent_high_median_interest."""
+    max_date = dataframe[date_column].max()
+    recent_df = dataframe[dataframe[date_column] >= max_date - pd.Timedelta(days=days_threshold)]
+    thresholds = recent_df.groupby(group_by_columns, observed=True)[median_column].quantile(
+        percentile_threshold / 100).to_dict()
+
+    def is_above_threshold(row):
+        return row[median_column] > thresholds.get(tuple(row[group_by_columns]), float('-inf'))
+
+    return dataframe[dataframe.apply(is_above_threshold, axis=1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000, 4000000])
+    parser.add_argument('--skip-original-above', type=int, default=100000,
+                        help='No ejecutar las versiones con apply por encima de este número de filas.')
+    args = parser.parse_args()
+
+    print(f"{'filas':>10} {'función':>22} {'original':>10} {'nueva':>9} {'ns/fila':>9} {'speedup':>9} {'iguales':>8}")
+    for n in args.sizes:
+        df = generate_daily(n, categorical=True)
+        ranking = pd.pivot_table(df, index=['keyword', 'country'], values=['mean_interest'],
+                                 observed=True).sort_values('mean_interest', ascending=False)
+        index = ranking.head(75).index
+
+        cases = [
+            ('selección best/worst', seleccion_isin, seleccion_apply, (df, index)),
+            ('filter_recent', filter_recent_high_median_interest, filter_recent_apply, (df,)),
+        ]
+        for name, new_fn, old_fn, fn_args in cases:
+            t_new, new = timed(new_fn, *[a.copy() if isinstance(a, pd.DataFrame) else a for a in fn_args])
+            per_row = t_new / n * 1e9
+            if n > args.skip_original_above:
+                print(f"{n:>10} {name:>22} {'-':>10} {t_new:>8.3f}s {per_row:>9.1f} {'-':>9} {'-':>8}")
+                continue
+            t_old, old = timed(old_fn, *[a.copy() if isinstance(a, pd.DataFrame) else a for a in fn_args])
+            same = new.index.equals(old.index)
+            print(f"{n:>10} {name:>22} {t_old:>9.3f}s {t_new:>8.3f}s {per_row:>9.1f} {t_old / t_new:>8.1f}x {str(same):>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_startup.py
+"""
+Mide el arranque de google_trends_data.py en procesos nuevos:
+
+- import: tiempo de `import google_trends_data` (sin ejecutar __main__).
+- sin_secrets: ejecución completa sin variables de entorno, que debe terminar
+  con código 1 antes de cargar pandas y las bibliotecas de Google.
+
+Muestra la mediana de --repeat ejecuciones y, con --importtime, los módulos que
+más tardan en importarse (python -X importtime).
+
+Uso:
+    python benchmarks/bench_startup.py [--repeat 5] [--importtime 15]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _clean_env():
+    """Entorno sin los secrets del pipeline (y sin modo offline)."""
+    env = {k: v for k, v in os.environ.items()
+           if not k.startswith(('SECRET_', 'SPREADSHEET_ID_', 'GOOGLE_', 'OFFLINE_'))}
+    env['PYTHONPATH'] = ROOT
+    return env
+
+
+def _run(args, cwd):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable] + args, cwd=cwd, env=_clean_env(), capture_output=True, text=True)
+    return time.perf_counter() - start, proc
+
+
+def _importtime(top, cwd):
+    """Módulos con mayor tiempo acumulado de importación (en segundos)."""
+    _, proc = _run(['-X', 'importtime', '-c', 'import google_trends_data'], cwd)
+    rows = []
+    for line in proc.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        rows.append((int(parts[1]) / 1e6, parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--importtime', type=int, default=0, metavar='N',
+                        help="Mostrar los N módulos que más tardan en importarse")
+    args = parser.parse_args()
+
+    # Directorio temporal: el módulo crea su archivo de log en el directorio actual
+    with tempfile.TemporaryDirectory() as cwd:
+        cases = {
+            'import': ['-c', 'import google_trends_data'],
+            'sin_secrets': [os.path.join(ROOT, 'google_trends_data.py')],
+        }
+        for name, case_args in cases.items():
+            times = []
+            for _ in range(args.repeat):
+                seconds, proc = _run(case_args, cwd)
+                times.append(seconds)
+            print(f"{name:<12} mediana {statistics.median(times):6.3f} s  "
+                  f"mín {min(times):6.3f} s  (código de salida {proc.returncode})")
+            if name == 'sin_secrets' and proc.returncode != 1:
+                print(proc.stderr[-2000:])
+
+        if args.importtime:
+            print("\nMódulos más lentos de importar:")
+            for seconds, module in _importtime(args.importtime, cwd):
+                print(f"  {seconds:6.3f} s  {module}")
+
+
+if __name__ == '__main__':
+    main()
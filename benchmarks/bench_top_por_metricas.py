@@ -0,0 +1,87 @@
+# benchmarks/bench_top_por_metricas.py
+"""
+Compara obtener_top_por_metricas (motor vectorizado de una pasada) con la
+implementación original basada en groupby(...).apply por métrica, sobre datos
+sintéticos de 10k, 100k y 1M keyword-días, y verifica que los resultados coinciden.
+
+Uso: python benchmarks/bench_top_por_metricas.py [--sizes 10000 100000 1000000] [--skip-original-above 200000]
+"""
+
+import argparse
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from _common import generate_daily, timed
+from utils.preprocess_keys import obtener_top_por_metricas
+
+METRICS = ['mean_interest', 'min_interest', 'max_interest']
+
+
+def obtener_top_por_metricas_original(df_in, metrics=METRICS, top_n=10, w_daily=1.0, w_weekly=1.0,
+                                      w_monthly=1.0, decay_base=0.5):
+    """Copia de la implementación original (una copia y dos apply por métrica)."""
+    dict_of_top = {}
+    for metric in metrics:
+        df = df_in.copy()
+        df['day'] = pd.to_datetime(df['day'], errors='coerce')
+        df.dropna(subset=['day'], inplace=True)
+        df[metric] = pd.to_numeric(df[metric], errors='coerce').fillna(0)
+        df_max_day = (
+            df.groupby(['country', 'keyword'], as_index=False)['day'].max().rename(columns={'day': 'max_day'})
+        )
+        df = df.merge(df_max_day, on=['country', 'keyword'], how='left')
+        df['days_diff'] = (df['max_day'] - df['day']).dt.days
+        df['decay_factor'] = decay_base ** df['days_diff']
+        df['score_daily'] = w_daily * np.log1p(df[metric].clip(lower=0)) * df['decay_factor']
+        df_daily = df.groupby(['country', 'keyword'], as_index=False)['score_daily'].sum()
+
+        def score_ventana(group, days, weight, name):
+            start = group['max_day'].max() - pd.Timedelta(days=days)
+            last = group[group['day'] >= start]
+            previous = group[group['day'] < start]
+            last_mean = last[metric].mean() if not last.empty else 0
+            previous_mean = previous[metric].mean() if not previous.empty else 0
+            return pd.Series({name: weight * (last_mean - previous_mean)})
+
+        df_weekly = df.groupby(['country', 'keyword']).apply(
+            lambda g: score_ventana(g, 6, w_weekly, 'score_weekly')).reset_index()
+        df_monthly = df.groupby(['country', 'keyword']).apply(
+            lambda g: score_ventana(g, 29, w_monthly, 'score_monthly')).reset_index()
+
+        df_combined = df_daily.merge(df_weekly, on=['country', 'keyword'], how='left')
+        df_combined = df_combined.merge(df_monthly, on=['country', 'keyword'], how='left')
+        df_combined[['score_weekly', 'score_monthly']] = df_combined[['score_weekly', 'score_monthly']].fillna(0)
+        df_combined['score_total'] = df_combined['score_daily'] + df_combined['score_weekly'] + df_combined['score_monthly']
+        df_top = df_combined.groupby('country', group_keys=False).apply(lambda g: g.nlargest(top_n, 'score_total'))
+        df_top = df_top.sort_values(by=['country', 'score_total'], ascending=[True, False]).reset_index(drop=True)
+        dict_of_top[metric] = df_top[['country', 'keyword', 'score_daily', 'score_weekly', 'score_monthly', 'score_total']]
+    return dict_of_top
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--skip-original-above', type=int, default=None,
+                        help='No ejecutar la implementación original por encima de este número de filas.')
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    print(f"{'keyword-días':>13} {'original':>11} {'vectorizado':>12} {'speedup':>9} {'iguales':>8}")
+    for n in args.sizes:
+        df = generate_daily(n, drop_fraction=0.1)
+        t_new, new = timed(obtener_top_por_metricas, df, METRICS, 10)
+        if args.skip_original_above is not None and n > args.skip_original_above:
+            print(f"{n:>13} {'-':>11} {t_new:>11.3f}s {'-':>9} {'-':>8}")
+            continue
+        t_old, old = timed(obtener_top_por_metricas_original, df, METRICS, 10)
+        same = all(
+            np.allclose(old[m]['score_total'], new[m]['score_total']) and old[m]['keyword'].tolist() == new[m]['keyword'].tolist()
+            for m in METRICS
+        )
+        print(f"{n:>13} {t_old:>10.3f}s {t_new:>11.3f}s {t_old / t_new:>8.1f}x {str(same):>8}")
+
+
+if __name__ == '__main__':
+    main()
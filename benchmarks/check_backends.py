@@ -0,0 +1,80 @@
+# benchmarks/check_backends.py
+"""
+Verifica que los backends 'pandas' y 'polars' de utils.preprocess_keys producen los
+mismos resultados (calculate_daily_stats, obtener_top_por_modo,
+obtener_top_por_metricas y preprocesar_keys) sobre datos sintéticos, y muestra el
+tiempo de cada uno. Termina con código 1 si algún resultado difiere.
+
+Uso: python benchmarks/check_backends.py [--series 50 500] [--days 70] [--seeds 0 1 2]
+"""
+
+import argparse
+import sys
+import warnings
+
+from _common import generate_hourly, timed
+from utils.backends import frames_equivalent, load_polars
+from utils.preprocess_keys import (
+    calculate_daily_stats,
+    obtener_top_por_metricas,
+    obtener_top_por_modo,
+    preprocesar_keys
+)
+from utils.schema import apply_schema
+
+
+def compare(name, pandas_result, polars_result):
+    if isinstance(pandas_result, dict):
+        pairs = [(f"{name}[{k}]", pandas_result[k], polars_result[k]) for k in pandas_result]
+    elif isinstance(pandas_result, tuple):
+        pairs = [(f"{name}[{i}]", a, b) for i, (a, b) in enumerate(zip(pandas_result, polars_result))]
+    else:
+        pairs = [(name, pandas_result, polars_result)]
+    ok = True
+    for label, a, b in pairs:
+        if not frames_equivalent(a, b):
+            print(f"  DIFERENCIA en {label}")
+            ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--series', type=int, nargs='+', default=[50, 500])
+    parser.add_argument('--days', type=int, default=70)
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0, 1, 2])
+    args = parser.parse_args()
+
+    if load_polars() is None:
+        print("Polars no está instalado; no hay nada que comparar.")
+        return 0
+
+    warnings.simplefilter('ignore')
+    all_ok = True
+    for n_series in args.series:
+        for seed in args.seeds:
+            for typed in (False, True):
+                raw = generate_hourly(n_series * args.days * 4, n_series, freq='6h', null_fraction=0.01, seed=seed)
+                if typed:
+                    raw = apply_schema(raw)
+                print(f"series={n_series} seed={seed} tipado={typed} filas={len(raw)}")
+                daily = calculate_daily_stats(raw.copy(), backend='pandas')
+                cases = [
+                    ('calculate_daily_stats', calculate_daily_stats, (raw,), {}),
+                    ('obtener_top_por_modo', obtener_top_por_modo, (daily,), {'top_n': 15}),
+                    ('obtener_top_por_metricas', obtener_top_por_metricas, (daily,), {'top_n': 15}),
+                    ('preprocesar_keys', preprocesar_keys, (raw,), {}),
+                ]
+                for name, fn, fn_args, kwargs in cases:
+                    t_pd, res_pd = timed(fn, *[a.copy() for a in fn_args], backend='pandas', **kwargs)
+                    t_pl, res_pl = timed(fn, *[a.copy() for a in fn_args], backend='polars', **kwargs)
+                    ok = compare(name, res_pd, res_pl)
+                    all_ok &= ok
+                    print(f"  {name:<26} pandas {t_pd:7.3f}s  polars {t_pl:7.3f}s  {'OK' if ok else 'FALLO'}")
+
+    print("Todos los resultados coinciden." if all_ok else "Hay diferencias entre backends.")
+    return 0 if all_ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,25 +1,103 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
 import time
-from pytrends.request import TrendReq
+import argparse
 import logging
-import gspread
 import os
+import sys
 import json
-from google.oauth2.service_account import Credentials
 import base64
 import traceback
+import atexit
+from datetime import datetime, timedelta
+
+_inicio_importacion = time.perf_counter()
+
+# Etapas del pipeline, en orden; cada una lee los artefactos de la anterior
+STAGES = ('ingest', 'preprocess', 'fetch', 'publish')
+
+# Secrets sin los que cada etapa no puede ejecutarse. Se comprueban antes de cargar
+# pandas y las bibliotecas de Google, para que un job mal configurado falle al instante.
+REQUIRED_ENV = {
+    'ingest': ("SECRET_FOLDER_ID", "SECRET_FOLDER_ID_DF", "SECRET_CREDS_FILE"),
+    'preprocess': (),
+    'fetch': (),
+    'publish': ("SECRET_CREDS_FILE", "GOOGLE_SHEETS_CREDS_BASE64", "SPREADSHEET_ID_TRENDS",
+                "SPREADSHEET_ID_KEYWORDS"),
+}
+
+
+def missing_env(stages=STAGES):
+    """Retorna las variables de entorno obligatorias de `stages` que no están definidas o están vacías."""
+    names = dict.fromkeys(name for stage in stages for name in REQUIRED_ENV[stage])
+    return [name for name in names if not os.environ.get(name)]
 
-from utils.google_utils import (
-    get_sheets_data_from_folder,
-    upload_dataframe_to_google_sheet
-)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Pipeline de Google Trends por etapas: ingest, preprocess, fetch y publish. "
+                    "Cada etapa guarda sus tablas en Parquet y se omite si sus entradas no cambiaron."
+    )
+    parser.add_argument('stages', nargs='*', metavar='stage',
+                        help=f"Etapas a ejecutar {STAGES} (por defecto todas); las anteriores se leen del "
+                             f"último artefacto")
+    parser.add_argument('--artifacts-dir', default=os.environ.get('PIPELINE_ARTIFACTS_DIR', '.pipeline_artifacts'),
+                        help="Directorio de artefactos (PIPELINE_ARTIFACTS_DIR)")
+    parser.add_argument('--force', action='store_true', help="Ejecutar las etapas aunque sus entradas no cambiaran")
+    args = parser.parse_args(argv)
+    unknown = [stage for stage in args.stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"Etapas no válidas: {unknown}. Opciones: {STAGES}")
+    args.stages = [stage for stage in STAGES if stage in args.stages] or list(STAGES)
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if missing_env(args.stages):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        logging.error(f"Faltan variables de entorno obligatorias: {', '.join(missing_env(args.stages))}")
+        sys.exit(1)
+
+# pandas sí se carga siempre; matplotlib, pytrends y las bibliotecas de Google se
+# importan en la etapa que las usa (ver __main__)
+import pandas as pd
 
 from utils.preprocess_keys import (
     preprocesar_keys
 )
 
+from utils.metrics import metrics
+from utils.pipeline import (
+    ArtifactStore,
+    frame_hash,
+    run_stage
+)
+from utils.keyword_filter import KeywordFilter
+from utils.daily_aggregator import DailyStatsAggregator
+from utils.rate_limit import (
+    AdaptiveRateLimiter,
+    call_with_backoff
+)
+from utils.schema import SNAPSHOT_SCHEMA
+from utils.trends_cache import TrendsCache
+from utils.trends_checkpoint import (
+    TrendsCheckpoint,
+    task_key
+)
+from utils.trends_planner import (
+    align_to_anchor,
+    plan_payloads
+)
+from utils.trends_incremental import (
+    TrendsSeriesStore,
+    fetch_incremental
+)
+from utils.trends_fetch import (
+    crear_sesiones,
+    run_payloads
+)
+
+_segundos_importacion = time.perf_counter() - _inicio_importacion
+
 
 # Configuración de logging
 logger = logging.getLogger()
@@ -42,13 +120,29 @@ def split_list(lst, n):
     """Divide una lista en bloques de tamaño n."""
     return [lst[i:i + n] for i in range(0, len(lst), n)]
 
-def get_tendencias(pytrends, countries, football_keywords, timeframes=['now 7-d', 'today 1-m'], plot=False):
+def get_tendencias(pytrends, countries, football_keywords, timeframes=['now 7-d', 'today 1-m'], plot=False, cache=None,
+                   limiter=None, requests_per_second=1.0, retries=5):
     """
     Obtiene tendencias generales para los países y periodos especificados.
     Retorna un diccionario de DataFrames con columnas consistentes.
+    Si se pasa `cache` (TrendsCache), los payloads vigentes no se vuelven a pedir a Google.
+    `football_keywords` puede ser una lista de patrones o un KeywordFilter ya compilado.
+
+    Todas las llamadas a Google pasan por `limiter` (por defecto un
+    AdaptiveRateLimiter que arranca en requests_per_second) y se reintentan
+    hasta `retries` veces con backoff si la API responde 429.
     """
     trends_list = []  # Lista para almacenar los datos de tendencias
 
+    if limiter is None:
+        limiter = AdaptiveRateLimiter(requests_per_second)
+
+    # Compilar el filtro de exclusión una sola vez para todos los países y periodos
+    if isinstance(football_keywords, KeywordFilter):
+        football_filter = football_keywords
+    else:
+        football_filter = KeywordFilter(football_keywords)
+
     for country_name, codes in countries.items():
         country_code_geo = codes['geo']
         country_code_pn = codes['pn']
@@ -56,12 +150,15 @@ def get_tendencias(pytrends, countries, football_keywords, timeframes=['now 7-d'
             try:
                 logger.info(f"Obteniendo tendencias para {country_name} en el periodo {timeframe}")
                 # Obtener tendencias diarias para el país
-                daily_trends = pytrends.trending_searches(pn=country_code_pn)
+                daily_trends = call_with_backoff(
+                    lambda: pytrends.trending_searches(pn=country_code_pn),
+                    limiter=limiter, retries=retries, on_retry=_log_retry
+                )
                 daily_trends.columns = ['trend']  # Renombrar la columna
                 daily_trends['country'] = country_name
 
                 # Filtrar las tendencias para eliminar temas relacionados con fútbol
-                filtered_trends = [trend for trend in daily_trends['trend'] if not any(keyword.lower() in trend.lower() for keyword in football_keywords)]
+                filtered_trends = football_filter.filter(daily_trends['trend'])
                 filtered_trends = list(set(filtered_trends))  # Eliminar duplicados
 
                 if not filtered_trends:
@@ -73,8 +170,8 @@ def get_tendencias(pytrends, countries, football_keywords, timeframes=['now 7-d'
 
                 for chunk in trends_chunks:
                     logger.info(f"Construyendo payload para {chunk} en {country_name}, periodo {timeframe}")
-                    pytrends.build_payload(chunk, timeframe=timeframe, geo=country_code_geo)
-                    trends_data = pytrends.interest_over_time()
+                    trends_data = _interest_over_time(pytrends, chunk, timeframe, country_code_geo,
+                                                      limiter=limiter, cache=cache, retries=retries)
 
                     if trends_data.empty:
                         logger.info(f"No hay datos de interés para {chunk} en {country_name}, periodo {timeframe}")
@@ -95,6 +192,7 @@ def get_tendencias(pytrends, countries, football_keywords, timeframes=['now 7-d'
                     trends_list.append(trends_data)
 
                     if plot:
+                        import matplotlib.pyplot as plt
                         for trend in chunk:
                             data_to_plot = trends_data[trends_data['trend'] == trend]
                             plt.plot(data_to_plot['date'], data_to_plot['interest'], label=trend)
@@ -122,60 +220,188 @@ def get_tendencias(pytrends, countries, football_keywords, timeframes=['now 7-d'
 
     return trends_dict
 
-def print_trends(pytrends, keywords, countries, timeframes=['now 7-d', 'today 1-m'], plot=False):
+def _log_retry(attempt, wait, error):
+    metrics.incr('trends.retries')
+    logger.warning(f"Google Trends respondió 429 (intento {attempt}): {error}. Reintentando en {wait:.1f} s.")
+
+def _interest_over_time(pytrends, chunk, timeframe, geo, limiter=None, cache=None, retries=5):
+    """
+    Retorna el DataFrame de interest_over_time de un payload, leyéndolo de la
+    caché si hay una entrada vigente y guardándolo en ella tras descargarlo.
+    Si Google responde 429 se repite el payload completo (build_payload e
+    interest_over_time) con backoff, hasta `retries` intentos.
+    """
+    if cache is not None:
+        cached = cache.get(chunk, timeframe, geo, pytrends.hl, pytrends.tz)
+        if cached is not None:
+            logger.info(f"Payload para {chunk} en {geo}, periodo {timeframe} leído de caché")
+            metrics.incr('trends.cache_hits')
+            return cached
+
+    def _descargar():
+        # call_with_backoff espera turno antes de build_payload; interest_over_time es otra llamada
+        metrics.incr('trends.api_calls')
+        pytrends.build_payload(chunk, timeframe=timeframe, geo=geo)
+        if limiter is not None:
+            limiter.acquire()
+        metrics.incr('trends.api_calls')
+        return pytrends.interest_over_time()
+
+    interest_over_time = call_with_backoff(_descargar, limiter=limiter, retries=retries, on_retry=_log_retry)
+
+    if cache is not None:
+        cache.set(chunk, timeframe, geo, pytrends.hl, pytrends.tz, interest_over_time)
+    return interest_over_time
+
+def _interest_for_chunk(pytrends, chunk, country_name, country_code_geo, timeframe, limiter=None, cache=None,
+                        retries=5):
+    """
+    Descarga el interés a lo largo del tiempo de un bloque de palabras clave.
+    Retorna un DataFrame en formato largo o None si no hay datos o hubo error.
+    """
+    try:
+        logger.info(f"Construyendo payload para {chunk} en {country_name}, periodo {timeframe}")
+
+        interest_over_time = _interest_over_time(pytrends, chunk, timeframe, country_code_geo,
+                                                 limiter=limiter, cache=cache, retries=retries)
+
+        if interest_over_time.empty:
+            logger.info(f"No hay datos de interés para {chunk} en {country_name}, periodo {timeframe}")
+            metrics.incr('trends.empty_payloads')
+            return None
+
+        # Eliminar la columna "isPartial" si está presente
+        if 'isPartial' in interest_over_time.columns:
+            interest_over_time = interest_over_time.drop(columns=['isPartial'])
+
+        # Reestructurar el DataFrame para tener columnas consistentes
+        interest_over_time = interest_over_time.reset_index().melt(id_vars=['date'], var_name='keyword', value_name='interest')
+
+        # Añadir información de país y periodo
+        interest_over_time['country'] = country_name
+        interest_over_time['timeframe'] = timeframe
+
+        return interest_over_time
+    except Exception as e:
+        logger.error(f"Error al obtener interés para {chunk} en {country_name}, periodo {timeframe}: {str(e)}")
+        logger.error(traceback.format_exc())
+        metrics.incr('trends.errors')
+        return None
+
+def print_trends(pytrends, keywords, countries, timeframes=['now 7-d', 'today 1-m'], plot=False,
+                 concurrent=False, max_workers=4, requests_per_second=1.0, sessions=None, cache=None,
+                 store=None, plan=False, limiter=None, retries=5, checkpoint=None):
     """
     Obtiene el interés a lo largo del tiempo para palabras clave específicas.
     Retorna un diccionario de DataFrames con columnas consistentes.
+
+    Con concurrent=True los payloads se envían desde un pool de max_workers hilos,
+    cada uno con su propia sesión TrendReq (se crean a partir de pytrends si no se
+    pasan en `sessions`), bajo un límite global de requests_per_second. El
+    DataFrame resultante conserva el mismo orden que el modo secuencial.
+
+    Si se pasa `cache` (TrendsCache), los payloads vigentes se leen de disco
+    en lugar de pedirse de nuevo a Google.
+
+    Si se pasa `store` (TrendsSeriesStore), sólo se descarga la parte nueva de cada
+    ventana y se une a la serie guardada, reescalada sobre el solapamiento; al
+    terminar, el almacén se actualiza con las series resultantes.
+
+    Con plan=True cada palabra clave se consulta sólo en su propio país, sin
+    duplicados, en payloads completos con un ancla común por país (ver
+    utils.trends_planner.plan_payloads); los bloques se reescalan sobre el ancla.
+
+    En ambos modos las llamadas pasan por `limiter`, compartido por todos los
+    hilos (por defecto un AdaptiveRateLimiter que arranca en requests_per_second,
+    acelera mientras no hay errores y frena ante un 429). Un payload con 429 se
+    reintenta hasta `retries` veces con backoff exponencial y jitter.
+
+    Si se pasa `checkpoint` (TrendsCheckpoint), cada payload con datos se anota en
+    el diario al completarse; si la ejecución anterior con el mismo plan se
+    interrumpió, sus payloads se toman del diario en lugar de pedirse de nuevo.
+    El checkpoint se borra al terminar.
     """
     trends_list = []  # Lista para almacenar los datos de interés por palabra clave
     
     keywords_chunks = split_list(keywords, 5)
 
     logger.info(f"Keywords Totales='{str(len(keywords))}'...")
-    
-    for country_name, codes in countries.items():
-        country_code_geo = codes['geo']
-        for timeframe in timeframes:
-            for chunk in keywords_chunks:
-                try:
+
+    # Un payload por (país, periodo, bloque), en el mismo orden que el recorrido secuencial
+    anchors = {}
+    if plan:
+        tasks, anchors, plan_stats = plan_payloads(keywords, countries, timeframes)
+        metrics.gauge('fetch.payloads_saved', plan_stats['saved_calls'])
+    else:
+        tasks = []
+        for country_name, codes in countries.items():
+            country_code_geo = codes['geo']
+            for timeframe in timeframes:
+                for chunk in keywords_chunks:
                     chunk = list(set([k for k, _ in chunk]))
-                    logger.info(f"Construyendo payload para {chunk} en {country_name}, periodo {timeframe}")
-                    
-                    pytrends.build_payload(chunk, timeframe=timeframe, geo=country_code_geo)
-                    interest_over_time = pytrends.interest_over_time()
+                    tasks.append((chunk, country_name, country_code_geo, timeframe))
+
+    if limiter is None:
+        limiter = AdaptiveRateLimiter(requests_per_second)
+
+    partials = checkpoint.start(tasks) if checkpoint is not None else {}
+
+    def _download(session, task):
+        chunk, country_name, country_code_geo, timeframe = task
+        if store is None:
+            return _interest_for_chunk(session, chunk, country_name, country_code_geo, timeframe,
+                                       limiter=limiter, cache=cache, retries=retries)
+        return fetch_incremental(
+            chunk, country_name, timeframe, store,
+            lambda tf: _interest_for_chunk(session, chunk, country_name, country_code_geo, tf,
+                                           limiter=limiter, cache=cache, retries=retries)
+        )
 
-                    if interest_over_time.empty:
-                        logger.info(f"No hay datos de interés para {chunk} en {country_name}, periodo {timeframe}")
-                        continue
+    def _fetch(session, task):
+        key = task_key(task)
+        if key in partials:
+            metrics.incr('trends.checkpoint_hits')
+            return partials[key]
+        result = _download(session, task)
+        # Los payloads vacíos o con error no se anotan: se vuelven a intentar al reanudar
+        if checkpoint is not None and result is not None:
+            try:
+                checkpoint.record(task, result)
+            except Exception as e:
+                logger.warning(f"No se pudo anotar el payload {task[0]} en el checkpoint: {str(e)}")
+        return result
 
-                    # Eliminar la columna "isPartial" si está presente
-                    if 'isPartial' in interest_over_time.columns:
-                        interest_over_time = interest_over_time.drop(columns=['isPartial'])
+    if concurrent:
+        if sessions is None:
+            sessions = crear_sesiones(pytrends, max_workers)
+        results = run_payloads(tasks, _fetch, sessions, max_workers=max_workers)
+    else:
+        results = [_fetch(pytrends, task) for task in tasks]
 
-                    # Reestructurar el DataFrame para tener columnas consistentes
-                    interest_over_time = interest_over_time.reset_index().melt(id_vars=['date'], var_name='keyword', value_name='interest')
+    if hasattr(limiter, 'rate'):
+        metrics.gauge('trends.final_rate', round(limiter.rate, 3))
 
-                    # Añadir información de país y periodo
-                    interest_over_time['country'] = country_name
-                    interest_over_time['timeframe'] = timeframe
+    if anchors:
+        results = align_to_anchor(tasks, results, anchors)
 
-                    # Añadir a la lista de tendencias
-                    trends_list.append(interest_over_time)
+    for (chunk, country_name, _, timeframe), interest_over_time in zip(tasks, results):
+        if interest_over_time is None:
+            continue
 
-                    if plot:
-                        for keyword in chunk:
-                            data_to_plot = interest_over_time[interest_over_time['keyword'] == keyword]
-                            plt.plot(data_to_plot['date'], data_to_plot['interest'], label=keyword)
-                        plt.title(f"Interés en {country_name} para {timeframe}")
-                        plt.xlabel('Fecha')
-                        plt.ylabel('Interés')
-                        plt.legend()
-                        plt.show()
-                        time.sleep(5)
-                except Exception as e:
-                    logger.error(f"Error al obtener interés para {chunk} en {country_name}, periodo {timeframe}: {str(e)}")
-                    logger.error(traceback.format_exc())
-                    continue
+        # Añadir a la lista de tendencias
+        trends_list.append(interest_over_time)
+
+        if plot:
+            import matplotlib.pyplot as plt
+            for keyword in chunk:
+                data_to_plot = interest_over_time[interest_over_time['keyword'] == keyword]
+                plt.plot(data_to_plot['date'], data_to_plot['interest'], label=keyword)
+            plt.title(f"Interés en {country_name} para {timeframe}")
+            plt.xlabel('Fecha')
+            plt.ylabel('Interés')
+            plt.legend()
+            plt.show()
+            time.sleep(5)
 
     # Concatenar todos los DataFrames en uno solo
     if trends_list:
@@ -185,12 +411,21 @@ def print_trends(pytrends, keywords, countries, timeframes=['now 7-d', 'today 1-
         interest_df = pd.DataFrame(columns=['date', 'keyword', 'interest', 'country', 'timeframe'])
         logger.warning("No se obtuvieron datos de interés por palabras clave.")
 
+    if store is not None:
+        store.update(interest_df)
+        store.save()
+
+    if checkpoint is not None:
+        checkpoint.clear()
+
     # Retornar el DataFrame final en un diccionario para mantener consistencia con el formato original
     trends_dict = {'keywords_interest': interest_df}
 
     return trends_dict
 
-def save_dataframe_to_gsheet(dataframe, spreadsheet_id):
+def save_dataframe_to_gsheet(dataframe, spreadsheet_id, fingerprint_dir=None):
+    from utils.sheets_sink import write_dataframe_incremental
+
     try:
         # Convertir todas las columnas datetime a strings
         datetime_columns = dataframe.select_dtypes(include=['datetime64[ns]', 'datetime64[ns, UTC]']).columns
@@ -203,17 +438,15 @@ def save_dataframe_to_gsheet(dataframe, spreadsheet_id):
 
         # Usar la primera hoja del documento
         worksheet = sheet.sheet1
-        worksheet.clear()
-
-        # Convertir el DataFrame a una lista de listas
-        data = [dataframe.columns.values.tolist()] + dataframe.values.tolist()
 
-        # Actualizar la hoja con los datos
-        worksheet.update(data)
+        # Actualizar sólo las filas que cambiaron respecto a la hoja actual
+        write_dataframe_incremental(worksheet, dataframe, fingerprint_dir=fingerprint_dir)
         logger.info(f"Datos actualizados en la hoja de cálculo con ID '{spreadsheet_id}'.")
     except Exception as e:
         logger.error(f"Error al actualizar la hoja de cálculo con ID '{spreadsheet_id}': {str(e)}")
         logger.error(traceback.format_exc())
+        # Se propaga para que la etapa publish no se dé por completada
+        raise
 
 
 def get_df_kw(df_key_words):
@@ -222,186 +455,284 @@ def get_df_kw(df_key_words):
     df_key_words_ = df_key_words[df_key_words['mean_interest']>=mediana_interes]
     df_key_words_ = df_key_words_.sort_values('mean_interest', ascending=False)
     return df_key_words_
-    
 
-# Ejemplo de uso
-if __name__ == "__main__":
 
+# Países con sus códigos 'geo' y 'pn'
+COUNTRIES = {
+    'Mexico': {'geo': 'MX', 'pn': 'mexico'},
+    'United States': {'geo': 'US', 'pn': 'united_states'}
+}
+TIMEFRAMES = ['now 7-d', 'today 1-m']
 
-    # 1. Leer secrets de variables de entorno (definidas en GitHub Actions, por ejemplo)
-    folder_id = os.environ.get("SECRET_FOLDER_ID", None)
-    folder_id_2 = os.environ.get("SECRET_FOLDER_ID_DF", None)
-    creds_file = os.environ.get("SECRET_CREDS_FILE", None)
-    spreadsheet_id_kw = os.environ.get("SPREADSHEET_ID_KW", None)
-    spreadsheet_id_bbdd = os.environ.get("SPREADSHEET_ID_BBDD", None)
 
-    
-    if not folder_id or not creds_file:
-        logger.error("No se pudieron obtener 'folder_id' o 'creds_file' desde los secrets.")
-        # return None # Terminamos, pues no hay cómo continuar
-        exit(1)
-        
-    # 2. Obtener DataFrame desde Google Sheets en una carpeta de Drive
-    logger.info(f"Obteniendo datos de la carpeta con ID='{folder_id}'...")
-    df_key_words = get_sheets_data_from_folder(
-        folder_id=folder_id,
-        creds_file=creds_file,
-        days=30,        # Ajusta según tus necesidades
-        max_files=60,   # Límite de archivos a leer
-        sleep_seconds=2 # Pausa entre lecturas para no saturar la API
-    )
-    if df_key_words is None:
-        logger.warning("No se obtuvo ningún DataFrame (None). Abortando proceso.")
-        # return
-        exit(1)
-        
-    logger.info(f"Obteniendo datos de la carpeta con ID='{folder_id_2}'...")
-    combined_df_keys = get_sheets_data_from_folder(
-        folder_id=folder_id_2,
-        creds_file=creds_file,
-        days=30,        # Ajusta según tus necesidades
-        max_files=60,   # Límite de archivos a leer
-        sleep_seconds=2 # Pausa entre lecturas para no saturar la API
-    )
-    if combined_df_keys is None:
-        logger.warning("No se obtuvo ningún DataFrame (None). Abortando proceso.")
-        # return
-        exit(1)
-        
-    df_key_words_ = get_df_kw(df_key_words)
-    keywords_permitidos = [(k,c) for k, c in df_key_words_[['keyword','country']].values]
-    
-    concatenated_df, df_daily_filtrado_BS, df_daily_filtrado_WS  = preprocesar_keys(combined_df_keys)
-    
-    # Inicializar pytrends
-    pytrends = TrendReq(hl='es-MX', tz=360)
+def _periodo():
+    """Día UTC de la ejecución: los datos de Drive y de Trends se reutilizan dentro del mismo día."""
+    return datetime.utcnow().strftime('%Y-%m-%d')
+
+
+def _modo_offline():
+    from utils.offline import offline_enabled
+    return offline_enabled()
 
-    # Definir países con sus códigos 'geo' y 'pn'
-    countries = {
-        'Mexico': {'geo': 'MX', 'pn': 'mexico'},
-        'United States': {'geo': 'US', 'pn': 'united_states'}
+
+def ingest_params():
+    return {
+        'folder_id': os.environ.get("SECRET_FOLDER_ID"),
+        'folder_id_2': os.environ.get("SECRET_FOLDER_ID_DF"),
+        'days': 30,
+        'max_files': 60,
+        'periodo': _periodo(),
+        'offline': _modo_offline(),
     }
 
-    # Lista de palabras clave de fútbol para filtrar
-    football_keywords = ['fútbol', 'football', 'soccer', 'gol', 'liga', 'champions', 'mundial']
-    football_keywords = [
-        # Equipos y Clubes Internacionales
-        'fc', 'football', 'fútbol', 'soccer', 'liga', 'premier', 'serie a',
-        'la liga', 'bundesliga', 'champions', 'cup', 'city', 'united',
-        'arsenal', 'milan', 'barcelona', 'real madrid', 'psg', 'juventus',
-        'liverpool', 'chelsea', 'manchester', 'leicester', 'villa', 'west ham',
-        'tottenham', 'crystal palace', 'brighton', 'athletic', 'sevilla',
-        'atletico', 'napoli', 'roma', 'inter', 'bayern', 'ajax', 'benfica',
-        'porto', 'paris', 'saint-germain', 'lyon', 'marseille', 'fenerbahce', 'galatasaray',
-        'zenit', 'spartak', 'cska', 'olympiakos', 'panathinaikos', 'anderlecht', 'brugge', 'celtic',
-    
-        # Equipos y Clubes de América Latina
-        'boca juniors', 'river plate', 'flamengo', 'corinthians', 'palmeiras', 'sao paulo',
-        'gremio', 'america', 'cruz azul', 'pumas', 'tigres', 'santos', 'monterrey', 'toluca',
-        'leon', 'necaxa', 'queretaro', 'juarez', 'mazatlan', 'puebla', 'chivas', 'atlas',
-    
-        # Competiciones Internacionales
-        'world cup', 'copa mundial', 'euro', 'copa america', 'concacaf', 'afcon',
-        'asian cup', 'europa league', 'uefa', 'fifa', 'libertadores', 'sudamericana',
-        'confederations cup', 'copa del rey', 'supercopa', 'community shield', 'dfb-pokal',
-        'carabao cup', 'fa cup', 'copa mx', 'copa libertadores', 'copa sudamericana',
-    
-        # Jugadores y Entrenadores Famosos (pasado y presente)
-        'messi', 'ronaldo', 'cristiano', 'neymar', 'mbappe', 'haaland', 'ronaldinho',
-        'zidane', 'maradona', 'pele', 'zlatan', 'ibrahimovic', 'beckham', 'suarez',
-        'griezmann', 'iniesta', 'xavi', 'modric', 'kroos', 'lewandowski', 'benzema',
-        'casillas', 'buffon', 'oblak', 'ter stegen', 'courtois', 'pique', 'sergio ramos',
-        'dani alves', 'marcelo', 'kane', 'sterling', 'rashford', 'pogba', 'kante', 'salah',
-        'firmino', 'mané', 'virgil van dijk', 'son', 'lukaku', 'mourinho', 'guardiola',
-        'klopp', 'ancelotti', 'allegri', 'simeone', 'pochettino', 'flick', 'deschamps',
-        'low', 'luis enrique', 'scaloni', 'tite', 'scolari', 'bielsa', 'menotti', 'bilardo',
-    
-        # Términos Generales de Fútbol
-        'gol', 'penalti', 'foul', 'offside', 'var', 'red card', 'yellow card', 'corner',
-        'free kick', 'goalkeeper', 'striker', 'midfielder', 'defender', 'forward', 'winger',
-        'coach', 'manager', 'transfer', 'loan', 'relegation', 'promotion', 'matchday',
-        'fixtures', 'standings', 'table', 'points', 'clean sheet', 'hat-trick', 'assist',
-        'stadium', 'crowd', 'fans', 'ultras', 'derby', 'rivalry', 'clásico', 'cup final',
-        'semi-final', 'quarter-final', 'group stage', 'knockout', 'penalty shootout', 'extra time',
-    
-        # Competencias Nacionales (Ligas y Copas)
-        'laliga', 'ligue 1', 'serie a', 'bundesliga', 'premier league', 'eredivisie',
-        'primeira liga', 'super lig', 'ligapro', 'liga mx', 'mls', 'us open cup',
-        'ascenso', 'liga adelante', 'segunda division', 'serie b', 'championship', 'league one',
-        'liga aguila', 'copa mustang', 'copa de oro', 'copa sudamericana', 'copa américa',
-        'copa del rey', 'supercopa de españa', 'superliga argentina', 'torneo final',
-        'torneo clausura', 'torneo apertura', 'liga betplay', 'liga pro', 'ligapro',
-        'liga expansion', 'copa mx', 'copa libertadores', 'recopa sudamericana',
-    
-        # Variantes del Nombre de Fútbol
-        'futbol', 'fútbol', 'soccer', 'football', 'futebol', 'footie'
-    ]
+
+def run_ingest(params):
+    """Etapa ingest: lee los snapshots de las dos carpetas de Drive. Retorna {'keywords', 'daily'}."""
+    creds_file = os.environ.get("SECRET_CREDS_FILE")
+
+    # Bibliotecas de Google: se cargan aquí, una vez validados los secrets
+    with metrics.stage('import_google'):
+        from utils.google_clients import get_google_clients
+        from utils.google_utils import get_sheets_data_from_folder
+
+    # Clientes de Google autenticados una sola vez y compartidos por ingesta y publicación
+    google_clients = get_google_clients(creds_file)
+
+    # Caché local de snapshots de Drive (opcional)
+    snapshot_cache_dir = os.environ.get("SNAPSHOT_CACHE_DIR", None)
+
+    # Obtener DataFrame desde Google Sheets en una carpeta de Drive
+    logger.info(f"Obteniendo datos de la carpeta con ID='{params['folder_id']}'...")
+    with metrics.stage('ingest_keywords'):
+        df_key_words = get_sheets_data_from_folder(
+            folder_id=params['folder_id'],
+            creds_file=creds_file,
+            days=params['days'],            # Ajusta según tus necesidades
+            max_files=params['max_files'],  # Límite de archivos a leer
+            concurrent=True,          # Lectura en paralelo de los archivos
+            requests_per_second=1.0,  # Límite global para no saturar la API
+            cache_dir=snapshot_cache_dir,
+            schema=SNAPSHOT_SCHEMA,   # Tipado de columnas al leer cada archivo
+            clients=google_clients
+        )
+    metrics.record_frame('ingest_keywords', df_key_words)
+    if df_key_words is None:
+        raise RuntimeError(f"No se obtuvo ningún DataFrame de la carpeta '{params['folder_id']}'.")
+
+    # Los snapshots de la segunda carpeta se agregan por día a medida que se leen,
+    # sin concatenar las filas crudas
+    logger.info(f"Obteniendo datos de la carpeta con ID='{params['folder_id_2']}'...")
+    with metrics.stage('ingest_series'):
+        df_daily_keys = get_sheets_data_from_folder(
+            folder_id=params['folder_id_2'],
+            creds_file=creds_file,
+            days=params['days'],            # Ajusta según tus necesidades
+            max_files=params['max_files'],  # Límite de archivos a leer
+            concurrent=True,          # Lectura en paralelo de los archivos
+            requests_per_second=1.0,  # Límite global para no saturar la API
+            cache_dir=snapshot_cache_dir,
+            schema=SNAPSHOT_SCHEMA,   # Tipado de columnas al leer cada archivo
+            aggregator=DailyStatsAggregator(),
+            clients=google_clients
+        )
+    metrics.record_frame('ingest_series', df_daily_keys)
+    if df_daily_keys is None:
+        raise RuntimeError(f"No se obtuvo ningún DataFrame de la carpeta '{params['folder_id_2']}'.")
+
+    return {'keywords': df_key_words, 'daily': df_daily_keys}
+
+
+def run_preprocess(ingested):
+    """Etapa preprocess: palabras clave a consultar y tablas de métricas. Retorna {'kw', 'metrics', 'best', 'worst'}."""
+    df_key_words_ = get_df_kw(ingested['keywords'])
+    concatenated_df, df_daily_filtrado_BS, df_daily_filtrado_WS = preprocesar_keys(None, df_daily=ingested['daily'])
+
+    metrics.record_frame('preprocess', ingested['daily'])
+    metrics.gauge('preprocess.keywords', len(df_key_words_))
+    metrics.record_frame('preprocess.metrics', concatenated_df)
+    metrics.record_frame('preprocess.best', df_daily_filtrado_BS)
+    metrics.record_frame('preprocess.worst', df_daily_filtrado_WS)
+    return {'kw': df_key_words_, 'metrics': concatenated_df, 'best': df_daily_filtrado_BS,
+            'worst': df_daily_filtrado_WS}
+
+
+def fetch_params():
+    return {
+        'countries': COUNTRIES,
+        'timeframes': TIMEFRAMES,
+        'hl': 'es-MX',
+        'tz': 360,
+        'periodo': _periodo(),
+        'offline': _modo_offline(),
+    }
+
+
+def run_fetch(preprocessed, params):
+    """Etapa fetch: interés en el tiempo de las palabras clave en Google Trends. Retorna {'interest'}."""
+    df_key_words_ = preprocessed['kw']
+    keywords_permitidos = [(k, c) for k, c in df_key_words_[['keyword', 'country']].values]
+
+    # Inicializar pytrends (sustituto local si GOOGLE_OFFLINE=1, ver utils.offline)
+    with metrics.stage('import_pytrends'):
+        if params['offline']:
+            from utils.offline import FakeTrendReq as trend_req_class
+        else:
+            from pytrends.request import TrendReq as trend_req_class
+    pytrends = trend_req_class(hl=params['hl'], tz=params['tz'])
 
     # Obtener tendencias
-    # tendencias = get_tendencias(pytrends, countries, football_keywords, plot=False)
-    # keywords = [
-    #     "economía de la atención"
-    # ]
+    # from utils.keyword_filter import FOOTBALL_KEYWORDS
+    # football_keywords = KeywordFilter(FOOTBALL_KEYWORDS)
+    # tendencias = get_tendencias(pytrends, COUNTRIES, football_keywords, plot=False, cache=trends_cache)
+
+    # Caché en disco de payloads (opcional): permite relanzar el job sin repetir llamadas
+    trends_cache_dir = os.environ.get("TRENDS_CACHE_DIR", None)
+    trends_cache = TrendsCache(trends_cache_dir) if trends_cache_dir else None
+
+    # Almacén de series para descarga incremental (opcional)
+    trends_store_path = os.environ.get("TRENDS_STORE_PATH", None)
+    trends_store = TrendsSeriesStore(trends_store_path) if trends_store_path else None
+
+    # Diario de payloads completados (opcional): un job interrumpido se reanuda desde aquí
+    trends_checkpoint_dir = os.environ.get("TRENDS_CHECKPOINT_DIR", None)
+    trends_checkpoint = TrendsCheckpoint(trends_checkpoint_dir) if trends_checkpoint_dir else None
 
     # Obtener interés por tiempo
-    interes = print_trends(pytrends, keywords_permitidos, countries, plot=False)
+    with metrics.stage('fetch_trends'):
+        interes = print_trends(pytrends, keywords_permitidos, params['countries'], timeframes=params['timeframes'],
+                               plot=False, cache=trends_cache, store=trends_store, plan=True,
+                               checkpoint=trends_checkpoint)
+    metrics.record_frame('fetch_trends', interes['keywords_interest'])
+    return {'interest': interes['keywords_interest']}
+
+
+def publish_params():
+    return {
+        'spreadsheet_id_keywords': os.environ.get('SPREADSHEET_ID_KEYWORDS'),
+        'spreadsheet_id_kw': os.environ.get("SPREADSHEET_ID_KW"),
+        'spreadsheet_id_bbdd': os.environ.get("SPREADSHEET_ID_BBDD"),
+    }
 
-    # Cargar las credenciales de Google Sheets desde la variable de entorno
-    google_creds_json = os.environ.get('GOOGLE_SHEETS_CREDS_BASE64')
-    if not google_creds_json:
-        logger.error("Las credenciales de Google Sheets no están configuradas en 'GOOGLE_SHEETS_CREDS_BASE64'")
-        exit(1)
 
-    # Decodificar las credenciales de base64
-    try:
-        decoded_creds = base64.b64decode(google_creds_json)
-        creds_dict = json.loads(decoded_creds)
-        credentials = Credentials.from_service_account_info(
-            creds_dict,
-            scopes=['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
-        )
-        gc = gspread.authorize(credentials)
-    except Exception as e:
-        logger.error(f"Error al cargar las credenciales de Google Sheets: {str(e)}")
-        logger.error(traceback.format_exc())
-        exit(1)
+def run_publish(preprocessed, fetched, params):
+    """
+    Etapa publish: sube el interés por palabra clave y, si hay SPREADSHEET_ID_BBDD,
+    las tablas de métricas. Lanza una excepción si alguna tabla no se pudo subir,
+    para que la etapa no se dé por completada. No produce tablas.
+    """
+    global gc
+    creds_file = os.environ.get("SECRET_CREDS_FILE")
 
-    # IDs de las hojas de cálculo de Google Sheets
-    spreadsheet_id_trends = os.environ.get('SPREADSHEET_ID_TRENDS')
-    if not spreadsheet_id_trends:
-        logger.error("El ID de la hoja de cálculo para tendencias no está configurado en 'SPREADSHEET_ID_TRENDS'")
-        exit(1)
+    with metrics.stage('import_google'):
+        from utils.google_clients import get_google_clients
+        from utils.google_utils import publish_dataframes
 
-    spreadsheet_id_keywords = os.environ.get('SPREADSHEET_ID_KEYWORDS')
-    if not spreadsheet_id_keywords:
-        logger.error("El ID de la hoja de cálculo para palabras clave no está configurado en 'SPREADSHEET_ID_KEYWORDS'")
-        exit(1)
+    # Cargar las credenciales de Google Sheets desde la variable de entorno (base64)
+    creds_dict = json.loads(base64.b64decode(os.environ.get('GOOGLE_SHEETS_CREDS_BASE64')))
+    gc = get_google_clients(creds_info=creds_dict).gspread
 
-    # Guardar los DataFrames en diferentes documentos
-    try:
-        # Guardar las tendencias generales
-        # trends_df = tendencias['trends_data']
-        # save_dataframe_to_gsheet(trends_df, spreadsheet_id_trends)
+    # Huellas locales de las hojas publicadas (opcional): evitan leerlas antes de escribir
+    sheets_fingerprint_dir = os.environ.get("SHEETS_FINGERPRINT_DIR", None)
 
-        # Guardar el interés por palabras clave
-        interest_df = interes['keywords_interest']
-        save_dataframe_to_gsheet(interest_df, spreadsheet_id_keywords)
+    # Guardar las tendencias generales
+    # trends_df = tendencias['trends_data']
+    # save_dataframe_to_gsheet(trends_df, spreadsheet_id_trends)
 
-        logger.info("Datos guardados exitosamente en documentos de Google Sheets separados.")
-    except Exception as e:
-        logger.error(f"Error al guardar los datos en Google Sheets: {str(e)}")
-        logger.error(traceback.format_exc())
-        exit(1)
+    # Guardar el interés por palabras clave (se convierte sobre una copia: el artefacto no cambia)
+    interest_df = fetched['interest'].copy()
+    with metrics.stage('save_interest'):
+        save_dataframe_to_gsheet(interest_df, params['spreadsheet_id_keywords'], fingerprint_dir=sheets_fingerprint_dir)
+    metrics.record_frame('save_interest', interest_df)
+    logger.info("Datos guardados exitosamente en documentos de Google Sheets separados.")
 
-    # 9. Subir DataFrames a Google Sheets (opcional)
-    if spreadsheet_id_bbdd:
+    # Subir DataFrames a Google Sheets (opcional)
+    if params['spreadsheet_id_bbdd']:
         logger.info("Subiendo DataFrames a Google Sheets...")
 
-        # Ejemplos de subidas
-        exito = upload_dataframe_to_google_sheet(df_key_words_, creds_file, spreadsheet_id_kw, 'Hoja 1')
-        exito = upload_dataframe_to_google_sheet(df_daily_filtrado_BS, creds_file, spreadsheet_id_bbdd, 'bbdd_best')
-        exito = upload_dataframe_to_google_sheet(df_daily_filtrado_WS, creds_file, spreadsheet_id_bbdd, 'bbdd_worst')
-        exito = upload_dataframe_to_google_sheet(concatenated_df, creds_file, spreadsheet_id_bbdd, 'metrics')
+        # Las cuatro tablas van a hojas distintas: se suben en paralelo bajo un límite común
+        tablas = [
+            (preprocessed['kw'], params['spreadsheet_id_kw'], 'Hoja 1'),
+            (preprocessed['best'], params['spreadsheet_id_bbdd'], 'bbdd_best'),
+            (preprocessed['worst'], params['spreadsheet_id_bbdd'], 'bbdd_worst'),
+            (preprocessed['metrics'], params['spreadsheet_id_bbdd'], 'metrics'),
+        ]
+        with metrics.stage('publish_tables'):
+            estado_publicacion = publish_dataframes(
+                tablas,
+                creds_file,
+                fingerprint_dir=sheets_fingerprint_dir,
+                clients=get_google_clients(creds_file),
+                requests_per_second=1.0
+            )
+        fallidas = [f"{hoja}/{nombre}" for (hoja, nombre), estado in estado_publicacion.items() if not estado['ok']]
+        metrics.gauge('publish.rows', sum(len(df) for df, _, _ in tablas if df is not None))
+        metrics.gauge('publish.tables_failed', len(fallidas))
+        if fallidas:
+            raise RuntimeError(f"No se pudieron publicar las tablas {fallidas}.")
+    return {}
+
+
+def _upstream(store, stage, results):
+    """(frames, manifest) de una etapa: el de esta ejecución o, si no se ejecutó, el último guardado."""
+    if stage in results:
+        return results[stage]
+    latest = store.latest(stage)
+    if latest is None:
+        raise RuntimeError(f"No hay artefactos de la etapa '{stage}': ejecútala antes.")
+    logger.info(f"Usando el último artefacto de la etapa '{stage}' ({latest[1]['key'][:12]}).")
+    return latest
+
 
+# Ejemplo de uso
+if __name__ == "__main__":
+    # Reporte de métricas por etapa; se guarda al salir, también si el proceso aborta
+    metrics_path = os.environ.get("METRICS_PATH", "run_metrics.json")
+
+    def guardar_metricas():
+        if metrics.status == 'running':
+            metrics.status = 'failed'
+        try:
+            metrics.write_json(metrics_path)
+        except Exception as e:
+            logger.error(f"Error al guardar las métricas en '{metrics_path}': {str(e)}")
+
+    atexit.register(guardar_metricas)
+    metrics.gauge('startup.import_seconds', round(_segundos_importacion, 3))
+
+    # Cada etapa guarda sus tablas en Parquet bajo una clave que depende del contenido de
+    # sus entradas y de sus parámetros: si nada cambió, se reutiliza el artefacto
+    store = ArtifactStore(args.artifacts_dir)
+    results = {}
+    etapa = None
+    try:
+        for etapa in args.stages:
+            if etapa == 'ingest':
+                params = ingest_params()
+                results['ingest'] = run_stage(store, 'ingest', lambda: run_ingest(params),
+                                              params=params, force=args.force)
+            elif etapa == 'preprocess':
+                ingested, manifest = _upstream(store, 'ingest', results)
+                results['preprocess'] = run_stage(store, 'preprocess', lambda: run_preprocess(ingested),
+                                                  inputs={'ingest': manifest['content']}, force=args.force)
+            elif etapa == 'fetch':
+                preprocessed, manifest = _upstream(store, 'preprocess', results)
+                params = fetch_params()
+                # Sólo la lista de palabras clave afecta a la descarga
+                results['fetch'] = run_stage(store, 'fetch', lambda: run_fetch(preprocessed, params),
+                                             inputs={'kw': frame_hash(preprocessed['kw'][['keyword', 'country']])},
+                                             params=params, force=args.force)
+            elif etapa == 'publish':
+                preprocessed, manifest_pre = _upstream(store, 'preprocess', results)
+                fetched, manifest_fetch = _upstream(store, 'fetch', results)
+                params = publish_params()
+                results['publish'] = run_stage(store, 'publish', lambda: run_publish(preprocessed, fetched, params),
+                                               inputs={'preprocess': manifest_pre['content'],
+                                                       'fetch': manifest_fetch['content']},
+                                               params=params, force=args.force)
+    except Exception as e:
+        logger.error(f"Error en la etapa '{etapa}': {str(e)}")
+        logger.error(traceback.format_exc())
+        exit(1)
 
+    metrics.status = 'ok'
     logger.info("¡Proceso finalizado con éxito!")
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """Activa los sustitutos locales de utils.offline sin latencia ni errores 429."""
+    import utils.google_clients as google_clients
+
+    monkeypatch.setenv('GOOGLE_OFFLINE', '1')
+    for name in ('OFFLINE_LATENCY', 'OFFLINE_TRENDS_LATENCY', 'OFFLINE_429_RATE'):
+        monkeypatch.setenv(name, '0')
+    # Clientes nuevos en cada prueba: el registro los comparte en todo el proceso
+    monkeypatch.setattr(google_clients, '_registry', {})
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.backends import calculate_daily_stats_polars, calcular_scores_polars, frames_equivalent
+from utils.preprocess_keys import _calcular_scores, calculate_daily_stats
+from utils.schema import apply_schema
+
+pytest.importorskip('polars')
+
+METRICS = ['mean_interest', 'min_interest', 'max_interest']
+
+
+def _hourly(n_series=40, days=45, seed=0):
+    """Datos cada 6 h con series que empiezan/terminan en cero y algunos nulos."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2024-01-01', periods=days * 4, freq='6h')
+    interest = np.maximum(0, rng.uniform(0, 60, (n_series, 1)) + rng.normal(0, 10, (n_series, len(dates)))).round()
+    position = np.arange(len(dates))
+    interest[position < rng.integers(0, 40, (n_series, 1))] = 0
+    interest[position >= len(dates) - rng.integers(0, 20, (n_series, 1))] = 0
+    interest[rng.random(interest.shape) < 0.01] = np.nan
+    return pd.DataFrame({
+        'date': np.tile(dates.values, n_series),
+        'keyword': np.repeat([f"kw{i:03d}" for i in range(n_series)], len(dates)),
+        'country': np.repeat(np.where(np.arange(n_series) % 2 == 0, 'Mexico', 'United States'), len(dates)),
+        'interest': interest.ravel(),
+    })
+
+
+def _scores_pandas(daily):
+    # Misma preparación que obtener_top_por_metricas antes de _calcular_scores
+    df = daily[['day', 'keyword', 'country'] + METRICS].copy()
+    df[METRICS] = df[METRICS].fillna(0)
+    return _calcular_scores(df, METRICS, 1.0, 1.0, 1.0, 0.5)
+
+
+def _scores_polars(daily):
+    return calcular_scores_polars(daily, METRICS, 1.0, 1.0, 1.0, 0.5)
+
+
+@pytest.fixture(params=[False, True], ids=['object', 'typed'])
+def raw(request):
+    df = _hourly()
+    return apply_schema(df) if request.param else df
+
+
+@pytest.mark.parametrize('pandas_fn, polars_fn', [
+    (lambda raw: calculate_daily_stats(raw, backend='pandas'), calculate_daily_stats_polars),
+    (lambda raw: _scores_pandas(calculate_daily_stats(raw, backend='pandas')),
+     lambda raw: _scores_polars(calculate_daily_stats(raw, backend='pandas'))),
+], ids=['calculate_daily_stats', '_calcular_scores'])
+def test_backends_are_equivalent(raw, pandas_fn, polars_fn):
+    expected = pandas_fn(raw.copy())
+    result = polars_fn(raw.copy())
+
+    assert len(expected) > 0
+    assert frames_equivalent(expected, result)
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from google.oauth2.credentials import Credentials
+
+from utils.google_clients import GoogleClients
+from utils.google_utils import get_sheets_data_from_folder, publish_dataframes
+from utils.metrics import metrics
+from utils.offline import FakeGoogleClients, FakeWorksheet, OfflineBackend, OfflineConfig
+
+
+@pytest.fixture
+def stale_clients(offline):
+    # 20 snapshots cada 12 h; el más reciente es de hace 3 días (p. ej. el lunes tras el sábado)
+    config = OfflineConfig(latency=0, trends_latency=0, n_snapshots=20)
+    return FakeGoogleClients(OfflineBackend(config, now=datetime.utcnow() - timedelta(days=3)))
+
+
+def test_window_is_anchored_to_newest_snapshot(stale_clients, tmp_path):
+    metrics.reset()
+    cache_dir = str(tmp_path / 'snapshots')
+    df = get_sheets_data_from_folder('offline-keywords', None, days=5, max_files=60, concurrent=True,
+                                     requests_per_second=1000, cache_dir=cache_dir, clients=stale_clients)
+
+    # Ventana de 5 días desde el más reciente: 11 snapshots (0 h, 12 h, ..., 120 h)
+    assert df is not None
+    assert metrics.counters['snapshots.downloaded'] == 11
+    assert len([name for name in os.listdir(cache_dir) if name.endswith('.parquet')]) == 11
+
+
+def test_offline_publish_does_not_wait_for_the_api_quota(offline):
+    clients = FakeGoogleClients(OfflineBackend(OfflineConfig(latency=0, trends_latency=0)))
+    df = pd.DataFrame({'keyword': [f"kw {i}" for i in range(50)], 'value': range(50)})
+    tables = [(df, 'offline-bbdd', name) for name in ('bbdd_best', 'bbdd_worst', 'metrics', 'Hoja 1')]
+
+    start = time.monotonic()
+    status = publish_dataframes(tables, None, clients=clients, requests_per_second=1.0)
+
+    assert all(result['ok'] for result in status.values())
+    # Con el límite real (1 llamada/s) la publicación tardaría varios segundos
+    assert time.monotonic() - start < 2
+
+
+def test_publish_status_is_keyed_by_spreadsheet_and_sheet(offline, monkeypatch):
+    clients = FakeGoogleClients(OfflineBackend(OfflineConfig(latency=0, trends_latency=0)))
+    original = FakeWorksheet.batch_update
+
+    def batch_update(self, *args, **kwargs):
+        if self.spreadsheet_id == 'offline-b':
+            raise RuntimeError("fallo simulado")
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(FakeWorksheet, 'batch_update', batch_update)
+    df = pd.DataFrame({'keyword': ['kw 1', 'kw 2'], 'value': [1, 2]})
+
+    status = publish_dataframes([(df, 'offline-a', 'metrics'), (df, 'offline-b', 'metrics')], None,
+                                clients=clients, retries=1)
+
+    assert status[('offline-a', 'metrics')]['ok']
+    assert not status[('offline-b', 'metrics')]['ok']
+
+
+def test_gspread_client_is_per_thread():
+    clients = GoogleClients(Credentials(token='token'))
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(clients.gspread_client()))
+    thread.start()
+    thread.join()
+
+    assert clients.gspread_client() is clients.gspread_client()
+    assert seen[0] is not clients.gspread_client()
+    assert seen[0].http_client.session is not clients.gspread.http_client.session
+
+
+def test_snapshots_without_timestamp_stay_cached(offline, tmp_path):
+    # Nombres sin timestamp y modifiedTime de hace dos meses
+    backend = OfflineBackend(OfflineConfig(latency=0, trends_latency=0, n_snapshots=5),
+                             now=datetime.utcnow() - timedelta(days=60))
+    folder_files = backend._folder_files
+    backend._folder_files = lambda folder_id: [dict(f, name=f"snapshot {i}")
+                                               for i, f in enumerate(folder_files(folder_id))]
+    clients = FakeGoogleClients(backend)
+    cache_dir = str(tmp_path / 'snapshots')
+
+    for expected_downloads in (5, 0):
+        metrics.reset()
+        df = get_sheets_data_from_folder('offline-keywords', None, days=30, max_files=60, concurrent=True,
+                                         requests_per_second=1000, cache_dir=cache_dir, clients=clients)
+        assert df is not None
+        assert metrics.counters.get('snapshots.downloaded', 0) == expected_downloads
@@ -0,0 +1,55 @@
+import base64
+import importlib
+
+import pandas as pd
+import pytest
+
+from utils.offline import FakeWorksheet
+from utils.pipeline import ArtifactStore, run_stage
+
+
+@pytest.fixture
+def gtd(tmp_path, monkeypatch, offline):
+    # El módulo crea su archivo de log en el directorio actual al importarse
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('SECRET_CREDS_FILE', 'offline-credentials.json')
+    monkeypatch.setenv('GOOGLE_SHEETS_CREDS_BASE64', base64.b64encode(b'{}').decode('ascii'))
+    monkeypatch.setenv('SPREADSHEET_ID_KEYWORDS', 'offline-keywords-interest')
+    monkeypatch.delenv('SPREADSHEET_ID_BBDD', raising=False)
+    monkeypatch.delenv('SHEETS_FINGERPRINT_DIR', raising=False)
+    return importlib.import_module('google_trends_data')
+
+
+def _fetched():
+    return {'interest': pd.DataFrame({
+        'date': pd.date_range('2024-06-01', periods=3, freq='D'),
+        'keyword': ['kw1'] * 3,
+        'interest': [10, 20, 30],
+        'country': ['Mexico'] * 3,
+        'timeframe': ['today 1-m'] * 3,
+    })}
+
+
+def _run_publish(gtd, store):
+    params = gtd.publish_params()
+    return run_stage(store, 'publish', lambda: gtd.run_publish({}, _fetched(), params),
+                     inputs={'fetch': 'x'}, params=params)
+
+
+def test_publish_failure_is_not_recorded(gtd, tmp_path, monkeypatch):
+    def _falla(self, data, **kwargs):
+        raise RuntimeError("escritura rechazada")
+
+    monkeypatch.setattr(FakeWorksheet, 'batch_update', _falla)
+    store = ArtifactStore(str(tmp_path / 'artifacts'))
+
+    with pytest.raises(RuntimeError):
+        _run_publish(gtd, store)
+    assert store.latest('publish') is None
+
+
+def test_publish_success_is_recorded(gtd, tmp_path):
+    store = ArtifactStore(str(tmp_path / 'artifacts'))
+
+    _, manifest = _run_publish(gtd, store)
+    assert store.latest('publish')[1]['key'] == manifest['key']
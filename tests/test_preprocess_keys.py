@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+import pytest
+
+from utils.backends import frames_equivalent
+from utils.preprocess_keys import TrendScoreState, filter_recent_high_median_interest, obtener_top_por_modo
+
+
+def _stats():
+    days = pd.date_range('2024-01-01', periods=60, freq='D')
+    frames = []
+    # 'activa': mediana creciente; 'sin datos': mediana NaN en los últimos 30 días
+    for keyword, values in (('activa', np.arange(60, dtype='float64')),
+                            ('sin datos', np.r_[np.arange(29, dtype='float64'), [np.nan] * 31])):
+        frames.append(pd.DataFrame({'day': days, 'keyword': keyword, 'country': 'Mexico',
+                                    'median_interest': values}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_group_with_nan_threshold_is_dropped():
+    filtered = filter_recent_high_median_interest(_stats())
+
+    assert set(filtered['keyword']) == {'activa'}
+    # Percentil 25 de los días 29..59 de 'activa'
+    assert filtered['median_interest'].min() > np.percentile(np.arange(29, 60), 25)
+
+
+def test_group_without_recent_rows_is_kept():
+    stats = _stats()
+    stats = stats[stats['keyword'] == 'activa']
+    old = pd.DataFrame({'day': pd.date_range('2023-06-01', periods=5, freq='D'), 'keyword': 'antigua',
+                        'country': 'Mexico', 'median_interest': [1.0, 2.0, np.nan, 4.0, 5.0]})
+
+    filtered = filter_recent_high_median_interest(pd.concat([stats, old], ignore_index=True))
+
+    assert filtered.loc[filtered['keyword'] == 'antigua', 'median_interest'].tolist() == [1.0, 2.0, 4.0, 5.0]
+
+
+def _daily(days=75, n_keywords=12, seed=0):
+    """Estadísticas diarias (formato de calculate_daily_stats) con algunos días sin datos."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2024-01-01', periods=days, freq='D')
+    df = pd.DataFrame({
+        'day': np.tile(dates.values, n_keywords),
+        'keyword': np.repeat([f"kw{i:02d}" for i in range(n_keywords)], days),
+        'country': np.repeat(np.where(np.arange(n_keywords) % 2 == 0, 'Mexico', 'United States'), days),
+        'max_interest': rng.uniform(0, 100, days * n_keywords),
+    })
+    # Huecos en medio de las series; el último día siempre tiene datos
+    gaps = (rng.random(len(df)) < 0.1) & (df['day'] < dates[-1])
+    return df[~gaps].reset_index(drop=True)
+
+
+def _feed_by_day(state, daily):
+    for _, batch in daily.groupby('day', sort=True):
+        state.update(batch)
+    return state
+
+
+@pytest.mark.parametrize('history_days', [None, 40])
+def test_trend_score_state_matches_full_recompute(history_days):
+    daily = _daily()
+    state = _feed_by_day(TrendScoreState(decay_base=0.75, history_days=history_days), daily)
+
+    history = daily
+    if history_days is not None:
+        # Los días anteriores a la ventana salen del estado (TrendScoreState._evict)
+        history = daily[daily['day'] >= daily['day'].max() - pd.Timedelta(days=history_days)]
+        assert all(len(st['days']) <= history_days + 1 for st in state.state.values())
+    expected = obtener_top_por_modo(history.copy(), top_n=4, decay_base=0.75, type_metric='max', backend='pandas')
+
+    assert frames_equivalent(state.top_n(4), expected)
+
+
+def test_trend_score_state_save_load_round_trip(tmp_path):
+    daily = _daily()
+    first, rest = daily[daily['day'] < '2024-02-20'], daily[daily['day'] >= '2024-02-20']
+    state = _feed_by_day(TrendScoreState(decay_base=0.75, history_days=40), first)
+    path = str(tmp_path / 'scores.pkl')
+    state.save(path)
+
+    loaded = TrendScoreState.load(path)
+
+    assert frames_equivalent(loaded.scores(), state.scores())
+    assert frames_equivalent(_feed_by_day(loaded, rest).scores(), _feed_by_day(state, rest).scores())
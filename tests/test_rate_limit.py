@@ -0,0 +1,43 @@
+import pytest
+import requests
+
+from utils.rate_limit import call_with_backoff
+
+
+def _throttled():
+    response = requests.Response()
+    response.status_code = 429
+    return requests.HTTPError("429", response=response)
+
+
+@pytest.mark.parametrize('retries', [0, -1])
+def test_retries_below_one_is_rejected(retries):
+    calls = []
+
+    with pytest.raises(ValueError):
+        call_with_backoff(lambda: calls.append(1), retries=retries)
+    assert calls == []
+
+
+def test_last_rate_limited_attempt_is_raised():
+    calls = []
+
+    def fn():
+        calls.append(1)
+        raise _throttled()
+
+    with pytest.raises(requests.HTTPError):
+        call_with_backoff(fn, retries=3, backoff_seconds=0)
+    assert len(calls) == 3
+
+
+def test_success_after_rate_limit():
+    responses = iter([_throttled(), 'ok'])
+
+    def fn():
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    assert call_with_backoff(fn, retries=2, backoff_seconds=0) == 'ok'
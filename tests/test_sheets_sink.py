@@ -0,0 +1,139 @@
+import os
+
+import pandas as pd
+import pytest
+
+from utils.offline import FakeWorksheet, OfflineBackend, OfflineConfig
+from utils.sheets_sink import write_dataframe_incremental
+
+
+class RecordingWorksheet(FakeWorksheet):
+    """FakeWorksheet que anota las peticiones de escritura."""
+
+    def __init__(self):
+        super().__init__(OfflineBackend(OfflineConfig(latency=0, trends_latency=0)), 'offline-sink', 0, 'Hoja 1')
+        self.calls = []
+
+    def batch_update(self, data, **kwargs):
+        self.calls.append(('batch_update', [item['range'] for item in data],
+                           sum(len(row) for item in data for row in item['values'])))
+        return super().batch_update(data, **kwargs)
+
+    def batch_clear(self, ranges):
+        self.calls.append(('batch_clear', list(ranges)))
+        return super().batch_clear(ranges)
+
+    def clear(self):
+        self.calls.append(('clear',))
+        return super().clear()
+
+
+def _frame(n_rows=10):
+    return pd.DataFrame({
+        'keyword': [f"kw {i}" for i in range(n_rows)],
+        'value': list(range(1, n_rows + 1)),
+        'score': [i + 0.5 for i in range(n_rows)],
+    })
+
+
+def _contents(worksheet):
+    return worksheet.get_all_values(value_render_option='UNFORMATTED_VALUE')
+
+
+def _expected(df):
+    return [df.columns.tolist()] + df.values.tolist()
+
+
+@pytest.fixture(params=['sin_huella', 'con_huella'])
+def fingerprint_dir(request, tmp_path):
+    return str(tmp_path / 'fingerprints') if request.param == 'con_huella' else None
+
+
+def test_only_changed_rows_are_sent(fingerprint_dir):
+    worksheet = RecordingWorksheet()
+    df = _frame()
+    write_dataframe_incremental(worksheet, df, fingerprint_dir=fingerprint_dir)
+    worksheet.calls.clear()
+
+    changed = df.copy()
+    changed.loc[2, 'value'] = 99
+    changed.loc[[7, 8], 'keyword'] = ['otra 7', 'otra 8']
+    stats = write_dataframe_incremental(worksheet, changed, fingerprint_dir=fingerprint_dir)
+
+    # Fila 1 = encabezado: la fila i del DataFrame es la i + 2 de la hoja
+    assert worksheet.calls == [('batch_update', ['A4:C4', 'A9:C10'], 9)]
+    assert stats == {'written': 9, 'skipped': 24, 'requests': 1}
+    assert _contents(worksheet) == _expected(changed)
+
+
+def test_unchanged_frame_sends_nothing(fingerprint_dir):
+    worksheet = RecordingWorksheet()
+    write_dataframe_incremental(worksheet, _frame(), fingerprint_dir=fingerprint_dir)
+    worksheet.calls.clear()
+
+    stats = write_dataframe_incremental(worksheet, _frame(), fingerprint_dir=fingerprint_dir)
+
+    assert worksheet.calls == []
+    assert stats['requests'] == 0
+
+
+def test_trailing_rows_are_cleared(fingerprint_dir):
+    worksheet = RecordingWorksheet()
+    write_dataframe_incremental(worksheet, _frame(10), fingerprint_dir=fingerprint_dir)
+    worksheet.calls.clear()
+
+    write_dataframe_incremental(worksheet, _frame(6), fingerprint_dir=fingerprint_dir)
+
+    assert worksheet.calls == [('batch_clear', ['A8:C11'])]
+    assert _contents(worksheet) == _expected(_frame(6))
+
+
+def test_narrower_frame_rewrites_the_sheet(fingerprint_dir):
+    worksheet = RecordingWorksheet()
+    write_dataframe_incremental(worksheet, _frame(), fingerprint_dir=fingerprint_dir)
+    worksheet.calls.clear()
+
+    narrower = _frame().drop(columns='score')
+    write_dataframe_incremental(worksheet, narrower, fingerprint_dir=fingerprint_dir)
+
+    assert worksheet.calls[0] == ('clear',)
+    assert worksheet.calls[1][0] == 'batch_update'
+    assert _contents(worksheet) == _expected(narrower)
+
+
+def test_requests_are_split_at_the_cell_limit():
+    worksheet = RecordingWorksheet()
+    df = _frame(100)
+
+    stats = write_dataframe_incremental(worksheet, df, max_cells_per_request=60)
+
+    # 101 filas de 3 celdas: bloques de 20 filas (60 celdas) en peticiones separadas
+    assert stats['requests'] == 6
+    assert all(cells <= 60 for _, _, cells in worksheet.calls)
+    assert sum(cells for _, _, cells in worksheet.calls) == 303
+    assert _contents(worksheet) == _expected(df)
+
+
+def test_failed_write_invalidates_the_fingerprint(tmp_path, monkeypatch):
+    worksheet = RecordingWorksheet()
+    fingerprint_dir = str(tmp_path / 'fingerprints')
+    write_dataframe_incremental(worksheet, _frame(), fingerprint_dir=fingerprint_dir)
+    assert len(os.listdir(fingerprint_dir)) == 1
+
+    changed = _frame()
+    changed.loc[0, 'value'] = 99
+
+    def failing_update(data, **kwargs):
+        raise RuntimeError("fallo simulado")
+
+    monkeypatch.setattr(worksheet, 'batch_update', failing_update)
+    with pytest.raises(RuntimeError):
+        write_dataframe_incremental(worksheet, changed, fingerprint_dir=fingerprint_dir)
+    assert os.listdir(fingerprint_dir) == []
+
+    # Sin huella se lee la hoja, que sigue con la versión anterior, y se reenvía el cambio
+    monkeypatch.undo()
+    worksheet.calls.clear()
+    write_dataframe_incremental(worksheet, changed, fingerprint_dir=fingerprint_dir)
+    assert worksheet.calls == [('batch_update', ['A2:C2'], 3)]
+    assert _contents(worksheet) == _expected(changed)
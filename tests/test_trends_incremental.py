@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from utils.offline import _timeframe_dates, synthetic_interest
+from utils.trends_incremental import TrendsSeriesStore, fetch_incremental
+
+NOW = datetime(2024, 6, 30, 15)
+CHUNK = ['kw uno', 'kw dos']
+
+
+def _fetch_at(now):
+    """Descarga simulada como FakeTrendReq, pero en un instante fijo."""
+    def _fetch(timeframe):
+        dates = _timeframe_dates(timeframe, now)
+        frame = pd.DataFrame({kw: synthetic_interest(kw, 'MX', dates) for kw in CHUNK}, index=dates)
+        frame = (100 * frame / frame.to_numpy().max()).round().astype('int64')
+        result = frame.reset_index().melt(id_vars=['date'], var_name='keyword', value_name='interest')
+        result['country'] = 'Mexico'
+        result['timeframe'] = timeframe
+        return result
+    return _fetch
+
+
+def _store(tmp_path, timeframe, now):
+    store = TrendsSeriesStore(str(tmp_path / 'series.pkl'))
+    store.update(_fetch_at(now)(timeframe))
+    return store
+
+
+def test_stitched_window_matches_full_fetch(tmp_path):
+    for timeframe, gap in (('now 7-d', timedelta(hours=20)), ('today 1-m', timedelta(days=3))):
+        store = _store(tmp_path, timeframe, NOW - gap)
+        stitched = fetch_incremental(CHUNK, 'Mexico', timeframe, store, _fetch_at(NOW), now=NOW)
+        full = _fetch_at(NOW)(timeframe)
+
+        assert len(stitched) == len(full)
+        for kw in CHUNK:
+            assert list(stitched.loc[stitched['keyword'] == kw, 'date']) == \
+                list(full.loc[full['keyword'] == kw, 'date'])
+
+
+def _long(series_by_keyword, timeframe='now 7-d'):
+    frames = [pd.DataFrame({'date': serie.index, 'keyword': kw, 'interest': serie.values})
+              for kw, serie in series_by_keyword.items()]
+    result = pd.concat(frames, ignore_index=True)
+    result['country'] = 'Mexico'
+    result['timeframe'] = timeframe
+    return result
+
+
+def test_payload_is_renormalized_with_a_single_factor(tmp_path):
+    dates = pd.date_range(NOW - timedelta(days=7), NOW - timedelta(hours=10), freq='h')
+    old = {'kw uno': pd.Series(60.0, index=dates), 'kw dos': pd.Series(20.0, index=dates)}
+    store = TrendsSeriesStore(str(tmp_path / 'series.pkl'))
+    store.update(_long(old))
+
+    # La delta está en otra escala (x0.5) y al final 'kw uno' se dispara por encima del máximo guardado
+    new_dates = pd.date_range(NOW - timedelta(days=2, hours=10), NOW, freq='h')
+    new_uno = pd.Series(30.0, index=new_dates)
+    new_uno.iloc[-5:] = 100.0
+    new = {'kw uno': new_uno, 'kw dos': pd.Series(10.0, index=new_dates)}
+
+    stitched = fetch_incremental(CHUNK, 'Mexico', 'now 7-d', store, lambda tf: _long(new, tf), now=NOW)
+    uno = stitched[stitched['keyword'] == 'kw uno'].set_index('date')['interest']
+    dos = stitched[stitched['keyword'] == 'kw dos'].set_index('date')['interest']
+
+    assert uno.max() == 100
+    # Las dos series comparten el factor (0.5): 'kw dos' sigue valiendo un tercio de 'kw uno'
+    assert (uno.iloc[:24] == 3 * dos.iloc[:24]).all()
+    assert (dos == 10).all()
+
+
+def test_partial_last_point_is_not_used_as_anchor(tmp_path):
+    dates = pd.date_range(NOW - timedelta(days=7), NOW - timedelta(hours=10), freq='h')
+    old_uno = pd.Series(40.0, index=dates)
+    # El último punto guardado era parcial (incompleto) cuando se descargó
+    old_uno.iloc[-1] = 4.0
+    store = TrendsSeriesStore(str(tmp_path / 'series.pkl'))
+    store.update(_long({'kw uno': old_uno, 'kw dos': pd.Series(40.0, index=dates)}))
+
+    new_dates = pd.date_range(NOW - timedelta(days=2, hours=10), NOW, freq='h')
+    new = {kw: pd.Series(80.0, index=new_dates) for kw in CHUNK}
+
+    stitched = fetch_incremental(CHUNK, 'Mexico', 'now 7-d', store, lambda tf: _long(new, tf), now=NOW)
+    assert (stitched['interest'] == 40).all()
@@ -0,0 +1,33 @@
+import pandas as pd
+
+from utils.trends_planner import align_to_anchor, plan_payloads
+
+COUNTRIES = {'Mexico': {'geo': 'MX', 'pn': 'mexico'}}
+
+
+def _payload(values, timeframe='now 7-d'):
+    """Payload largo con una fila por (fecha, keyword) a partir de {keyword: [interés, ...]}."""
+    dates = pd.date_range('2024-06-01', periods=len(next(iter(values.values()))), freq='D')
+    frame = pd.DataFrame(values, index=dates).rename_axis('date')
+    result = frame.reset_index().melt(id_vars=['date'], var_name='keyword', value_name='interest')
+    result['country'] = 'Mexico'
+    result['timeframe'] = timeframe
+    return result
+
+
+def test_aligned_payloads_keep_integer_interest():
+    keywords = [(f"kw {i}", 'Mexico') for i in range(9)]
+    tasks, anchors, stats = plan_payloads(keywords, COUNTRIES, ['now 7-d'])
+    assert [len(chunk) for chunk, *_ in tasks] == [5, 5]
+    assert stats['saved_calls'] == stats['naive_calls'] - 2
+
+    first = _payload({kw: [40, 60, 80] for kw in tasks[0][0]})
+    # El ancla vale un tercio en el segundo bloque: el resto se multiplica por 3
+    second = _payload({kw: [10, 20, 30] if kw == anchors['Mexico'] else [7, 8, 9] for kw in tasks[1][0]})
+
+    aligned = align_to_anchor(tasks, [first, second], anchors)
+
+    combined = pd.concat(aligned, ignore_index=True)
+    assert pd.api.types.is_integer_dtype(combined['interest'])
+    assert anchors['Mexico'] not in set(aligned[1]['keyword'])
+    assert sorted(set(aligned[1]['interest'])) == [21, 24, 27]
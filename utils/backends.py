@@ -0,0 +1,171 @@
+# utils/backends.py
+"""
+Backends de DataFrame para utils.preprocess_keys.
+
+El backend 'pandas' es la implementación de referencia. El backend 'polars' usa el
+motor lazy y multihilo de Polars (si está instalado) para las agregaciones pesadas;
+la entrada y la salida siguen siendo DataFrames de pandas.
+"""
+
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.schema import ensure_datetime, ensure_numeric
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('pandas', 'polars')
+
+# Polars es opcional y tarda en cargarse: se importa al usar su backend (ver load_polars)
+pl = None
+
+
+def load_polars():
+    """Importa Polars la primera vez que se necesita; retorna el módulo o None si no está instalado."""
+    global pl
+    if pl is None:
+        try:
+            import polars
+        except ImportError:
+            return None
+        pl = polars
+    return pl
+
+
+def resolve_backend(backend=None):
+    """
+    Retorna el backend a usar: el indicado, o el de la variable de entorno
+    PREPROCESS_BACKEND, o 'pandas'. Si se pide 'polars' y no está instalado,
+    se usa 'pandas' con una advertencia.
+    """
+    backend = (backend or os.environ.get('PREPROCESS_BACKEND') or 'pandas').lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend '{backend}' no soportado. Opciones: {BACKENDS}")
+    if backend == 'polars' and load_polars() is None:
+        logger.warning("Polars no está instalado; se usará el backend pandas.")
+        return 'pandas'
+    return backend
+
+
+def _to_polars(df, text_columns):
+    """
+    Convierte a Polars con las columnas de texto/categóricas como cadenas. Las filas
+    con nulos en esas columnas se descartan, igual que las claves nulas en groupby.
+    """
+    df = df.dropna(subset=text_columns)
+    for column in text_columns:
+        df[column] = df[column].astype(str)
+    return pl.from_pandas(df, nan_to_null=True)
+
+
+def _restore_categories(result, source, columns):
+    """Devuelve a categóricas las columnas que lo eran en el DataFrame de entrada."""
+    for column in columns:
+        if isinstance(source[column].dtype, pd.CategoricalDtype):
+            result[column] = pd.Categorical(result[column], categories=source[column].cat.categories)
+    return result
+
+
+def calculate_daily_stats_polars(df):
+    """Equivalente en Polars de preprocess_keys.calculate_daily_stats."""
+    load_polars()
+    data = pd.DataFrame({
+        'date': ensure_datetime(df['date']),
+        'keyword': df['keyword'],
+        'country': df['country'],
+        'interest': ensure_numeric(df['interest']).astype('float64'),
+    })
+    daily_stats = (
+        _to_polars(data, ['keyword', 'country'])
+        .lazy()
+        .with_columns(pl.col('date').dt.truncate('1d').alias('day'))
+        .group_by(['day', 'keyword', 'country'])
+        .agg(
+            pl.col('interest').max().alias('max_interest'),
+            pl.col('interest').min().alias('min_interest'),
+            pl.col('interest').mean().alias('mean_interest'),
+            pl.col('interest').median().alias('median_interest'),
+            pl.col('interest').std(ddof=1).alias('std_interest'),
+        )
+        .filter(pl.col('day').is_not_null())
+        .sort(['day', 'keyword', 'country'])
+        .collect()
+        .to_pandas()
+    )
+    return _restore_categories(daily_stats, df, ['keyword', 'country'])
+
+
+def calcular_scores_polars(df, metrics, w_daily, w_weekly, w_monthly, decay_base, offset=0.0):
+    """
+    Scores diario, semanal y mensual por (country, keyword) para cada métrica, con
+    la misma definición que preprocess_keys._calcular_scores (offset=1 reproduce la
+    fórmula log1p(x + 1) de obtener_top_por_modo). Retorna un DataFrame de pandas
+    ordenado por (country, keyword) con columnas 'country', 'keyword' y
+    (score_daily|score_weekly|score_monthly, métrica).
+    """
+    load_polars()
+    data = pd.DataFrame({
+        'day': ensure_datetime(df['day'], errors='coerce'),
+        'keyword': df['keyword'],
+        'country': df['country'],
+    })
+    for i, metric in enumerate(metrics):
+        data[f"m{i}"] = ensure_numeric(df[metric]).fillna(0).astype('float64')
+
+    keys = ['country', 'keyword']
+    max_day = pl.col('day').max().over(keys)
+    days_diff = (max_day - pl.col('day')).dt.total_days()
+    last_week = pl.col('day') >= max_day - pl.duration(days=6)
+    last_month = pl.col('day') >= max_day - pl.duration(days=29)
+
+    aggregations = []
+    for i in range(len(metrics)):
+        x = pl.col(f"m{i}")
+        aggregations += [
+            (w_daily * (x + offset).clip(lower_bound=0).log1p() * pl.lit(decay_base) ** days_diff)
+            .sum().alias(f"daily{i}"),
+            pl.when(last_week).then(x).mean().alias(f"wi{i}"),
+            pl.when(~last_week).then(x).mean().alias(f"wo{i}"),
+            pl.when(last_month).then(x).mean().alias(f"mi{i}"),
+            pl.when(~last_month).then(x).mean().alias(f"mo{i}"),
+        ]
+
+    scores = (
+        _to_polars(data, keys)
+        .lazy()
+        .filter(pl.col('day').is_not_null())
+        .group_by(keys)
+        .agg(aggregations)
+        .sort(keys)
+        .collect()
+        .to_pandas()
+    )
+
+    result = scores[keys].copy()
+    for i, metric in enumerate(metrics):
+        means = scores[[f"wi{i}", f"wo{i}", f"mi{i}", f"mo{i}"]].fillna(0).to_numpy()
+        result[('score_daily', metric)] = scores[f"daily{i}"].to_numpy(dtype='float64')
+        result[('score_weekly', metric)] = w_weekly * (means[:, 0] - means[:, 1])
+        result[('score_monthly', metric)] = w_monthly * (means[:, 2] - means[:, 3])
+    return _restore_categories(result, df, keys)
+
+
+def frames_equivalent(left, right, rtol=1e-9, atol=1e-9):
+    """
+    Compara dos DataFrames de resultados (mismas columnas, mismo orden de filas)
+    tolerando diferencias de redondeo en flotantes y de tipo categórico/objeto.
+    """
+    if list(left.columns) != list(right.columns) or len(left) != len(right):
+        return False
+    for column in left.columns:
+        a, b = left[column].reset_index(drop=True), right[column].reset_index(drop=True)
+        if pd.api.types.is_float_dtype(a) or pd.api.types.is_float_dtype(b):
+            if not np.allclose(a.to_numpy(dtype='float64'), b.to_numpy(dtype='float64'),
+                               rtol=rtol, atol=atol, equal_nan=True):
+                return False
+        elif not a.astype(object).equals(b.astype(object)):
+            return False
+    return True
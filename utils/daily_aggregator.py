@@ -0,0 +1,203 @@
+# utils/daily_aggregator.py
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from utils.schema import ensure_datetime, ensure_numeric
+
+logger = logging.getLogger(__name__)
+
+KEYS = ['day', 'keyword', 'country']
+DAILY_STATS_COLUMNS = KEYS + ['max_interest', 'min_interest', 'mean_interest',
+                              'median_interest', 'std_interest']
+
+
+class DailyStatsAggregator:
+    """
+    Agregación diaria por (day, keyword, country) que se alimenta snapshot a
+    snapshot, sin concatenar los datos crudos.
+
+    Por grupo se guarda un estado combinable: count, sum, M2 (suma de cuadrados de
+    las desviaciones, combinada con la fórmula de Chan para no perder precisión),
+    max y min; y para la mediana un histograma de valores (valor -> número de
+    apariciones). El interés de Google Trends toma pocos valores distintos (0-100)
+    y los snapshots repiten las mismas lecturas, así que el histograma es exacto y
+    pequeño; con resolution (p. ej. 0.5) los valores se redondean a esa resolución
+    y la mediana pasa a ser aproximada, con un número de celdas por grupo acotado.
+
+    result() retorna las mismas columnas y el mismo orden que
+    preprocess_keys.calculate_daily_stats sobre la concatenación de todos los
+    snapshots, y la memoria depende del número de grupos, no de filas.
+    """
+
+    def __init__(self, resolution=None):
+        self.resolution = resolution
+        self.rows = 0
+        self._groups = None          # MultiIndex (day, keyword, country); posición = id de grupo
+        self._count = np.zeros(0)
+        self._sum = np.zeros(0)
+        self._m2 = np.zeros(0)
+        self._max = np.zeros(0)
+        self._min = np.zeros(0)
+        self._hist = []              # bloques (gid, value, n); se compactan al crecer
+        self._hist_rows = 0
+        self._compacted_rows = 0
+        self._categories = {}
+
+    def update(self, df):
+        """Incorpora un snapshot con columnas date, keyword, country e interest."""
+        if df is None or df.empty:
+            return self
+        data = pd.DataFrame({
+            'day': ensure_datetime(df['date']).dt.normalize(),
+            'keyword': df['keyword'],
+            'country': df['country'],
+            'interest': ensure_numeric(df['interest']).astype('float64'),
+        })
+        # Las claves se guardan como texto; las categorías se restauran en result()
+        for column in ['keyword', 'country']:
+            if isinstance(data[column].dtype, pd.CategoricalDtype):
+                self._categories.setdefault(column, set()).update(data[column].cat.categories)
+                data[column] = data[column].astype(object)
+        data = data.dropna(subset=KEYS)
+        if data.empty:
+            return self
+        self.rows += len(data)
+
+        # Id local de cada fila y sus claves; luego id global en el registro de grupos
+        local_ids = data.groupby(KEYS, sort=False).ngroup().to_numpy()
+        _, first_rows = np.unique(local_ids, return_index=True)
+        keys = pd.MultiIndex.from_frame(data[KEYS].iloc[first_rows])
+        values = data['interest'].to_numpy()
+        valid = ~np.isnan(values)
+        x = np.where(valid, values, 0.0)
+        n_local = len(keys)
+
+        count = np.bincount(local_ids, weights=valid, minlength=n_local)
+        total = np.bincount(local_ids, weights=x, minlength=n_local)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = total / count
+        deviations = np.where(valid, (x - mean[local_ids]) ** 2, 0.0)
+        m2 = np.bincount(local_ids, weights=deviations, minlength=n_local)
+        grouped = pd.Series(values).groupby(local_ids)
+        maximum = grouped.max().reindex(range(n_local)).to_numpy()
+        minimum = grouped.min().reindex(range(n_local)).to_numpy()
+
+        gids = self._register(keys)
+        self._merge(gids, count, total, m2, maximum, minimum)
+
+        hist_values = values[valid]
+        if self.resolution:
+            hist_values = np.round(hist_values / self.resolution) * self.resolution
+        self._add_hist(pd.DataFrame({'gid': gids[local_ids[valid]], 'value': hist_values, 'n': 1}))
+        return self
+
+    def merge(self, other):
+        """Combina el estado de otro agregador (p. ej. de otro hilo o proceso)."""
+        if other._groups is None:
+            return self
+        self.rows += other.rows
+        for column, categories in other._categories.items():
+            self._categories.setdefault(column, set()).update(categories)
+        gids = self._register(other._groups)
+        self._merge(gids, other._count, other._sum, other._m2, other._max, other._min)
+        hist = other._compact_hist()
+        self._add_hist(hist.assign(gid=gids[hist['gid'].to_numpy()]))
+        return self
+
+    def _register(self, keys):
+        """Retorna el id global de cada clave, registrando las nuevas."""
+        if self._groups is None:
+            self._groups = keys
+            self._grow(len(keys))
+            return np.arange(len(keys))
+        gids = self._groups.get_indexer(keys)
+        new = gids < 0
+        if new.any():
+            gids[new] = np.arange(len(self._groups), len(self._groups) + new.sum())
+            self._groups = self._groups.append(keys[new])
+            self._grow(new.sum())
+        return gids
+
+    def _grow(self, n):
+        self._count = np.concatenate([self._count, np.zeros(n)])
+        self._sum = np.concatenate([self._sum, np.zeros(n)])
+        self._m2 = np.concatenate([self._m2, np.zeros(n)])
+        self._max = np.concatenate([self._max, np.full(n, np.nan)])
+        self._min = np.concatenate([self._min, np.full(n, np.nan)])
+
+    def _merge(self, gids, count, total, m2, maximum, minimum):
+        na, sa = self._count[gids], self._sum[gids]
+        n = na + count
+        both = (na > 0) & (count > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = total / count - sa / na
+            correction = np.where(both, delta ** 2 * na * count / n, 0.0)
+        self._count[gids] = n
+        self._sum[gids] = sa + total
+        self._m2[gids] += m2 + correction
+        self._max[gids] = np.fmax(self._max[gids], maximum)
+        self._min[gids] = np.fmin(self._min[gids], minimum)
+
+    def _add_hist(self, block):
+        self._hist.append(block)
+        self._hist_rows += len(block)
+        # Compactación amortizada: cuando lo pendiente supera a lo ya compactado
+        if self._hist_rows > 2 * max(self._compacted_rows, 1024):
+            self._compact_hist()
+
+    def _compact_hist(self):
+        if not self._hist:
+            return pd.DataFrame({'gid': np.zeros(0, dtype='int64'), 'value': np.zeros(0), 'n': np.zeros(0, dtype='int64')})
+        if len(self._hist) > 1:
+            hist = pd.concat(self._hist, ignore_index=True)
+            hist = hist.groupby(['gid', 'value'], sort=False, as_index=False)['n'].sum()
+            self._hist = [hist]
+            self._hist_rows = self._compacted_rows = len(hist)
+        return self._hist[0]
+
+    def _median(self):
+        """Mediana de cada grupo a partir del histograma (media de los dos centrales si n es par)."""
+        median = np.full(len(self._groups), np.nan)
+        hist = self._compact_hist()
+        if hist.empty:
+            return median
+        order = np.lexsort((hist['value'].to_numpy(), hist['gid'].to_numpy()))
+        gids = hist['gid'].to_numpy()[order]
+        values = hist['value'].to_numpy()[order]
+        cumulative = np.cumsum(hist['n'].to_numpy()[order])
+
+        present = np.unique(gids)
+        n = np.bincount(gids, weights=hist['n'].to_numpy()[order], minlength=len(self._groups))[present].astype('int64')
+        starts = np.cumsum(n) - n
+        lower = np.searchsorted(cumulative, starts + (n - 1) // 2, side='right')
+        upper = np.searchsorted(cumulative, starts + n // 2, side='right')
+        median[present] = (values[lower] + values[upper]) / 2
+        return median
+
+    def result(self):
+        """Retorna el DataFrame de estadísticas diarias (mismas columnas que calculate_daily_stats)."""
+        if self._groups is None:
+            return pd.DataFrame(columns=DAILY_STATS_COLUMNS)
+
+        count = self._count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(count > 0, self._sum / count, np.nan)
+            std = np.where(count > 1, np.sqrt(np.maximum(self._m2, 0) / (count - 1)), np.nan)
+
+        daily_stats = self._groups.to_frame(index=False, name=KEYS)
+        daily_stats['max_interest'] = self._max
+        daily_stats['min_interest'] = self._min
+        daily_stats['mean_interest'] = mean
+        daily_stats['median_interest'] = self._median()
+        daily_stats['std_interest'] = std
+        daily_stats = daily_stats.sort_values(KEYS, ignore_index=True)
+
+        for column, categories in self._categories.items():
+            categories = categories | set(daily_stats[column].unique())
+            daily_stats[column] = pd.Categorical(daily_stats[column], categories=sorted(categories, key=str))
+
+        logger.info(f"Agregación diaria: {self.rows} filas en {len(daily_stats)} grupos.")
+        return daily_stats[DAILY_STATS_COLUMNS]
@@ -0,0 +1,109 @@
+# utils/google_clients.py
+
+import logging
+import os
+import threading
+
+import gspread
+import httplib2
+from google.auth.transport.requests import AuthorizedSession
+from google.oauth2.service_account import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+SCOPES = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class GoogleClients:
+    """
+    Clientes autenticados de Google (Drive, Sheets y gspread) que comparten unas
+    mismas credenciales.
+
+    - El cliente de gspread (atributo gspread) usa una única sesión HTTP con pool
+      de conexiones y keep-alive para todas las hojas. requests.Session no es
+      seguro entre hilos, así que el código concurrente usa gspread_client(), que
+      crea un cliente con su propia sesión por hilo.
+    - Los servicios de googleapiclient (Drive y Sheets v4) no son seguros entre
+      hilos, así que se crea uno por hilo, cada uno con su conexión persistente.
+    - El token se comparte entre todos ellos y sólo se renueva cuando expira
+      (google-auth lo comprueba antes de cada petición).
+    """
+
+    def __init__(self, credentials, pool_size=10):
+        self.credentials = credentials
+        self.session = AuthorizedSession(credentials)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.gspread = gspread.authorize(None, session=self.session)
+        self.pool_size = pool_size
+        self._local = threading.local()
+
+    def _service(self, name, version):
+        services = self._local.__dict__.setdefault('services', {})
+        if (name, version) not in services:
+            http = AuthorizedHttp(self.credentials, http=httplib2.Http())
+            services[(name, version)] = build(name, version, http=http, cache_discovery=False)
+        return services[(name, version)]
+
+    def drive(self):
+        """Servicio de Drive v3 del hilo actual."""
+        return self._service('drive', 'v3')
+
+    def sheets(self):
+        """Servicio de Sheets v4 del hilo actual."""
+        return self._service('sheets', 'v4')
+
+    def gspread_client(self):
+        """Cliente de gspread del hilo actual, con su propia sesión HTTP persistente."""
+        if 'gspread' not in self._local.__dict__:
+            session = AuthorizedSession(self.credentials)
+            session.mount('https://', HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size))
+            self._local.gspread = gspread.authorize(None, session=session)
+        return self._local.gspread
+
+
+def get_google_clients(creds_file=None, creds_info=None):
+    """
+    Retorna los clientes compartidos para unas credenciales de cuenta de servicio,
+    dadas como archivo JSON (creds_file) o como dict (creds_info). La primera
+    llamada los crea; las siguientes reutilizan los mismos en todo el proceso.
+
+    Con GOOGLE_OFFLINE=1 se retornan los sustitutos locales de utils.offline y las
+    credenciales no se leen.
+    """
+    # Importación diferida: importar este módulo no carga los sustitutos de utils.offline
+    from utils.offline import FakeGoogleClients, offline_enabled
+
+    if offline_enabled():
+        with _registry_lock:
+            if 'offline' not in _registry:
+                _registry['offline'] = FakeGoogleClients()
+                logger.info("GOOGLE_OFFLINE activo: se usan los sustitutos locales de Drive y Sheets.")
+            return _registry['offline']
+
+    if creds_file:
+        key = ('file', os.path.abspath(creds_file))
+    elif creds_info:
+        key = ('info', creds_info.get('client_email'), creds_info.get('private_key_id'))
+    else:
+        raise ValueError("Se necesita creds_file o creds_info para autenticar con Google.")
+
+    with _registry_lock:
+        if key not in _registry:
+            if creds_file:
+                credentials = Credentials.from_service_account_file(creds_file, scopes=SCOPES)
+            else:
+                credentials = Credentials.from_service_account_info(creds_info, scopes=SCOPES)
+            _registry[key] = GoogleClients(credentials)
+            logger.info(f"Clientes de Google creados para {credentials.service_account_email}.")
+        return _registry[key]
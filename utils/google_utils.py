@@ -6,20 +6,22 @@ import pandas as pd
 import numpy as np
 import gspread
 import traceback
-from googleapiclient.discovery import build
-from oauth2client.service_account import ServiceAccountCredentials
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from gspread.utils import fill_gaps
 from datetime import datetime, timedelta
 
+from utils.google_clients import get_google_clients
+from utils.metrics import metrics
+from utils.rate_limit import RateLimiter
+from utils.schema import apply_schema, concat_with_schema
+from utils.sheets_sink import write_dataframe_incremental
+from utils.snapshot_cache import SnapshotCache
+
 logger = logging.getLogger(__name__)
 
 def authenticate_google_services(creds_file):
-    scope = [
-        "https://spreadsheets.google.com/feeds",
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive",
-    ]
-    credentials = ServiceAccountCredentials.from_json_keyfile_name(creds_file, scope)
-    return credentials
+    # Credenciales compartidas del registro de clientes (ver utils.google_clients)
+    return get_google_clients(creds_file).credentials
 
 def parse_timestamp_from_name(name):
     try:
@@ -28,60 +30,230 @@ def parse_timestamp_from_name(name):
     except:
         return None
 
-def get_sheets_data_from_folder(folder_id, creds_file, days=30, max_files=60, sleep_seconds=2):
+def list_folder_files(drive_service, folder_id, modified_after=None, page_size=1000):
+    """
+    Lista los archivos no eliminados de una carpeta de Drive recorriendo todas las
+    páginas de resultados. Sólo pide los campos id, name y modifiedTime, y si se
+    pasa modified_after (datetime UTC) el filtro por fecha se aplica en el servidor.
+    """
+    query = f"'{folder_id}' in parents and trashed = false"
+    if modified_after is not None:
+        query += f" and modifiedTime > '{modified_after.strftime('%Y-%m-%dT%H:%M:%S')}'"
+
+    files = []
+    page_token = None
+    while True:
+        metrics.incr('drive.api_calls')
+        results = drive_service.files().list(
+            q=query,
+            fields="nextPageToken, files(id, name, modifiedTime)",
+            pageSize=page_size,
+            pageToken=page_token
+        ).execute()
+        files.extend(results.get('files', []))
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+    return files
+
+def dedupe_timestamps(file_timestamps, max_files, min_gap_seconds=1800):
+    """
+    Recorre los archivos del más reciente al más antiguo y conserva uno por cada
+    ventana de min_gap_seconds. Al ir en orden, basta con comparar contra el último
+    archivo conservado, que es el más cercano de los ya aceptados.
+    """
+    filtered_files = []
+    last_ts = None
+    for f, ts in sorted(file_timestamps, key=lambda x: x[1], reverse=True):
+        if last_ts is None or (last_ts - ts).total_seconds() > min_gap_seconds:
+            filtered_files.append(f)
+            last_ts = ts
+            if len(filtered_files) >= max_files:
+                break
+    return filtered_files
+
+def _read_first_sheet_values(sheets_service, spreadsheet_id):
+    """
+    Lee todos los valores de la primera hoja visible de un spreadsheet con una
+    sola llamada a values.batchGet (un rango sin nombre de hoja apunta a la
+    primera hoja). Las filas se rellenan igual que Worksheet.get_all_values.
+    """
+    metrics.incr('sheets.read_calls')
+    response = sheets_service.spreadsheets().values().batchGet(
+        spreadsheetId=spreadsheet_id,
+        ranges=['A:ZZZ'],
+        majorDimension='ROWS'
+    ).execute()
+    values = response.get('valueRanges', [{}])[0].get('values', [[]])
+    return fill_gaps(values)
+
+def _rate_limiter_for(clients, requests_per_second):
+    """
+    RateLimiter para las llamadas de `clients`: requests_per_second, salvo que los
+    clientes fijen su propio límite (los sustitutos de utils.offline no tienen
+    cuota y no deben esperar como la API real).
+    """
+    return RateLimiter(getattr(clients, 'requests_per_second', None) or requests_per_second)
+
+
+def _read_files_concurrently(clients, files, max_workers=4, requests_per_second=1.0):
+    """
+    Lee los archivos con un pool acotado de hilos bajo un límite global de
+    llamadas por segundo. Cada hilo usa su propio servicio de Sheets
+    (clients.sheets()), ya que el cliente HTTP de googleapiclient no es seguro
+    entre hilos.
+    Genera pares (file, data) a medida que termina cada lectura (no en el orden de
+    `files`), para poder procesar un archivo mientras se descargan los demás; data
+    es None si hubo error.
+    """
+    limiter = _rate_limiter_for(clients, requests_per_second)
+
+    def _read(file):
+        try:
+            limiter.acquire()
+            return file, _read_first_sheet_values(clients.sheets(), file['id'])
+        except Exception as e:
+            logger.error(f"Error leyendo {file['name']}: {str(e)}")
+            metrics.incr('sheets.read_errors')
+            return file, None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_read, file) for file in files]
+        for future in as_completed(futures):
+            yield future.result()
+
+def get_sheets_data_from_folder(folder_id, creds_file, days=30, max_files=60, sleep_seconds=2,
+                                concurrent=False, max_workers=4, requests_per_second=1.0, cache_dir=None,
+                                schema=None, aggregator=None, clients=None):
     """
     Obtiene datos filtrados por fecha y limita el número de archivos
     a leer en una carpeta de Google Drive (cada archivo es una Google Sheet).
+
+    Con concurrent=True los archivos se leen en paralelo (max_workers hilos), con
+    una llamada values.batchGet por archivo y un límite global de
+    requests_per_second en lugar de la pausa fija de sleep_seconds.
+
+    Si se pasa cache_dir, cada snapshot se guarda en Parquet bajo (id, modifiedTime)
+    y en las siguientes ejecuciones sólo se descargan los que no estén en caché; los
+    snapshots fuera de la ventana de `days` se eliminan de la caché.
+
+    Si se pasa schema (p. ej. utils.schema.SNAPSHOT_SCHEMA), cada snapshot se tipa
+    al leerse (fechas, categorías, numéricos) y el resultado conserva esos tipos.
+
+    Si se pasa aggregator (utils.daily_aggregator.DailyStatsAggregator), cada
+    snapshot se agrega por día al llegar y no se conserva en memoria; la función
+    retorna entonces aggregator.result() (estadísticas diarias) en lugar de la
+    concatenación de los snapshots.
+
+    clients son los clientes autenticados compartidos (utils.google_clients); si no
+    se pasan se toman del registro para creds_file.
     """
-    credentials = authenticate_google_services(creds_file)
-    drive_service = build("drive", "v3", credentials=credentials)
+    clients = clients or get_google_clients(creds_file)
+    drive_service = clients.drive()
 
     logger.info(f"Buscando archivos en folder_id={folder_id} ...")
-    query = f"'{folder_id}' in parents"
-    results = drive_service.files().list(q=query).execute()
-    files = results.get('files', [])
+    # Filtro por fecha en el servidor, con un día de margen sobre la ventana. La
+    # ventana se cuenta desde el snapshot más reciente, no desde ahora: si el más
+    # reciente tiene más de un día (o no hay ninguno con timestamp), el filtro podría
+    # dejar fuera archivos de la ventana y se lista la carpeta completa.
+    now = datetime.utcnow()
+    modified_after = now - timedelta(days=days + 1)
+    files = list_folder_files(drive_service, folder_id, modified_after=modified_after)
+    timestamps = [ts for ts in (parse_timestamp_from_name(f['name']) for f in files) if ts is not None]
+    if not timestamps or max(timestamps) < now - timedelta(days=1):
+        files = list_folder_files(drive_service, folder_id)
+    logger.info(f"Encontrados {len(files)} archivos en la carpeta.")
     if not files:
         logger.warning("No se encontraron archivos en la carpeta de Drive.")
         return None
 
-    import gspread
-    client = gspread.authorize(credentials)
+    client = clients.gspread
 
     file_timestamps = [(f, parse_timestamp_from_name(f['name'])) for f in files]
     file_timestamps = [x for x in file_timestamps if x[1] is not None]
     if not file_timestamps:
         logger.warning("No se encontraron archivos con timestamp. Se procederá sin filtrar por fecha.")
         filtered_files = files[:max_files]
+        # Sin ventana por fecha: los snapshots seleccionados pueden ser de cualquier
+        # antigüedad, así que no se expulsa nada de la caché
+        cutoff_date = None
     else:
         max_ts = max(ts for _, ts in file_timestamps if ts is not None)
         cutoff_date = max_ts - timedelta(days=days)
         file_timestamps = [(f, ts) for (f, ts) in file_timestamps if ts >= cutoff_date]
 
-        processed_timestamps = []
-        filtered_files = []
-        for f, ts in sorted(file_timestamps, key=lambda x: x[1], reverse=True):
-            if all(abs((ts - t).total_seconds())>1800 for t in processed_timestamps):
-                filtered_files.append(f)
-                processed_timestamps.append(ts)
-            if len(filtered_files)>=max_files:
-                break
+        filtered_files = dedupe_timestamps(file_timestamps, max_files)
 
-    dataframes = []
-    for i, file in enumerate(filtered_files):
-        if i>0:
-            time.sleep(sleep_seconds)
-        try:
-            sheet = client.open_by_key(file['id'])
-            worksheet = sheet.get_worksheet(0)
-            data = worksheet.get_all_values()
-            df = pd.DataFrame(data[1:], columns=data[0])
-            dataframes.append(df)
-            logger.info(f"Leído archivo: {file['name']} con {df.shape[0]} filas.")
-        except Exception as e:
-            logger.error(f"Error leyendo {file['name']}: {str(e)}")
+    # Los snapshots ya guardados en la caché local no se vuelven a descargar
+    snapshot_cache = SnapshotCache(cache_dir) if cache_dir else None
+    frames = {}
+    to_download = filtered_files
+
+    def _keep(file, df):
+        # Con agregador, el snapshot se agrega y se descarta en vez de guardarse
+        if aggregator is not None:
+            aggregator.update(df)
+            frames[file['id']] = None
+        else:
+            frames[file['id']] = df
+
+    if snapshot_cache is not None:
+        to_download = []
+        for file in filtered_files:
+            df = snapshot_cache.get(file)
+            if df is None:
+                to_download.append(file)
+            else:
+                _keep(file, apply_schema(df, schema) if schema else df)
+        metrics.incr('snapshots.cache_hits', len(frames))
+        logger.info(f"{len(frames)} archivos leídos de caché, {len(to_download)} por descargar.")
+
+    def _store(file, data):
+        df = pd.DataFrame(data[1:], columns=data[0])
+        if schema:
+            df = apply_schema(df, schema)
+        if snapshot_cache is not None:
+            snapshot_cache.set(file, df)
+        _keep(file, df)
+        metrics.incr('snapshots.downloaded')
+        metrics.incr('snapshots.rows', len(df))
+        logger.info(f"Leído archivo: {file['name']} con {df.shape[0]} filas.")
+
+    if concurrent:
+        for file, data in _read_files_concurrently(clients, to_download, max_workers, requests_per_second):
+            if data is None:
+                continue
+            try:
+                _store(file, data)
+            except Exception as e:
+                logger.error(f"Error leyendo {file['name']}: {str(e)}")
+    else:
+        for i, file in enumerate(to_download):
+            if i>0:
+                time.sleep(sleep_seconds)
+            try:
+                sheet = client.open_by_key(file['id'])
+                worksheet = sheet.get_worksheet(0)
+                metrics.incr('sheets.read_calls')
+                data = worksheet.get_all_values()
+                _store(file, data)
+            except Exception as e:
+                logger.error(f"Error leyendo {file['name']}: {str(e)}")
+                metrics.incr('sheets.read_errors')
+
+    if snapshot_cache is not None and cutoff_date is not None:
+        # Misma ventana que la selección de archivos: no se expulsa nada que se vaya a usar
+        snapshot_cache.evict(cutoff_date)
 
+    if aggregator is not None:
+        if frames:
+            return aggregator.result()
+        logger.warning("No se pudieron leer archivos o no hay datos.")
+        return None
+
+    dataframes = [frames[f['id']] for f in filtered_files if f['id'] in frames]
     if dataframes:
-        combined_df = pd.concat(dataframes, ignore_index=True)
+        combined_df = concat_with_schema(dataframes) if schema else pd.concat(dataframes, ignore_index=True)
         return combined_df
     else:
         logger.warning("No se pudieron leer archivos o no hay datos.")
@@ -104,27 +276,41 @@ def sanitize_dataframe(df):
     # (Opcional, se podría omitir si no te hace falta la comprobación extra)
     return df_replaced
 
-def upload_dataframe_to_google_sheet(df, creds_file, spreadsheet_id, sheet_name='Sheet1'):
-    """
-    Sube un DataFrame de pandas a una hoja de cálculo de Google Sheets.
-    """
-    try:
-        df_sanitized = sanitize_dataframe(df)
-        credentials = authenticate_google_services(creds_file)
-        client = gspread.authorize(credentials)
+def _upload(df, client, spreadsheet_id, sheet_name, fingerprint_dir=None, limiter=None):
+    """Sube df a la hoja sheet_name (creándola si no existe); propaga los errores."""
+    acquire = limiter.acquire if limiter is not None else (lambda: None)
+    df_sanitized = sanitize_dataframe(df)
 
-        spreadsheet = client.open_by_key(spreadsheet_id)
+    acquire()
+    metrics.incr('sheets.meta_calls')
+    spreadsheet = client.open_by_key(spreadsheet_id)
 
-        # Selecciona worksheet
-        try:
-            sheet = spreadsheet.worksheet(sheet_name)
-        except gspread.exceptions.WorksheetNotFound:
-            sheet = spreadsheet.add_worksheet(title=sheet_name, rows="1000", cols="20")
+    # Selecciona worksheet
+    acquire()
+    metrics.incr('sheets.meta_calls')
+    try:
+        sheet = spreadsheet.worksheet(sheet_name)
+    except gspread.exceptions.WorksheetNotFound:
+        acquire()
+        metrics.incr('sheets.meta_calls')
+        sheet = spreadsheet.add_worksheet(title=sheet_name, rows="1000", cols="20")
+
+    write_dataframe_incremental(sheet, df_sanitized, fingerprint_dir=fingerprint_dir, limiter=limiter)
 
-        sheet.clear()
+def upload_dataframe_to_google_sheet(df, creds_file, spreadsheet_id, sheet_name='Sheet1', fingerprint_dir=None,
+                                     clients=None, limiter=None):
+    """
+    Sube un DataFrame de pandas a una hoja de cálculo de Google Sheets.
 
-        data = [df_sanitized.columns.values.tolist()] + df_sanitized.values.tolist()
-        sheet.update(data)
+    Sólo se escriben las filas que cambiaron respecto a la hoja actual (ver
+    utils.sheets_sink.write_dataframe_incremental); con fingerprint_dir la huella
+    de la hoja se guarda en disco y no hace falta leerla en la siguiente subida.
+    Usa los clientes compartidos (clients o los del registro para creds_file).
+    Con limiter (utils.rate_limit.RateLimiter) cada llamada a la API espera su turno.
+    """
+    try:
+        client = (clients or get_google_clients(creds_file)).gspread
+        _upload(df, client, spreadsheet_id, sheet_name, fingerprint_dir=fingerprint_dir, limiter=limiter)
 
         logging.info(f"Datos subidos correctamente a '{sheet_name}' en la hoja '{spreadsheet_id}'.")
         return True
@@ -134,3 +320,59 @@ def upload_dataframe_to_google_sheet(df, creds_file, spreadsheet_id, sheet_name=
         logging.error(traceback.format_exc())
         return False
 
+def publish_dataframes(tables, creds_file, fingerprint_dir=None, clients=None, max_workers=4,
+                       requests_per_second=1.0, retries=3, backoff_seconds=2.0):
+    """
+    Sube en paralelo varias tablas independientes a Google Sheets.
+
+    tables es una lista de tuplas (df, spreadsheet_id, sheet_name), cada una a una
+    hoja distinta. Cada tabla se serializa y sube en su propio hilo; todas las
+    llamadas a la API comparten un límite global de requests_per_second (o el de
+    los clientes, ver _rate_limiter_for). Si una subida falla se reintenta hasta
+    `retries` veces con espera creciente (backoff_seconds, 2*backoff_seconds, ...),
+    sin afectar a las demás.
+
+    Cada hilo usa su propio cliente de gspread (clients.gspread_client()), ya que
+    la sesión HTTP no es segura entre hilos.
+
+    Retorna un dict {(spreadsheet_id, sheet_name): {'ok', 'attempts', 'seconds', 'error'}}
+    en el orden de tables.
+    """
+    clients = clients or get_google_clients(creds_file)
+    limiter = _rate_limiter_for(clients, requests_per_second)
+
+    def _publish(table):
+        df, spreadsheet_id, sheet_name = table
+        client = clients.gspread_client()
+        start = time.monotonic()
+        error = None
+        for attempt in range(1, retries + 1):
+            try:
+                _upload(df, client, spreadsheet_id, sheet_name, fingerprint_dir=fingerprint_dir, limiter=limiter)
+                logger.info(f"Datos subidos correctamente a '{sheet_name}' en la hoja '{spreadsheet_id}' "
+                            f"(intento {attempt}).")
+                return {'ok': True, 'attempts': attempt, 'seconds': time.monotonic() - start, 'error': None}
+            except Exception as e:
+                error = str(e)
+                if attempt < retries:
+                    metrics.incr('publish.retries')
+                    wait = backoff_seconds * 2 ** (attempt - 1)
+                    logger.warning(f"Error al subir '{sheet_name}' (intento {attempt}/{retries}): {error}. "
+                                   f"Reintentando en {wait:.1f} s.")
+                    time.sleep(wait)
+                else:
+                    logger.error(f"Error al subir '{sheet_name}' tras {retries} intentos: {error}")
+                    metrics.incr('publish.failures')
+                    logger.error(traceback.format_exc())
+        return {'ok': False, 'attempts': retries, 'seconds': time.monotonic() - start, 'error': error}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_publish, tables))
+
+    status = {(table[1], table[2]): result for table, result in zip(tables, results)}
+    failed = [key for key, result in status.items() if not result['ok']]
+    if failed:
+        logger.error(f"Publicación incompleta: fallaron {failed}.")
+    else:
+        logger.info(f"Publicadas {len(status)} tablas correctamente.")
+    return status
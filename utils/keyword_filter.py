@@ -0,0 +1,124 @@
+# utils/keyword_filter.py
+
+import re
+import unicodedata
+
+# Lista de palabras clave de fútbol para filtrar tendencias
+FOOTBALL_KEYWORDS = [
+    # Equipos y Clubes Internacionales
+    'fc', 'football', 'fútbol', 'soccer', 'liga', 'premier', 'serie a',
+    'la liga', 'bundesliga', 'champions', 'cup', 'city', 'united',
+    'arsenal', 'milan', 'barcelona', 'real madrid', 'psg', 'juventus',
+    'liverpool', 'chelsea', 'manchester', 'leicester', 'villa', 'west ham',
+    'tottenham', 'crystal palace', 'brighton', 'athletic', 'sevilla',
+    'atletico', 'napoli', 'roma', 'inter', 'bayern', 'ajax', 'benfica',
+    'porto', 'paris', 'saint-germain', 'lyon', 'marseille', 'fenerbahce', 'galatasaray',
+    'zenit', 'spartak', 'cska', 'olympiakos', 'panathinaikos', 'anderlecht', 'brugge', 'celtic',
+
+    # Equipos y Clubes de América Latina
+    'boca juniors', 'river plate', 'flamengo', 'corinthians', 'palmeiras', 'sao paulo',
+    'gremio', 'america', 'cruz azul', 'pumas', 'tigres', 'santos', 'monterrey', 'toluca',
+    'leon', 'necaxa', 'queretaro', 'juarez', 'mazatlan', 'puebla', 'chivas', 'atlas',
+
+    # Competiciones Internacionales
+    'world cup', 'copa mundial', 'euro', 'copa america', 'concacaf', 'afcon',
+    'asian cup', 'europa league', 'uefa', 'fifa', 'libertadores', 'sudamericana',
+    'confederations cup', 'copa del rey', 'supercopa', 'community shield', 'dfb-pokal',
+    'carabao cup', 'fa cup', 'copa mx', 'copa libertadores', 'copa sudamericana',
+
+    # Jugadores y Entrenadores Famosos (pasado y presente)
+    'messi', 'ronaldo', 'cristiano', 'neymar', 'mbappe', 'haaland', 'ronaldinho',
+    'zidane', 'maradona', 'pele', 'zlatan', 'ibrahimovic', 'beckham', 'suarez',
+    'griezmann', 'iniesta', 'xavi', 'modric', 'kroos', 'lewandowski', 'benzema',
+    'casillas', 'buffon', 'oblak', 'ter stegen', 'courtois', 'pique', 'sergio ramos',
+    'dani alves', 'marcelo', 'kane', 'sterling', 'rashford', 'pogba', 'kante', 'salah',
+    'firmino', 'mané', 'virgil van dijk', 'son', 'lukaku', 'mourinho', 'guardiola',
+    'klopp', 'ancelotti', 'allegri', 'simeone', 'pochettino', 'flick', 'deschamps',
+    'low', 'luis enrique', 'scaloni', 'tite', 'scolari', 'bielsa', 'menotti', 'bilardo',
+
+    # Términos Generales de Fútbol
+    'gol', 'penalti', 'foul', 'offside', 'var', 'red card', 'yellow card', 'corner',
+    'free kick', 'goalkeeper', 'striker', 'midfielder', 'defender', 'forward', 'winger',
+    'coach', 'manager', 'transfer', 'loan', 'relegation', 'promotion', 'matchday',
+    'fixtures', 'standings', 'table', 'points', 'clean sheet', 'hat-trick', 'assist',
+    'stadium', 'crowd', 'fans', 'ultras', 'derby', 'rivalry', 'clásico', 'cup final',
+    'semi-final', 'quarter-final', 'group stage', 'knockout', 'penalty shootout', 'extra time',
+
+    # Competencias Nacionales (Ligas y Copas)
+    'laliga', 'ligue 1', 'serie a', 'bundesliga', 'premier league', 'eredivisie',
+    'primeira liga', 'super lig', 'ligapro', 'liga mx', 'mls', 'us open cup',
+    'ascenso', 'liga adelante', 'segunda division', 'serie b', 'championship', 'league one',
+    'liga aguila', 'copa mustang', 'copa de oro', 'copa sudamericana', 'copa américa',
+    'copa del rey', 'supercopa de españa', 'superliga argentina', 'torneo final',
+    'torneo clausura', 'torneo apertura', 'liga betplay', 'liga pro', 'ligapro',
+    'liga expansion', 'copa mx', 'copa libertadores', 'recopa sudamericana',
+
+    # Variantes del Nombre de Fútbol
+    'futbol', 'fútbol', 'soccer', 'football', 'futebol', 'footie'
+]
+
+
+def fold_text(text):
+    """Normaliza un texto para comparar: minúsculas y sin acentos ('Fútbol' -> 'futbol')."""
+    decomposed = unicodedata.normalize('NFKD', str(text).casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _trie_regex(words):
+    """
+    Construye una expresión regular en forma de trie a partir de las palabras,
+    de modo que los prefijos comunes se evalúan una sola vez por posición.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def _build(node):
+        end = '' in node
+        branches = [re.escape(char) + _build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not end:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        return group + '?' if end else group
+
+    return _build(trie)
+
+
+class KeywordFilter:
+    """
+    Filtro de exclusión compilado una sola vez a partir de una lista de patrones.
+
+    Los patrones y los textos se comparan sin mayúsculas ni acentos. Con
+    word_boundaries=True un patrón sólo coincide como palabra completa ('son' no
+    excluye 'person'); con False se conserva la búsqueda por subcadena.
+    """
+
+    def __init__(self, patterns, word_boundaries=True):
+        folded = sorted({fold_text(p) for p in patterns if p})
+        self.patterns = folded
+        self.word_boundaries = word_boundaries
+        if not folded:
+            self.regex = None
+            return
+        body = _trie_regex(folded)
+        if word_boundaries:
+            body = r'(?<!\w)' + body + r'(?!\w)'
+        self.regex = re.compile(body)
+
+    def matches(self, text):
+        """True si el texto contiene alguno de los patrones."""
+        if self.regex is None:
+            return False
+        return self.regex.search(fold_text(text)) is not None
+
+    def filter(self, texts):
+        """Retorna los textos que no contienen ninguno de los patrones, conservando el orden."""
+        if self.regex is None:
+            return list(texts)
+        search = self.regex.search
+        return [text for text in texts if search(fold_text(text)) is None]
@@ -0,0 +1,102 @@
+# utils/metrics.py
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+
+class RunMetrics:
+    """
+    Métricas de una ejecución del pipeline, seguras entre hilos.
+
+    - stage(nombre): temporizador de etapa (context manager); acumula segundos y veces.
+    - incr(nombre, n): contadores (llamadas a la API, reintentos, payloads vacíos...).
+    - gauge(nombre, valor): último valor de una medida (filas, bytes...).
+    - record_frame(prefijo, df): gauges '<prefijo>.rows' y '<prefijo>.bytes' de un DataFrame.
+
+    summary() retorna todo como dict y write_json(path) lo guarda en JSON.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = datetime.now(timezone.utc)
+            self._start = time.perf_counter()
+            self.stages = {}
+            self.counters = defaultdict(int)
+            self.gauges = {}
+            self.status = 'running'
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                entry = self.stages.setdefault(name, {'seconds': 0.0, 'count': 0})
+                entry['seconds'] += elapsed
+                entry['count'] += 1
+            logger.info(f"Etapa '{name}' completada en {elapsed:.2f} s.")
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def record_frame(self, prefix, df):
+        """Registra filas y bytes en memoria (deep) de un DataFrame; None cuenta como vacío."""
+        if df is None:
+            self.gauge(f"{prefix}.rows", 0)
+            self.gauge(f"{prefix}.bytes", 0)
+            return
+        self.gauge(f"{prefix}.rows", int(len(df)))
+        self.gauge(f"{prefix}.bytes", int(df.memory_usage(deep=True).sum()))
+
+    def summary(self):
+        with self._lock:
+            stages = {name: dict(entry) for name, entry in self.stages.items()}
+            summary = {
+                'status': self.status,
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'total_seconds': round(time.perf_counter() - self._start, 3),
+                'stages': stages,
+                'counters': dict(sorted(self.counters.items())),
+                'gauges': dict(sorted(self.gauges.items())),
+            }
+        # Rendimiento por etapa: filas procesadas por segundo cuando hay gauge de filas
+        for name, entry in stages.items():
+            entry['seconds'] = round(entry['seconds'], 3)
+            rows = summary['gauges'].get(f"{name}.rows")
+            if rows and entry['seconds'] > 0:
+                entry['rows_per_second'] = round(rows / entry['seconds'], 1)
+        return summary
+
+    def write_json(self, path):
+        """Guarda el resumen en path (escritura atómica)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2, default=str)
+        os.replace(tmp_path, path)
+        logger.info(f"Métricas de la ejecución guardadas en '{path}'.")
+
+
+# Métricas del proceso: las registran los módulos de utils y las guarda __main__
+metrics = RunMetrics()
@@ -0,0 +1,524 @@
+# utils/offline.py
+"""
+Sustitutos locales (en memoria) de Google Trends, Drive, Sheets v4 y gspread para
+ejecutar y medir el pipeline sin red.
+
+Se activan con la variable de entorno GOOGLE_OFFLINE=1: get_google_clients retorna
+FakeGoogleClients y __main__ usa FakeTrendReq en lugar de TrendReq. Sólo se imitan
+las llamadas que usa este repositorio.
+
+Configuración (variables de entorno, todas opcionales):
+    OFFLINE_LATENCY         segundos por llamada a Drive/Sheets (0.05)
+    OFFLINE_TRENDS_LATENCY  segundos por llamada a Trends (0.2)
+    OFFLINE_JITTER          variación relativa de la latencia (0.5)
+    OFFLINE_429_RATE        probabilidad de responder 429 en cada llamada (0)
+    OFFLINE_REQUESTS_PER_SECOND  límite de llamadas por segundo a Drive/Sheets que
+                            aplica el pipeline con los sustitutos (1000)
+    OFFLINE_KEYWORDS        número de palabras clave sintéticas (100)
+    OFFLINE_SNAPSHOTS       snapshots por carpeta de Drive (60)
+    OFFLINE_SNAPSHOT_DAYS   días de datos horarios por snapshot (7)
+    OFFLINE_SEED            semilla de los datos sintéticos (0)
+
+Las carpetas de Drive cuyo id contiene 'keyword' devuelven tablas de palabras
+clave (keyword, country, mean_interest, ...); el resto devuelve snapshots de
+series horarias (date, keyword, interest, country, timeframe).
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+
+import httplib2
+import numpy as np
+import pandas as pd
+import requests
+from googleapiclient.errors import HttpError
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range
+from pytrends.exceptions import TooManyRequestsError
+
+logger = logging.getLogger(__name__)
+
+OFFLINE_ENV = 'GOOGLE_OFFLINE'
+
+COUNTRIES = {'MX': 'Mexico', 'US': 'United States'}
+
+# Llamadas atendidas por los sustitutos, por tipo (útil para los benchmarks)
+call_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def offline_enabled():
+    """True si GOOGLE_OFFLINE está activada."""
+    return os.environ.get(OFFLINE_ENV, '').strip().lower() in ('1', 'true', 'yes')
+
+
+class OfflineConfig:
+    """Latencia, inyección de errores 429 y tamaño de los datos sintéticos."""
+
+    def __init__(self, latency=0.05, trends_latency=0.2, jitter=0.5, error_rate=0.0,
+                 n_keywords=100, n_snapshots=60, snapshot_days=7, seed=0, requests_per_second=1000.0):
+        self.latency = latency
+        self.trends_latency = trends_latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.n_keywords = n_keywords
+        self.n_snapshots = n_snapshots
+        self.snapshot_days = snapshot_days
+        self.seed = seed
+        self.requests_per_second = requests_per_second
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        env = os.environ.get
+        return cls(
+            latency=float(env('OFFLINE_LATENCY', 0.05)),
+            trends_latency=float(env('OFFLINE_TRENDS_LATENCY', 0.2)),
+            jitter=float(env('OFFLINE_JITTER', 0.5)),
+            error_rate=float(env('OFFLINE_429_RATE', 0.0)),
+            n_keywords=int(env('OFFLINE_KEYWORDS', 100)),
+            n_snapshots=int(env('OFFLINE_SNAPSHOTS', 60)),
+            snapshot_days=int(env('OFFLINE_SNAPSHOT_DAYS', 7)),
+            seed=int(env('OFFLINE_SEED', 0)),
+            requests_per_second=float(env('OFFLINE_REQUESTS_PER_SECOND', 1000.0)),
+        )
+
+    def call(self, kind, latency, make_error):
+        """Simula una llamada: espera la latencia y, con probabilidad error_rate, lanza un 429."""
+        with self._lock:
+            factor = 1 + self.jitter * (2 * self._random.random() - 1)
+            fail = self._random.random() < self.error_rate
+        with _stats_lock:
+            call_stats[kind] += 1
+            if fail:
+                call_stats[kind + '_429'] += 1
+        time.sleep(max(0.0, latency * factor))
+        if fail:
+            raise make_error()
+
+
+# ---------------------------------------------------------------------------
+# Datos sintéticos
+# ---------------------------------------------------------------------------
+
+def _seed(*parts):
+    return zlib.crc32('|'.join(str(p) for p in parts).encode('utf-8'))
+
+
+def synthetic_keywords(n_keywords, seed=0):
+    """Pares (keyword, country) sintéticos, repartidos entre los países de COUNTRIES."""
+    countries = list(COUNTRIES.values())
+    return [(f"tema {seed}-{i:05d}", countries[i % len(countries)]) for i in range(n_keywords)]
+
+
+def synthetic_interest(keyword, geo, dates, seed=0):
+    """
+    Señal determinista de interés (0-100 sin normalizar) de una palabra clave en
+    las fechas dadas: mismo valor para la misma fecha en cualquier ventana, con
+    ciclo semanal, ciclo diario y ruido.
+    """
+    base = _seed(seed, keyword, geo)
+    level = 5 + base % 60
+    phase = (base >> 8) % 1000 / 1000 * 2 * np.pi
+    hours = (pd.DatetimeIndex(dates).asi8 // 3_600_000_000_000).astype('int64')
+    noise = ((hours * 2654435761 + base) % 2 ** 32) / 2 ** 32
+    weekly = 1 + 0.4 * np.sin(2 * np.pi * hours / 168 + phase)
+    daily = 1 + 0.2 * np.sin(2 * np.pi * hours / 24)
+    values = level * weekly * daily * (0.7 + 0.6 * noise)
+    # Algunas palabras clave no tienen interés en parte del periodo
+    if base % 7 == 0:
+        values[(hours // 24) % 10 < 3] = 0
+    return values
+
+
+def _timeframe_dates(timeframe, now):
+    """Fechas (UTC sin zona) que devuelve Trends para un periodo."""
+    now = pd.Timestamp(now).floor('h')
+    relative = {
+        'now 1-H': (timedelta(hours=1), 'min'),
+        'now 4-H': (timedelta(hours=4), 'min'),
+        'now 1-d': (timedelta(days=1), 'h'),
+        'now 7-d': (timedelta(days=7), 'h'),
+        'today 1-m': (timedelta(days=30), 'D'),
+        'today 3-m': (timedelta(days=90), 'D'),
+        'today 12-m': (timedelta(days=365), 'W-SUN'),
+        'today 5-y': (timedelta(days=5 * 365), 'W-SUN'),
+    }
+    if timeframe in relative:
+        span, freq = relative[timeframe]
+        end = now if freq in ('h', 'min') else now.normalize()
+        return pd.date_range(end - span, end, freq=freq, name='date')
+    match = re.fullmatch(r'(\S+) (\S+)', timeframe)
+    if not match:
+        raise ValueError(f"Periodo no soportado por FakeTrendReq: {timeframe}")
+    start, end = (pd.Timestamp(value.replace('T', ' ') + (':00' if 'T' in value else '')) for value in match.groups())
+    if 'T' in timeframe:
+        freq = 'h'
+    else:
+        freq = 'D' if end - start <= timedelta(days=270) else 'W-SUN'
+    return pd.date_range(start, end, freq=freq, name='date')
+
+
+def _snapshot_times(n_snapshots, now):
+    """Instantes de los snapshots de una carpeta: cada 12 h hasta now."""
+    last = pd.Timestamp(now).floor('h')
+    return [last - timedelta(hours=12 * i) for i in range(n_snapshots)]
+
+
+def _keywords_table(config, snapshot_time):
+    rows = [['keyword', 'country', 'mean_interest', 'max_interest']]
+    dates = pd.date_range(snapshot_time - timedelta(days=config.snapshot_days), snapshot_time, freq='h')
+    for keyword, country in synthetic_keywords(config.n_keywords, config.seed):
+        values = synthetic_interest(keyword, country, dates, config.seed)
+        rows.append([keyword, country, f"{values.mean():.2f}", f"{values.max():.2f}"])
+    return rows
+
+
+def _series_snapshot(config, snapshot_time):
+    dates = pd.date_range(snapshot_time - timedelta(days=config.snapshot_days), snapshot_time, freq='h')
+    date_strings = dates.strftime('%Y-%m-%d %H:%M:%S').tolist()
+    rows = [['date', 'keyword', 'interest', 'country', 'timeframe']]
+    for keyword, country in synthetic_keywords(config.n_keywords, config.seed):
+        values = synthetic_interest(keyword, country, dates, config.seed)
+        values = np.round(100 * values / max(values.max(), 1e-9)).astype(int)
+        rows.extend([d, keyword, str(v), country, 'now 7-d'] for d, v in zip(date_strings, values))
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Errores 429 con la forma de cada biblioteca
+# ---------------------------------------------------------------------------
+
+def _requests_response(status, payload):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(payload).encode('utf-8')
+    return response
+
+
+def _google_api_429():
+    return HttpError(httplib2.Response({'status': 429}), b'{"error": {"code": 429, "message": "Quota exceeded"}}')
+
+
+def _gspread_429():
+    return APIError(_requests_response(429, {'error': {'code': 429, 'message': 'Quota exceeded',
+                                                       'status': 'RESOURCE_EXHAUSTED'}}))
+
+
+def _trends_429():
+    return TooManyRequestsError.from_response(_requests_response(429, {}))
+
+
+# ---------------------------------------------------------------------------
+# Trends
+# ---------------------------------------------------------------------------
+
+class FakeTrendReq:
+    """Sustituto de pytrends.request.TrendReq (build_payload, interest_over_time, trending_searches)."""
+
+    def __init__(self, hl='en-US', tz=360, geo='', timeout=(2, 5), config=None, **kwargs):
+        self.hl = hl
+        self.tz = tz
+        self.geo = geo
+        self.timeout = timeout
+        self.config = config or OfflineConfig.from_env()
+        self.kw_list = []
+        self.timeframe = None
+
+    def build_payload(self, kw_list, cat=0, timeframe='today 5-y', geo='', gprop=''):
+        self.config.call('trends_payload', self.config.trends_latency, _trends_429)
+        self.kw_list = list(kw_list)
+        self.timeframe = timeframe
+        self.geo = geo
+
+    def interest_over_time(self):
+        self.config.call('trends_interest', self.config.trends_latency, _trends_429)
+        dates = _timeframe_dates(self.timeframe, datetime.utcnow())
+        data = {kw: synthetic_interest(kw, COUNTRIES.get(self.geo, self.geo), dates, self.config.seed)
+                for kw in self.kw_list}
+        frame = pd.DataFrame(data, index=dates)
+        peak = frame.to_numpy().max() if not frame.empty else 0
+        if peak <= 0:
+            return pd.DataFrame()
+        # Como en Trends, los valores se normalizan a 100 dentro del payload
+        frame = (100 * frame / peak).round().astype('int64')
+        frame['isPartial'] = False
+        frame.iloc[-1, -1] = True
+        return frame
+
+    def trending_searches(self, pn='united_states'):
+        self.config.call('trends_trending', self.config.trends_latency, _trends_429)
+        rng = random.Random(_seed(self.config.seed, pn, datetime.utcnow().date()))
+        keywords = synthetic_keywords(self.config.n_keywords, self.config.seed)
+        return pd.DataFrame([kw for kw, _ in rng.sample(keywords, min(20, len(keywords)))])
+
+
+# ---------------------------------------------------------------------------
+# Drive v3 y Sheets v4 (googleapiclient)
+# ---------------------------------------------------------------------------
+
+class _Request:
+    def __init__(self, config, kind, fn):
+        self._config, self._kind, self._fn = config, kind, fn
+
+    def execute(self):
+        self._config.call(self._kind, self._config.latency, _google_api_429)
+        return self._fn()
+
+
+class _FakeFiles:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def list(self, q='', pageSize=100, pageToken=None, **kwargs):
+        return _Request(self._backend.config, 'drive_list', lambda: self._backend.list_files(q, pageSize, pageToken))
+
+
+class FakeDriveService:
+    def __init__(self, backend):
+        self._files = _FakeFiles(backend)
+
+    def files(self):
+        return self._files
+
+
+class _FakeValues:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def batchGet(self, spreadsheetId, ranges=None, **kwargs):
+        def _get():
+            values = self._backend.worksheet_values(spreadsheetId)
+            return {'spreadsheetId': spreadsheetId, 'valueRanges': [{'values': values}]}
+        return _Request(self._backend.config, 'sheets_read', _get)
+
+
+class _FakeSpreadsheets:
+    def __init__(self, backend):
+        self._values = _FakeValues(backend)
+
+    def values(self):
+        return self._values
+
+
+class FakeSheetsService:
+    def __init__(self, backend):
+        self._spreadsheets = _FakeSpreadsheets(backend)
+
+    def spreadsheets(self):
+        return self._spreadsheets
+
+
+# ---------------------------------------------------------------------------
+# gspread
+# ---------------------------------------------------------------------------
+
+class FakeWorksheet:
+    """Hoja en memoria con la parte de la API de gspread.Worksheet que usa el repositorio."""
+
+    def __init__(self, backend, spreadsheet_id, sheet_id, title, values=None):
+        self._backend = backend
+        self.spreadsheet_id = spreadsheet_id
+        self.id = sheet_id
+        self.title = title
+        self._cells = {}
+        for r, row in enumerate(values or []):
+            for c, value in enumerate(row):
+                if value != '':
+                    self._cells[(r, c)] = value
+        self._lock = threading.Lock()
+
+    def _call(self, kind):
+        self._backend.config.call(kind, self._backend.config.latency, _gspread_429)
+
+    def get_all_values(self, value_render_option=None, **kwargs):
+        self._call('gspread_read')
+        with self._lock:
+            if not self._cells:
+                return []
+            n_rows = max(r for r, _ in self._cells) + 1
+            n_cols = max(c for _, c in self._cells) + 1
+            grid = [[self._cells.get((r, c), '') for c in range(n_cols)] for r in range(n_rows)]
+        # Sin UNFORMATTED_VALUE la API devuelve todo como texto
+        if value_render_option is None or 'UNFORMATTED' not in str(value_render_option).upper():
+            grid = [[v if isinstance(v, str) else format(v, 'g') for v in row] for row in grid]
+        return grid
+
+    def clear(self):
+        self._call('gspread_write')
+        with self._lock:
+            self._cells.clear()
+
+    def batch_clear(self, ranges):
+        self._call('gspread_write')
+        with self._lock:
+            for a1 in ranges:
+                grid = a1_range_to_grid_range(a1)
+                for key in [k for k in self._cells
+                            if grid.get('startRowIndex', 0) <= k[0] < grid.get('endRowIndex', float('inf'))
+                            and grid.get('startColumnIndex', 0) <= k[1] < grid.get('endColumnIndex', float('inf'))]:
+                    del self._cells[key]
+
+    def batch_update(self, data, **kwargs):
+        self._call('gspread_write')
+        with self._lock:
+            for item in data:
+                grid = a1_range_to_grid_range(item['range'])
+                self._write(grid.get('startRowIndex', 0), grid.get('startColumnIndex', 0), item['values'])
+        return {'totalUpdatedCells': sum(len(row) for item in data for row in item['values'])}
+
+    def update(self, values, range_name=None, **kwargs):
+        self._call('gspread_write')
+        grid = a1_range_to_grid_range(range_name or 'A1')
+        with self._lock:
+            self._write(grid.get('startRowIndex', 0), grid.get('startColumnIndex', 0), values)
+
+    def _write(self, row0, col0, values):
+        for r, row in enumerate(values):
+            for c, value in enumerate(row):
+                if value is None:
+                    continue
+                if value == '':
+                    self._cells.pop((row0 + r, col0 + c), None)
+                else:
+                    self._cells[(row0 + r, col0 + c)] = value
+
+
+class FakeSpreadsheet:
+    def __init__(self, backend, spreadsheet_id):
+        self._backend = backend
+        self.id = spreadsheet_id
+        self._worksheets = []
+        self._lock = threading.Lock()
+
+    def _call(self):
+        self._backend.config.call('gspread_meta', self._backend.config.latency, _gspread_429)
+
+    def _add(self, title, values=None):
+        worksheet = FakeWorksheet(self._backend, self.id, len(self._worksheets), title, values)
+        self._worksheets.append(worksheet)
+        return worksheet
+
+    @property
+    def sheet1(self):
+        return self.get_worksheet(0)
+
+    def get_worksheet(self, index):
+        self._call()
+        with self._lock:
+            if not self._worksheets:
+                self._add('Hoja 1', self._backend.worksheet_values(self.id))
+            return self._worksheets[index]
+
+    def worksheet(self, title):
+        self._call()
+        with self._lock:
+            for worksheet in self._worksheets:
+                if worksheet.title == title:
+                    return worksheet
+        raise WorksheetNotFound(title)
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        self._call()
+        with self._lock:
+            return self._add(title)
+
+
+class FakeGspreadClient:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def open_by_key(self, key):
+        self._backend.config.call('gspread_meta', self._backend.config.latency, _gspread_429)
+        return self._backend.spreadsheet(key)
+
+
+# ---------------------------------------------------------------------------
+# Estado compartido y clientes
+# ---------------------------------------------------------------------------
+
+class OfflineBackend:
+    """Estado en memoria compartido por todos los sustitutos: carpetas, snapshots y hojas escritas."""
+
+    def __init__(self, config=None, now=None):
+        self.config = config or OfflineConfig.from_env()
+        self.now = pd.Timestamp(now or datetime.utcnow())
+        self._spreadsheets = {}
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def _folder_files(self, folder_id):
+        kind = 'keywords' if 'keyword' in folder_id.lower() else 'series'
+        files = []
+        for i, ts in enumerate(_snapshot_times(self.config.n_snapshots, self.now)):
+            files.append({
+                'id': f"{folder_id}__{kind}__{i}",
+                'name': f"{kind} (Copia {ts:%Y-%m-%d %H-%M-%S})",
+                'modifiedTime': ts.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            })
+        return files
+
+    def list_files(self, q, page_size, page_token):
+        folder = re.search(r"'([^']+)' in parents", q or '')
+        files = self._folder_files(folder.group(1)) if folder else []
+        modified = re.search(r"modifiedTime > '([^']+)'", q or '')
+        if modified:
+            cutoff = pd.Timestamp(modified.group(1)).tz_localize(None)
+            files = [f for f in files if pd.Timestamp(f['modifiedTime']).tz_localize(None) > cutoff]
+        start = int(page_token or 0)
+        response = {'files': files[start:start + page_size]}
+        if start + page_size < len(files):
+            response['nextPageToken'] = str(start + page_size)
+        return response
+
+    def _snapshot(self, file_id):
+        with self._lock:
+            if file_id not in self._snapshots:
+                folder_id, kind, index = file_id.rsplit('__', 2)
+                ts = _snapshot_times(self.config.n_snapshots, self.now)[int(index)]
+                builder = _keywords_table if kind == 'keywords' else _series_snapshot
+                self._snapshots[file_id] = builder(self.config, ts)
+            return self._snapshots[file_id]
+
+    def worksheet_values(self, spreadsheet_id):
+        """Valores iniciales de la primera hoja: el snapshot sintético, o vacía si no es un snapshot."""
+        if spreadsheet_id.count('__') == 2:
+            return self._snapshot(spreadsheet_id)
+        return []
+
+    def spreadsheet(self, spreadsheet_id):
+        with self._lock:
+            if spreadsheet_id not in self._spreadsheets:
+                self._spreadsheets[spreadsheet_id] = FakeSpreadsheet(self, spreadsheet_id)
+            return self._spreadsheets[spreadsheet_id]
+
+
+class FakeGoogleClients:
+    """Misma interfaz que utils.google_clients.GoogleClients, sobre un OfflineBackend."""
+
+    def __init__(self, backend=None):
+        self.backend = backend or OfflineBackend()
+        self.credentials = None
+        self.gspread = FakeGspreadClient(self.backend)
+        # Sin cuota real: el límite de llamadas por segundo lo fija la configuración
+        # (ver utils.google_utils._rate_limiter_for)
+        self.requests_per_second = self.backend.config.requests_per_second
+
+    def drive(self):
+        return FakeDriveService(self.backend)
+
+    def sheets(self):
+        return FakeSheetsService(self.backend)
+
+    def gspread_client(self):
+        # El backend en memoria serializa los accesos: el mismo cliente sirve a todos los hilos
+        return self.gspread
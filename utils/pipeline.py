@@ -0,0 +1,163 @@
+# utils/pipeline.py
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Se incrementa cuando cambia el formato de los artefactos o la lógica de una etapa,
+# para que no se reutilicen artefactos de versiones anteriores
+ARTIFACT_VERSION = 1
+
+
+def frame_hash(df):
+    """Huella del contenido de un DataFrame: columnas, tipos, índice y valores."""
+    h = hashlib.sha256()
+    h.update(json.dumps([[str(c) for c in df.columns], [str(t) for t in df.dtypes]]).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return h.hexdigest()
+
+
+def content_hash(frames):
+    """Huella conjunta de un dict {nombre: DataFrame}."""
+    h = hashlib.sha256()
+    for name in sorted(frames):
+        h.update(f"{name}:{frame_hash(frames[name])};".encode('utf-8'))
+    return h.hexdigest()
+
+
+class ArtifactStore:
+    """
+    Artefactos de las etapas del pipeline en disco.
+
+    Cada ejecución de una etapa se guarda en root/<etapa>/<clave>/, con un Parquet
+    por tabla y un manifest.json (entradas, parámetros y huella del contenido). La
+    clave es un hash de las huellas de las entradas y de los parámetros, así que
+    una etapa cuyas entradas no cambiaron encuentra su artefacto y no se ejecuta.
+    root/<etapa>/latest.json apunta al último artefacto completado, para poder
+    lanzar una etapa sin volver a ejecutar las anteriores.
+    """
+
+    def __init__(self, root, keep=3):
+        self.root = root
+        self.keep = keep
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def stage_key(stage, inputs, params):
+        normalized = json.dumps({'version': ARTIFACT_VERSION, 'stage': stage, 'inputs': inputs, 'params': params},
+                                sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def _dir(self, stage, key=None):
+        return os.path.join(self.root, stage, key) if key else os.path.join(self.root, stage)
+
+    def load(self, stage, key):
+        """Retorna (frames, manifest) del artefacto o None si no existe o está incompleto."""
+        directory = self._dir(stage, key)
+        try:
+            with open(os.path.join(directory, 'manifest.json'), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            frames = {name: pd.read_parquet(os.path.join(directory, f"{name}.parquet"))
+                      for name in manifest['tables']}
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Artefacto ilegible en '{directory}', se descarta: {str(e)}")
+            shutil.rmtree(directory, ignore_errors=True)
+            return None
+        # Marcar como usado recientemente para que prune() no lo elimine
+        os.utime(directory)
+        return frames, manifest
+
+    def latest(self, stage):
+        """Retorna (frames, manifest) del último artefacto completado de la etapa, o None."""
+        try:
+            with open(os.path.join(self._dir(stage), 'latest.json'), 'r', encoding='utf-8') as f:
+                key = json.load(f)['key']
+        except (OSError, ValueError, KeyError):
+            return None
+        return self.load(stage, key)
+
+    def save(self, stage, key, frames, inputs, params):
+        """Guarda las tablas de la etapa de forma atómica y la marca como la última completada."""
+        stage_dir = self._dir(stage)
+        os.makedirs(stage_dir, exist_ok=True)
+        manifest = {
+            'stage': stage,
+            'key': key,
+            'created': time.time(),
+            'inputs': inputs,
+            'params': params,
+            'tables': sorted(frames),
+            'content': content_hash(frames),
+        }
+        tmp_dir = tempfile.mkdtemp(dir=stage_dir, prefix='.tmp-')
+        try:
+            for name, df in frames.items():
+                df.to_parquet(os.path.join(tmp_dir, f"{name}.parquet"))
+            with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, default=str)
+            shutil.rmtree(self._dir(stage, key), ignore_errors=True)
+            os.replace(tmp_dir, self._dir(stage, key))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        fd, tmp_path = tempfile.mkstemp(dir=stage_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'key': key}, f)
+        os.replace(tmp_path, os.path.join(stage_dir, 'latest.json'))
+        self.prune(stage)
+        return manifest
+
+    def prune(self, stage):
+        """Conserva sólo los `keep` artefactos más recientes de la etapa."""
+        stage_dir = self._dir(stage)
+        entries = []
+        for name in os.listdir(stage_dir):
+            path = os.path.join(stage_dir, name)
+            if os.path.isdir(path) and not name.startswith('.tmp-'):
+                entries.append((os.path.getmtime(path), path))
+        for _, path in sorted(entries, reverse=True)[self.keep:]:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def run_stage(store, stage, fn, inputs=None, params=None, force=False):
+    """
+    Ejecuta fn() -> {nombre: DataFrame} como la etapa `stage`, salvo que ya exista
+    un artefacto con las mismas entradas y parámetros (y force=False), en cuyo
+    caso se reutiliza.
+
+    inputs es un dict {nombre: huella} con el 'content' de los manifiestos de las
+    etapas anteriores; params, los parámetros que afectan al resultado (deben
+    poder serializarse en JSON). Retorna (frames, manifest).
+    """
+    inputs = inputs or {}
+    params = params or {}
+    key = store.stage_key(stage, inputs, params)
+
+    if not force:
+        cached = store.load(stage, key)
+        if cached is not None:
+            logger.info(f"Etapa '{stage}' sin cambios en sus entradas: se reutiliza el artefacto {key[:12]}.")
+            metrics.incr('pipeline.stages_skipped')
+            metrics.gauge(f"pipeline.{stage}.skipped", True)
+            return cached
+
+    logger.info(f"Ejecutando etapa '{stage}' (artefacto {key[:12]})...")
+    with metrics.stage(stage):
+        frames = fn()
+    manifest = store.save(stage, key, frames, inputs, params)
+    metrics.incr('pipeline.stages_run')
+    metrics.gauge(f"pipeline.{stage}.skipped", False)
+    return frames, manifest
@@ -1,23 +1,40 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from datetime import timedelta
 import logging
+import pickle
 
-def calculate_daily_stats(df):
-  # Convertir la columna `date` a nivel día
-  df['date'] = pd.to_datetime(df['date'])
-  df['day'] = df['date'].dt.date
+from utils.backends import (
+    calcular_scores_polars,
+    calculate_daily_stats_polars,
+    resolve_backend
+)
+from utils.schema import ensure_datetime, ensure_numeric
+
+def calculate_daily_stats(df, backend=None):
+  # Backend alternativo (p. ej. Polars); ver utils.backends
+  if resolve_backend(backend) == 'polars':
+    return calculate_daily_stats_polars(df)
+
+  # Convertir la columna `date` a nivel día (no se vuelve a parsear si ya viene tipada)
+  df['date'] = ensure_datetime(df['date'])
+  df['day'] = df['date'].dt.normalize()
 
   # Convert 'interest' to numeric, handling errors
-  df['interest'] = pd.to_numeric(df['interest'], errors='coerce')
+  df['interest'] = ensure_numeric(df['interest'])
 
   # Calcular métricas para cada día
   aggregations = {
       'interest': ['max', 'min', 'mean', 'median', 'std']
   }
 
-  daily_stats = df.groupby(['day', 'keyword', 'country']).agg(aggregations).reset_index()
+  # El interés puede venir en float32 desde la ingesta; se agrega en float64
+  daily_stats = (
+      df.assign(interest=df['interest'].astype('float64'))
+        .groupby(['day', 'keyword', 'country'], observed=True)
+        .agg(aggregations)
+        .reset_index()
+  )
 
   # Aplanar los nombres de columnas
   daily_stats.columns = ['day', 'keyword', 'country',
@@ -30,18 +47,56 @@ def calculate_cumulative_interest(df, cum_inter = 'cumulative_max_interest', asc
   """Calculates the cumulative sum of max_interest for each keyword-country series over time."""
 
   # Ensure the 'day' column is datetime objects for proper sorting
-  df['day'] = pd.to_datetime(df['day'])
+  df['day'] = ensure_datetime(df['day'])
 
   # Sort the DataFrame by date
   df_sorted = df.sort_values(by=['keyword', 'country', 'day'], ascending=[True, True, ascending])
 
   # Calculate the cumulative sum of 'max_interest'
-  df_sorted[cum_inter] = df_sorted.groupby(['keyword', 'country'])['max_interest'].cumsum()
+  df_sorted[cum_inter] = df_sorted.groupby(['keyword', 'country'], observed=True)['max_interest'].cumsum()
 
   return df_sorted
 
 
 
+def trim_zero_edges(df, value_column='max_interest', group_by_columns=['keyword', 'country'],
+                    date_column='day', ascending=True):
+  """
+  Removes the leading and trailing days with zero (or missing) value of each series.
+
+  The frame is sorted once by group_by_columns + date_column (the date in the given
+  direction) and the result keeps that order. For each series only the rows between
+  its first and last non-zero day are kept; rows with a missing value are dropped.
+
+  Parameters:
+  - df (pd.DataFrame): Daily statistics, e.g. the output of calculate_daily_stats.
+  - value_column (str): Column whose zeros are trimmed.
+  - group_by_columns (list): Columns that identify a series.
+  - date_column (str): Date column used to order each series.
+  - ascending (bool): Direction of the date order in the result.
+
+  Returns:
+  - pd.DataFrame: Trimmed DataFrame sorted by group_by_columns and date_column.
+  """
+  df = df.copy()
+  df[date_column] = ensure_datetime(df[date_column])
+  df_sorted = df.sort_values(by=group_by_columns + [date_column],
+                             ascending=[True] * len(group_by_columns) + [ascending])
+
+  values = df_sorted[value_column].to_numpy(dtype='float64')
+  non_zero = values > 0
+
+  # Posición del primer y último día distinto de cero de cada serie (las filas de
+  # una serie quedan contiguas tras el ordenamiento)
+  group_ids = df_sorted.groupby(group_by_columns, observed=True, sort=False).ngroup().to_numpy()
+  positions = np.arange(len(df_sorted))
+  first = pd.Series(np.where(non_zero, positions, len(df_sorted))).groupby(group_ids).transform('min').to_numpy()
+  last = pd.Series(np.where(non_zero, positions, -1)).groupby(group_ids).transform('max').to_numpy()
+
+  keep = (positions >= first) & (positions <= last) & ~np.isnan(values)
+  return df_sorted[keep]
+
+
 def filter_recent_high_median_interest(dataframe,
                                        days_threshold=30,
                                        percentile_threshold=25,
@@ -64,7 +119,7 @@ def filter_recent_high_median_interest(dataframe,
     - pd.DataFrame: Filtered DataFrame with only the rows above the specified percentile within recent days.
     """
     # Convert date column to datetime if not already
-    dataframe[date_column] = pd.to_datetime(dataframe[date_column])
+    dataframe[date_column] = ensure_datetime(dataframe[date_column])
 
     # Get the max date and filter rows within the last `days_threshold` days
     max_date = dataframe[date_column].max()
@@ -72,15 +127,15 @@ def filter_recent_high_median_interest(dataframe,
     recent_df = dataframe[dataframe[date_column] >= recent_start_date]
 
     # Calculate the threshold for the specified percentile within recent data
-    thresholds = recent_df.groupby(group_by_columns)[median_column].quantile(percentile_threshold / 100).to_dict()
+    thresholds = recent_df.groupby(group_by_columns, observed=True)[median_column].quantile(percentile_threshold / 100)
     # print(thresholds)
 
     # Filter the original DataFrame to retain rows above the calculated thresholds
-    def is_above_threshold(row):
-        group_key = tuple(row[group_by_columns])
-        return row[median_column] > thresholds.get(group_key, float('-inf'))
-
-    filtered_df = dataframe[dataframe.apply(is_above_threshold, axis=1)]
+    # (groups without recent data use -inf, i.e. every non-NaN row is kept; a NaN
+    # threshold stays NaN and, as `x > NaN` is False, drops the whole group)
+    row_thresholds = thresholds.reindex(pd.MultiIndex.from_frame(dataframe[group_by_columns]),
+                                        fill_value=-np.inf).to_numpy(dtype='float64')
+    filtered_df = dataframe[dataframe[median_column].to_numpy(dtype='float64') > row_thresholds]
 
     return filtered_df
 
@@ -98,7 +153,7 @@ def rank_categories(dataframe, metric_column='median_interest', group_by_columns
     - pd.DataFrame: DataFrame with categories ranked from best to worst.
     """
     # Calculate the mean of the metric for each group
-    rankings = dataframe.groupby(group_by_columns)[metric_column].mean().reset_index()
+    rankings = dataframe.groupby(group_by_columns, observed=True)[metric_column].mean().reset_index()
     rankings = rankings.sort_values(by=metric_column, ascending=False).reset_index(drop=True)
     rankings['rank'] = rankings.index + 1
     return rankings
@@ -114,11 +169,14 @@ def plot_rankings(rankings, metric_column='median_interest', group_by_columns=['
     - top_n (int): Number of top categories to display in the plot.
     """
     # Combine group_by_columns into a single column for display
-    rankings['category'] = rankings[group_by_columns[0]] + " - " + rankings[group_by_columns[1]]
+    rankings['category'] = rankings[group_by_columns[0]].astype(str) + " - " + rankings[group_by_columns[1]].astype(str)
 
     # Get the top N rankings
     top_rankings = rankings.head(top_n)
 
+    # matplotlib sólo se carga al graficar (tarda en importarse)
+    import matplotlib.pyplot as plt
+
     # Plot
     plt.figure(figsize=(10, 6))
     plt.barh(top_rankings['category'], top_rankings[metric_column], color='skyblue')
@@ -160,7 +218,8 @@ def obtener_top_por_modo(
     w_weekly=1.0,
     w_monthly=1.0,
     decay_base=0.75,
-    type_metric='max'
+    type_metric='max',
+    backend=None
 ):
     """
     Retorna un DataFrame con las tendencias (keywords) top por país,
@@ -182,6 +241,8 @@ def obtener_top_por_modo(
         Peso para el score mensual.
     decay_base : float
         Base del factor de decaimiento exponencial (por defecto 0.5).
+    backend : str, opcional
+        'pandas' o 'polars' (ver utils.backends.resolve_backend).
     
     Retorna
     -------
@@ -189,23 +250,37 @@ def obtener_top_por_modo(
         DataFrame con las top_n tendencias por country, ordenadas por su score_total.
         Incluye las columnas ['country', 'keyword', 'score_daily', 'score_weekly', 'score_monthly', 'score_total'].
     """
+    if resolve_backend(backend) == 'polars':
+        metric = type_metric + '_interest'
+        df_scores = calcular_scores_polars(df_in, [metric], w_daily, w_weekly, w_monthly, decay_base, offset=1.0)
+        df_combined = pd.DataFrame({
+            'country': df_scores['country'],
+            'keyword': df_scores['keyword'],
+            'score_daily': df_scores[('score_daily', metric)],
+            'score_weekly': df_scores[('score_weekly', metric)],
+            'score_monthly': df_scores[('score_monthly', metric)],
+        })
+        df_combined['score_total'] = df_combined['score_daily'] + df_combined['score_weekly'] + df_combined['score_monthly']
+        df_top = _top_n_por_grupo(df_combined, 'country', 'score_total', top_n)
+        return df_top.sort_values(by=['country', 'score_total'], ascending=[True, False]).reset_index(drop=True)
+
     # =======================
     # 1) Preparación de datos
     # =======================
     df = df_in.copy()
     
     # Aseguramos que 'day' sea de tipo fecha
-    df['day'] = pd.to_datetime(df['day'], errors='coerce')
+    df['day'] = ensure_datetime(df['day'], errors='coerce')
     df.dropna(subset=['day'], inplace=True)  # Eliminamos filas con 'day' NaN
     
     # Aseguramos que mean_interest sea numérico
-    df['mean_interest'] = pd.to_numeric(df[type_metric+'_interest'], errors='coerce').fillna(0)
+    df['mean_interest'] = ensure_numeric(df[type_metric+'_interest']).fillna(0)
     
     # =======================
     # 2) Identificar el último día por (country, keyword)
     # =======================
     df_max_day = (
-        df.groupby(['country', 'keyword'], as_index=False)['day']
+        df.groupby(['country', 'keyword'], as_index=False, observed=True)['day']
           .max()
           .rename(columns={'day': 'max_day'})
     )
@@ -236,7 +311,7 @@ def obtener_top_por_modo(
     
     # Agrupar por (country, keyword) para sumar los scores diarios
     df_daily = (
-        df.groupby(['country', 'keyword'], as_index=False)['score_daily']
+        df.groupby(['country', 'keyword'], as_index=False, observed=True)['score_daily']
           .sum()
     )
     
@@ -273,7 +348,7 @@ def obtener_top_por_modo(
     
     # Aplicar la función a cada grupo (country, keyword)
     df_weekly = (
-        df.groupby(['country', 'keyword'])
+        df.groupby(['country', 'keyword'], observed=True)
           .apply(calcular_score_semanal)
           .reset_index()
     )
@@ -311,7 +386,7 @@ def obtener_top_por_modo(
     
     # Aplicar la función a cada grupo (country, keyword)
     df_monthly = (
-        df.groupby(['country', 'keyword'])
+        df.groupby(['country', 'keyword'], observed=True)
           .apply(calcular_score_mensual)
           .reset_index()
     )
@@ -336,7 +411,7 @@ def obtener_top_por_modo(
         return g.nlargest(top_n, 'score_total')
     
     df_top = (
-        df_combined.groupby('country', group_keys=False)
+        df_combined.groupby('country', group_keys=False, observed=True)
                     .apply(get_top_n_por_country)
     )
     
@@ -349,6 +424,138 @@ def obtener_top_por_modo(
     return df_top
 
 
+class TrendScoreState:
+    """
+    Estado incremental de los scores de obtener_top_por_modo por (country, keyword).
+
+    En lugar de recalcular decay_base ** days_diff sobre todo el histórico, el score
+    diario se actualiza en O(1) por día nuevo:
+        score_t = decay_base ** (t - t_prev) * score_prev + sum(f(x_t))
+    Para los scores semanal y mensual se guardan la suma y el conteo del histórico y
+    los de cada uno de los últimos días (30, o history_days si es mayor), de modo que
+    una ejecución diaria sólo procesa las filas del día nuevo.
+
+    Con history_days=None el histórico "anterior" incluye todos los días vistos; con
+    un valor, sólo los últimos history_days días (como el filtro de 60 días de
+    preprocesar_keys). Las filas de update() deben ser filas no vistas antes.
+    """
+
+    WEEK_DAYS = 7
+    MONTH_DAYS = 30
+
+    def __init__(self, w_daily=1.0, w_weekly=1.0, w_monthly=1.0, decay_base=0.75,
+                 type_metric='max', history_days=None):
+        self.w_daily = w_daily
+        self.w_weekly = w_weekly
+        self.w_monthly = w_monthly
+        self.decay_base = decay_base
+        self.type_metric = type_metric
+        self.history_days = history_days
+        self.buffer_days = max(self.MONTH_DAYS, history_days or 0)
+        self.state = {}
+
+    def update(self, new_daily_rows):
+        """
+        Incorpora filas diarias nuevas con columnas ['day', 'keyword', 'country',
+        type_metric + '_interest'] (formato de calculate_daily_stats).
+        """
+        df = pd.DataFrame({
+            'day': ensure_datetime(new_daily_rows['day'], errors='coerce'),
+            'keyword': new_daily_rows['keyword'],
+            'country': new_daily_rows['country'],
+            'x': ensure_numeric(new_daily_rows[self.type_metric + '_interest']).fillna(0),
+        }).dropna(subset=['day'])
+        if df.empty:
+            return self
+
+        # Término diario sin peso: log1p(x + 1), igual que obtener_top_por_modo
+        df['f'] = np.log1p((df['x'] + 1).clip(lower=0))
+        per_day = (
+            df.groupby(['country', 'keyword', 'day'], observed=True)
+              .agg(f=('f', 'sum'), total=('x', 'sum'), count=('x', 'size'))
+              .reset_index()
+              .sort_values('day', kind='stable')
+        )
+
+        for country, keyword, day, f, total, count in per_day.itertuples(index=False):
+            key = (country, keyword)
+            st = self.state.get(key)
+            if st is None:
+                st = {'last_day': day, 'score': 0.0, 'sum': 0.0, 'count': 0, 'days': {}}
+                self.state[key] = st
+
+            lag = (day - st['last_day']).days
+            if lag > 0:
+                st['score'] = st['score'] * self.decay_base ** lag + f
+                st['last_day'] = day
+            else:
+                st['score'] += f * self.decay_base ** (-lag)
+
+            st['sum'] += total
+            st['count'] += count
+            day_sum, day_count, day_f = st['days'].get(day, (0.0, 0, 0.0))
+            st['days'][day] = (day_sum + total, day_count + count, day_f + f)
+            self._evict(st)
+        return self
+
+    def _evict(self, st):
+        """
+        Descarta los días fuera del buffer. Si hay history_days, los días que salen
+        de la ventana de histórico también se restan de las sumas y del score diario.
+        """
+        buffer_start = st['last_day'] - pd.Timedelta(days=self.buffer_days)
+        history_start = None
+        if self.history_days is not None:
+            history_start = st['last_day'] - pd.Timedelta(days=self.history_days)
+        cutoff = buffer_start if history_start is None else max(buffer_start, history_start)
+        for day in [d for d in st['days'] if d < cutoff]:
+            day_sum, day_count, day_f = st['days'].pop(day)
+            if history_start is not None and day < history_start:
+                st['sum'] -= day_sum
+                st['count'] -= day_count
+                st['score'] -= day_f * self.decay_base ** (st['last_day'] - day).days
+
+    def _window_diff(self, st, window_days):
+        start = st['last_day'] - pd.Timedelta(days=window_days - 1)
+        in_sum = in_count = 0
+        for day, (day_sum, day_count, _) in st['days'].items():
+            if day >= start:
+                in_sum += day_sum
+                in_count += day_count
+        out_sum = st['sum'] - in_sum
+        out_count = st['count'] - in_count
+        in_mean = in_sum / in_count if in_count else 0
+        out_mean = out_sum / out_count if out_count else 0
+        return in_mean - out_mean
+
+    def scores(self):
+        """DataFrame con los scores actuales de cada (country, keyword)."""
+        rows = []
+        for (country, keyword), st in self.state.items():
+            score_daily = self.w_daily * st['score']
+            score_weekly = self.w_weekly * self._window_diff(st, self.WEEK_DAYS)
+            score_monthly = self.w_monthly * self._window_diff(st, self.MONTH_DAYS)
+            rows.append((country, keyword, score_daily, score_weekly, score_monthly,
+                         score_daily + score_weekly + score_monthly))
+        df_scores = pd.DataFrame(rows, columns=['country', 'keyword', 'score_daily', 'score_weekly',
+                                                'score_monthly', 'score_total'])
+        return df_scores.sort_values(['country', 'keyword'], kind='stable').reset_index(drop=True)
+
+    def top_n(self, top_n=10):
+        """Top top_n por country, con el mismo formato que obtener_top_por_modo."""
+        df_top = _top_n_por_grupo(self.scores(), 'country', 'score_total', top_n)
+        return df_top.sort_values(by=['country', 'score_total'], ascending=[True, False]).reset_index(drop=True)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
 def get_best_vids_metric(df_daily_filtrado):
     # Calculate the first derivative of the histogram
     def inflection_point(hist_data):
@@ -393,7 +600,8 @@ def obtener_top_por_metricas(
     w_daily=1.0,
     w_weekly=1.0,
     w_monthly=1.0,
-    decay_base=0.5
+    decay_base=0.5,
+    backend=None
 ):
     """
     Retorna un diccionario con las top tendencias (keywords) por país para cada métrica especificada,
@@ -417,6 +625,8 @@ def obtener_top_por_metricas(
         Peso para el score mensual.
     decay_base : float
         Base del factor de decaimiento exponencial (por defecto 0.5).
+    backend : str, opcional
+        'pandas' o 'polars' (ver utils.backends.resolve_backend).
     
     Retorna
     -------
@@ -426,172 +636,137 @@ def obtener_top_por_metricas(
         ['country', 'keyword', 'score_daily', 'score_weekly', 'score_monthly', 'score_total'].
     """
     
-    # Inicializar el diccionario de resultados
-    dict_of_top = {}
-    
     # Validar que las métricas existan en el DataFrame
     for metric in metrics:
         if metric not in df_in.columns:
             raise ValueError(f"La métrica '{metric}' no existe en el DataFrame de entrada.")
-    
-    # Procesar cada métrica de forma independiente
-    for metric in metrics:
+
+    if resolve_backend(backend) == 'polars':
+        df_scores = calcular_scores_polars(df_in, metrics, w_daily, w_weekly, w_monthly, decay_base)
+    else:
         # =======================
-        # 1) Preparación de datos
+        # 1) Preparación de datos (una sola copia con las columnas necesarias)
         # =======================
-        df = df_in.copy()
-        
+        df = df_in[['day', 'keyword', 'country'] + list(dict.fromkeys(metrics))].copy()
+
         # Aseguramos que 'day' sea de tipo fecha
-        df['day'] = pd.to_datetime(df['day'], errors='coerce')
+        df['day'] = ensure_datetime(df['day'], errors='coerce')
         df.dropna(subset=['day'], inplace=True)  # Eliminamos filas con 'day' NaN
-        
-        # Aseguramos que la métrica actual sea numérica
-        df[metric] = pd.to_numeric(df[metric], errors='coerce').fillna(0)
-        
-        # =======================
-        # 2) Identificar el último día por (country, keyword)
-        # =======================
-        df_max_day = (
-            df.groupby(['country', 'keyword'], as_index=False)['day']
-              .max()
-              .rename(columns={'day': 'max_day'})
-        )
-        
-        # Merge para tener 'max_day' en cada fila
-        df = df.merge(df_max_day, on=['country', 'keyword'], how='left')
-        
-        # =======================
-        # 3) Calcular la diferencia en días con respecto a 'max_day'
-        # =======================
-        df['days_diff'] = (df['max_day'] - df['day']).dt.days
-        
-        # =======================
-        # 4) Definir factor de decaimiento = decay_base^(days_diff)
-        # =======================
-        df['decay_factor'] = decay_base ** df['days_diff']
-        
-        # =======================
-        # 5) Calcular score diario
-        # =======================
-        # Score diario = w_daily * log1p(metric).clip(lower=0) * decay_factor
-        # Para métricas que pueden tener valores negativos, se pueden ajustar según sea necesario.
-        # Aquí, se usa log1p para comprimir la escala y manejar valores cero.
-        # Si la métrica puede ser negativa y deseas manejarlo diferente, ajusta esta parte.
-        df['score_daily'] = (
-            w_daily * np.log1p(df[metric].clip(lower=0)) * df['decay_factor']
-        )
-        
-        # Agrupar por (country, keyword) para sumar los scores diarios
-        df_daily = (
-            df.groupby(['country', 'keyword'], as_index=False)['score_daily']
-              .sum()
-        )
-        
-        # =======================
-        # 6) Calcular score semanal basado en estacionalidad
-        # =======================
-        # Definir función para calcular score semanal
-        def calcular_score_semanal(group):
-            max_day = group['max_day'].max()
-            last_week_start = max_day - pd.Timedelta(days=6)  # Últimos 7 días
-            
-            # Datos de la última semana
-            last_week_data = group[group['day'] >= last_week_start]
-            previous_weeks_data = group[group['day'] < last_week_start]
-            
-            # Calcular medias
-            last_week_mean = last_week_data[metric].mean() if not last_week_data.empty else 0
-            previous_weeks_mean = previous_weeks_data[metric].mean() if not previous_weeks_data.empty else 0
-            
-            # Diferencia de medias
-            diff_week = last_week_mean - previous_weeks_mean
-            
-            # Calcular score semanal
-            score_weekly = w_weekly * diff_week
-            
-            return pd.Series({'score_weekly': score_weekly})
-        
-        # Aplicar la función a cada grupo (country, keyword)
-        df_weekly = (
-            df.groupby(['country', 'keyword'])
-              .apply(calcular_score_semanal)
-              .reset_index()
-        )
-        
-        # =======================
-        # 7) Calcular score mensual basado en estacionalidad
-        # =======================
-        # Definir función para calcular score mensual
-        def calcular_score_mensual(group):
-            max_day = group['max_day'].max()
-            last_month_start = max_day - pd.Timedelta(days=29)  # Últimos 30 días
-            
-            # Datos del último mes
-            last_month_data = group[group['day'] >= last_month_start]
-            previous_months_data = group[group['day'] < last_month_start]
-            
-            # Calcular medias
-            last_month_mean = last_month_data[metric].mean() if not last_month_data.empty else 0
-            previous_months_mean = previous_months_data[metric].mean() if not previous_months_data.empty else 0
-            
-            # Diferencia de medias
-            diff_month = last_month_mean - previous_months_mean
-            
-            # Calcular score mensual
-            score_monthly = w_monthly * diff_month
-            
-            return pd.Series({'score_monthly': score_monthly})
-        
-        # Aplicar la función a cada grupo (country, keyword)
-        df_monthly = (
-            df.groupby(['country', 'keyword'])
-              .apply(calcular_score_mensual)
-              .reset_index()
-        )
-        
+
+        # Aseguramos que las métricas sean numéricas
+        for metric in metrics:
+            df[metric] = ensure_numeric(df[metric]).fillna(0)
+
         # =======================
-        # 8) Combinar los scores diarios, semanales y mensuales
+        # 2-7) Scores diario, semanal y mensual de todas las métricas en una pasada
         # =======================
-        # Merge de los DataFrames de scores
-        df_combined = df_daily.merge(df_weekly, on=['country', 'keyword'], how='left')
-        df_combined = df_combined.merge(df_monthly, on=['country', 'keyword'], how='left')
-        
-        # Rellenar NaN con 0 en los scores semanales y mensuales (en caso de faltar datos)
-        df_combined[['score_weekly', 'score_monthly']] = df_combined[['score_weekly', 'score_monthly']].fillna(0)
-        
-        # Calcular score_total
+        df_scores = _calcular_scores(df, metrics, w_daily, w_weekly, w_monthly, decay_base)
+
+    # =======================
+    # 8-9) Seleccionar top_n por country basado en score_total
+    # =======================
+    dict_of_top = {}
+    for metric in metrics:
+        df_combined = pd.DataFrame({
+            'country': df_scores['country'],
+            'keyword': df_scores['keyword'],
+            'score_daily': df_scores[('score_daily', metric)],
+            'score_weekly': df_scores[('score_weekly', metric)],
+            'score_monthly': df_scores[('score_monthly', metric)],
+        })
         df_combined['score_total'] = df_combined['score_daily'] + df_combined['score_weekly'] + df_combined['score_monthly']
-        
-        # =======================
-        # 9) Seleccionar top_n por country basado en score_total
-        # =======================
-        def get_top_n_por_country(g):
-            return g.nlargest(top_n, 'score_total')
-        
-        df_top = (
-            df_combined.groupby('country', group_keys=False)
-                        .apply(get_top_n_por_country)
-        )
-        
+
+        df_top = _top_n_por_grupo(df_combined, 'country', 'score_total', top_n)
+
         # Ordenar el resultado final
         df_top = df_top.sort_values(by=['country', 'score_total'], ascending=[True, False]).reset_index(drop=True)
-        
-        # Seleccionar y ordenar columnas relevantes
-        df_top = df_top[['country', 'keyword', 'score_daily', 'score_weekly', 'score_monthly', 'score_total']]
-        
+
         # Añadir al diccionario de resultados
-        dict_of_top[metric] = df_top
-    
+        dict_of_top[metric] = df_top[['country', 'keyword', 'score_daily', 'score_weekly', 'score_monthly', 'score_total']]
+
     return dict_of_top
 
 
-def preprocesar_keys(combined_df_keys):
+def _calcular_scores(df, metrics, w_daily, w_weekly, w_monthly, decay_base):
+    """
+    Calcula los scores diario, semanal y mensual de cada métrica para cada
+    (country, keyword) con una sola agregación agrupada.
+
+    Las medias de la última semana/mes y de los periodos anteriores se obtienen con
+    columnas enmascaradas (NaN fuera de la ventana), de modo que `mean` del groupby
+    equivale a filtrar cada grupo; un periodo sin datos cuenta como 0.
+    Retorna un DataFrame con columnas 'country', 'keyword' y
+    (score_daily|score_weekly|score_monthly, métrica).
+    """
+    keys = ['country', 'keyword']
+    group_ids = df.groupby(keys, observed=True, sort=True).ngroup().to_numpy()
+
+    max_day = df.groupby(keys, observed=True)['day'].transform('max')
+    days_diff = (max_day - df['day']).dt.days.to_numpy()
+    decay_factor = decay_base ** days_diff
+    last_week = (df['day'] >= max_day - pd.Timedelta(days=6)).to_numpy()    # Últimos 7 días
+    last_month = (df['day'] >= max_day - pd.Timedelta(days=29)).to_numpy()  # Últimos 30 días
+
+    parts = {}
+    for metric in metrics:
+        values = df[metric].to_numpy(dtype='float64')
+        parts[('daily', metric)] = w_daily * np.log1p(np.clip(values, 0, None)) * decay_factor
+        parts[('week_in', metric)] = np.where(last_week, values, np.nan)
+        parts[('week_out', metric)] = np.where(last_week, np.nan, values)
+        parts[('month_in', metric)] = np.where(last_month, values, np.nan)
+        parts[('month_out', metric)] = np.where(last_month, np.nan, values)
+    parts = pd.DataFrame(parts)
+
+    sums = parts.xs('daily', axis=1, level=0).groupby(group_ids).sum()
+    means = parts.drop(columns='daily', level=0).groupby(group_ids).mean().fillna(0)
+
+    first_rows = np.unique(group_ids, return_index=True)[1]
+    result = df[keys].iloc[first_rows].reset_index(drop=True)
+    result.columns = pd.MultiIndex.from_tuples([(k, '') for k in keys])
+    for metric in metrics:
+        result[('score_daily', metric)] = sums[metric].to_numpy()
+        result[('score_weekly', metric)] = w_weekly * (means[('week_in', metric)] - means[('week_out', metric)]).to_numpy()
+        result[('score_monthly', metric)] = w_monthly * (means[('month_in', metric)] - means[('month_out', metric)]).to_numpy()
+    result.columns = [k if k in keys else (k, m) for k, m in result.columns]
+    return result
+
+
+def _top_n_por_grupo(df, group_col, score_col, top_n):
+    """
+    Selecciona las top_n filas por grupo con selección parcial (np.partition) en
+    lugar de ordenar cada grupo completo. Reproduce DataFrame.nlargest(keep='first'):
+    resultado en orden descendente de score y, en empates, por orden de aparición.
+    """
+    if top_n <= 0:
+        return df.iloc[[]]
+    scores = df[score_col].to_numpy(dtype='float64')
+    selected = []
+    for _, idx in sorted(df.groupby(group_col, observed=True).indices.items(), key=lambda x: str(x[0])):
+        idx = idx[~np.isnan(scores[idx])]
+        group_scores = scores[idx]
+        if len(idx) > top_n:
+            kth = np.partition(group_scores, len(idx) - top_n)[len(idx) - top_n]
+            above = np.flatnonzero(group_scores > kth)
+            ties = np.flatnonzero(group_scores == kth)[:top_n - len(above)]
+            keep = np.concatenate([above, ties])
+        else:
+            keep = np.arange(len(idx))
+        keep = keep[np.lexsort((keep, -group_scores[keep]))]
+        selected.append(idx[keep])
+    if not selected:
+        return df.iloc[[]]
+    return df.iloc[np.concatenate(selected)]
+
+
+def preprocesar_keys(combined_df_keys, backend=None, df_daily=None):
+    # Backend para las agregaciones pesadas ('pandas' o 'polars', ver utils.backends)
+    backend = resolve_backend(backend)
     # prompt: para cada serie compuesta de keyword, country, obtén la suma acumulada de max_interest en el tiempo
-    df_daily = calculate_daily_stats(combined_df_keys)
-    df_daily = calculate_cumulative_interest(df_daily,'cum_int_T',1)
-    df_daily = calculate_cumulative_interest(df_daily,'cum_int_F',0)
-    df_daily = df_daily[df_daily['cum_int_T']*df_daily['cum_int_F']>0]
-    df_daily.drop(columns=['cum_int_T','cum_int_F'], inplace=True)
+    # Las estadísticas diarias pueden venir ya agregadas durante la ingesta (utils.daily_aggregator)
+    if df_daily is None:
+        df_daily = calculate_daily_stats(combined_df_keys, backend=backend)
+    # Quitar los días sin interés al inicio y al final de cada serie (orden: día descendente)
+    df_daily = trim_zero_edges(df_daily, ascending=False)
     # Encuentra la fecha máxima en el DataFrame
     fecha_maxima = df_daily['day'].max()
     fecha_limite = fecha_maxima - timedelta(days=60)
@@ -600,22 +775,24 @@ def preprocesar_keys(combined_df_keys):
     punto_de_corte = get_best_vids_metric(df_daily_filtrado)
     punto_de_corte *=.8
     # print(punto_de_corte)
-    best_50 = pd.pivot_table(df_daily_filtrado,index =['keyword','country'],
-                            values=['mean_interest']).sort_values('mean_interest',ascending=False).head(75)
-                            
-    best_50_index = best_50[best_50['mean_interest']>punto_de_corte].index
+    # Ranking de series por mean_interest (se calcula una sola vez)
+    ranking = pd.pivot_table(df_daily_filtrado,index =['keyword','country'],
+                            values=['mean_interest'], observed=True).sort_values('mean_interest',ascending=False)
 
-    worst_40 = pd.pivot_table(df_daily_filtrado,index =['keyword','country'],
-                            values=['mean_interest']).sort_values('mean_interest',ascending=False).tail(40)
+    best_50 = ranking.head(75)
+    best_50_index = best_50[best_50['mean_interest']>punto_de_corte].index
 
+    worst_40 = ranking.tail(40)
     worst_40_index = worst_40[worst_40['mean_interest']<=(punto_de_corte/2)].index
 
-    df_daily_filtrado_BS = df_daily_filtrado[df_daily_filtrado.apply(lambda row: (row['keyword'], row['country']) in best_50_index, axis=1)]
-    df_daily_filtrado_WS = df_daily_filtrado[df_daily_filtrado.apply(lambda row: (row['keyword'], row['country']) in worst_40_index, axis=1)]
+    # Selección de filas por pertenencia al índice (keyword, country), sin apply por fila
+    series_index = pd.MultiIndex.from_frame(df_daily_filtrado[['keyword', 'country']])
+    df_daily_filtrado_BS = df_daily_filtrado[series_index.isin(best_50_index)]
+    df_daily_filtrado_WS = df_daily_filtrado[series_index.isin(worst_40_index)]
 
     inc_trends_max = obtener_top_por_metricas(df_daily_filtrado_BS, ['mean_interest', 
                                                                     'min_interest', 
-                                                                    'max_interest'],30)
+                                                                    'max_interest'],30, backend=backend)
 
     all_dfs = []
     for key, df in inc_trends_max.items():
@@ -0,0 +1,132 @@
+# utils/rate_limit.py
+
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Limitador global de llamadas por segundo, seguro para varios hilos.
+    Cada llamada a acquire() reserva el siguiente hueco disponible y
+    duerme hasta que llegue su turno.
+    """
+
+    def __init__(self, requests_per_second=1.0):
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second debe ser mayor que 0.")
+        self.interval = 1.0 / requests_per_second
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+
+
+def is_rate_limited(error):
+    """True si la excepción corresponde a una respuesta 429 (pytrends, requests o gspread)."""
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None) == 429
+
+
+class AdaptiveRateLimiter:
+    """
+    Limitador de tipo token bucket cuya tasa se adapta con AIMD, seguro para varios hilos.
+
+    - acquire() consume un token; si no hay, reserva el siguiente y duerme hasta
+      que se genere (la deuda de tokens reparte los turnos entre los hilos).
+    - on_success() sube la tasa de forma aditiva (+increase) hasta max_rate.
+    - on_throttle() la multiplica por decrease (hasta min_rate) tras un 429; sólo
+      se reduce una vez por intervalo para que una ráfaga de 429 simultáneos no
+      la hunda de golpe.
+
+    Así se trabaja cerca del límite real de la API sin fijarlo de antemano.
+    """
+
+    def __init__(self, requests_per_second=1.0, min_rate=0.05, max_rate=2.0, increase=0.05, decrease=0.5,
+                 burst=1):
+        if not 0 < min_rate <= requests_per_second <= max_rate:
+            raise ValueError("Se necesita 0 < min_rate <= requests_per_second <= max_rate.")
+        self.rate = requests_per_second
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._last_decrease = float('-inf')
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now - self._last_decrease >= 1.0 / self.rate:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+                logger.warning(f"Respuesta 429: tasa reducida a {self.rate:.2f} peticiones/s.")
+
+
+def call_with_backoff(fn, limiter=None, retries=5, backoff_seconds=2.0, max_backoff_seconds=60.0,
+                      on_retry=None):
+    """
+    Ejecuta fn() y la reintenta si la API responde 429 (ver is_rate_limited).
+
+    Antes de cada intento se espera turno en limiter (RateLimiter o
+    AdaptiveRateLimiter). Tras un 429 se avisa al limitador y se espera
+    backoff_seconds * 2**(intento - 1), limitado a max_backoff_seconds, con
+    jitter (entre la mitad y el total) para que los hilos no reintenten a la
+    vez. Otros errores, o el 429 del último intento, se propagan.
+    on_retry(intento, espera, error) se llama antes de cada espera.
+    """
+    if retries < 1:
+        raise ValueError("retries debe ser al menos 1.")
+    for attempt in range(1, retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            result = fn()
+        except Exception as e:
+            if not is_rate_limited(e):
+                raise
+            if limiter is not None and hasattr(limiter, 'on_throttle'):
+                limiter.on_throttle()
+            if attempt == retries:
+                raise
+            wait = min(max_backoff_seconds, backoff_seconds * 2 ** (attempt - 1))
+            wait = random.uniform(wait / 2, wait)
+            if on_retry is not None:
+                on_retry(attempt, wait, e)
+            time.sleep(wait)
+        else:
+            if limiter is not None and hasattr(limiter, 'on_success'):
+                limiter.on_success()
+            return result
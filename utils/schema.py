@@ -0,0 +1,98 @@
+# utils/schema.py
+
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
+
+# Esquema de los snapshots leídos de Drive. Cada columna presente se convierte
+# una sola vez al leerse; las columnas que no aparecen en el esquema se dejan igual.
+#   - ('datetime', formato): fecha con formato explícito (con respaldo si no encaja)
+#   - 'category': texto repetido (keyword, country, ...)
+#   - 'float32' / 'float64': numérico; el interés (0-100) cabe sin pérdida en float32
+SNAPSHOT_SCHEMA = {
+    'date': ('datetime', '%Y-%m-%d %H:%M:%S'),
+    'day': ('datetime', '%Y-%m-%d'),
+    'keyword': 'category',
+    'country': 'category',
+    'timeframe': 'category',
+    'interest': 'float32',
+    'max_interest': 'float64',
+    'min_interest': 'float64',
+    'mean_interest': 'float64',
+    'median_interest': 'float64',
+    'std_interest': 'float64',
+}
+
+
+def ensure_datetime(series, format=None, errors='raise'):
+    """Convierte a datetime sólo si la serie no lo es ya."""
+    if is_datetime64_any_dtype(series):
+        return series
+    return pd.to_datetime(series, format=format, errors=errors)
+
+
+def ensure_numeric(series, errors='coerce'):
+    """Convierte a numérico sólo si la serie no lo es ya."""
+    if is_numeric_dtype(series):
+        return series
+    return pd.to_numeric(series, errors=errors)
+
+
+def _parse_datetime(series, fmt):
+    if is_datetime64_any_dtype(series):
+        return series
+    parsed = pd.to_datetime(series, format=fmt, errors='coerce')
+    # Respaldo para los valores que no siguen el formato esperado
+    failed = parsed.isna() & series.notna() & (series.astype(str) != '')
+    if failed.any():
+        parsed[failed] = pd.to_datetime(series[failed], format='mixed', errors='coerce')
+    return parsed
+
+
+def apply_schema(df, schema=SNAPSHOT_SCHEMA):
+    """Aplica el esquema a las columnas presentes en df. Es idempotente."""
+    df = df.copy()
+    for column, dtype in schema.items():
+        if column not in df.columns:
+            continue
+        if isinstance(dtype, tuple) and dtype[0] == 'datetime':
+            df[column] = _parse_datetime(df[column], dtype[1])
+        elif dtype == 'category':
+            if not isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype('category')
+        elif str(df[column].dtype) != dtype:
+            df[column] = ensure_numeric(df[column]).astype(dtype)
+    return df
+
+
+def concat_with_schema(frames):
+    """
+    Concatena DataFrames tipados conservando las columnas categóricas: antes de
+    concatenar, cada columna categórica pasa a usar la unión ordenada de las
+    categorías de todos los DataFrames (si difieren, pandas las convertiría a object).
+    """
+    categorical_columns = {
+        column
+        for df in frames
+        for column in df.columns
+        if isinstance(df[column].dtype, pd.CategoricalDtype)
+    }
+    if not categorical_columns:
+        return pd.concat(frames, ignore_index=True)
+
+    categories = {}
+    for column in categorical_columns:
+        values = set()
+        for df in frames:
+            if column in df.columns:
+                col = df[column]
+                values.update(col.cat.categories if isinstance(col.dtype, pd.CategoricalDtype) else col.dropna().unique())
+        categories[column] = sorted(values, key=str)
+
+    aligned = []
+    for df in frames:
+        df = df.copy()
+        for column, cats in categories.items():
+            if column in df.columns:
+                df[column] = pd.Categorical(df[column], categories=cats)
+        aligned.append(df)
+    return pd.concat(aligned, ignore_index=True)
@@ -0,0 +1,167 @@
+# utils/sheets_sink.py
+
+import hashlib
+import json
+import logging
+import math
+import numbers
+import os
+
+from gspread.utils import ValueRenderOption, rowcol_to_a1
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Celdas máximas por llamada a batch_update; la API recomienda peticiones de ~2 MB
+MAX_CELLS_PER_REQUEST = 50000
+
+
+def _normalize_cell(value):
+    """Valor comparable de una celda: '' para vacíos, float para números, texto si no."""
+    if value is None or value == '':
+        return ''
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, numbers.Real):
+        return float(value) if math.isfinite(value) else ''
+    return str(value)
+
+
+def _row_hash(row):
+    """Huella de una fila; las celdas vacías al final se ignoran (la API no las devuelve)."""
+    cells = [_normalize_cell(v) for v in row]
+    while cells and cells[-1] == '':
+        cells.pop()
+    return hashlib.sha1(repr(cells).encode('utf-8')).hexdigest()
+
+
+def _fingerprint_path(fingerprint_dir, worksheet):
+    key = f"{worksheet.spreadsheet_id}:{worksheet.id}"
+    return os.path.join(fingerprint_dir, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+
+def _load_fingerprint(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            fingerprint = json.load(f)
+        return fingerprint['width'], fingerprint['rows']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _save_fingerprint(path, width, hashes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'width': width, 'rows': hashes}, f)
+    os.replace(tmp_path, path)
+
+
+def _read_fingerprint(worksheet, acquire):
+    """Lee los valores actuales de la hoja (sin formato) y retorna (ancho, huellas por fila)."""
+    acquire()
+    metrics.incr('sheets.read_calls')
+    values = worksheet.get_all_values(value_render_option=ValueRenderOption.unformatted)
+    width = max((len(row) for row in values), default=0)
+    return width, [_row_hash(row) for row in values]
+
+
+def _changed_ranges(old_hashes, new_hashes):
+    """Rangos [inicio, fin) de filas cuyo contenido cambió o que no existían."""
+    ranges = []
+    start = None
+    for i, new_hash in enumerate(new_hashes):
+        changed = i >= len(old_hashes) or old_hashes[i] != new_hash
+        if changed and start is None:
+            start = i
+        elif not changed and start is not None:
+            ranges.append((start, i))
+            start = None
+    if start is not None:
+        ranges.append((start, len(new_hashes)))
+    return ranges
+
+
+def _batches(rows, ranges, width, max_cells):
+    """Agrupa los rangos en peticiones de como mucho max_cells celdas (partiendo los rangos grandes)."""
+    rows_per_block = max(1, max_cells // max(width, 1))
+    batch, batch_cells = [], 0
+    for start, end in ranges:
+        for block_start in range(start, end, rows_per_block):
+            block_end = min(end, block_start + rows_per_block)
+            cells = (block_end - block_start) * width
+            if batch and batch_cells + cells > max_cells:
+                yield batch
+                batch, batch_cells = [], 0
+            batch.append({
+                'range': f"{rowcol_to_a1(block_start + 1, 1)}:{rowcol_to_a1(block_end, width)}",
+                'values': rows[block_start:block_end],
+            })
+            batch_cells += cells
+    if batch:
+        yield batch
+
+
+def write_dataframe_incremental(worksheet, df, fingerprint_dir=None, max_cells_per_request=MAX_CELLS_PER_REQUEST,
+                                limiter=None):
+    """
+    Escribe df (con encabezado) en la hoja enviando sólo las filas que cambiaron.
+
+    La huella actual de la hoja (un hash por fila) se toma de fingerprint_dir si
+    existe, o leyendo la hoja en una sola llamada. Las filas distintas se agrupan
+    en rangos contiguos y se envían con batch_update en peticiones de como mucho
+    max_cells_per_request celdas; las filas sobrantes del final se borran. Si la
+    hoja tiene más columnas que df, se reescribe completa como antes.
+
+    df debe contener valores serializables a JSON (ver sanitize_dataframe). Con
+    limiter (utils.rate_limit.RateLimiter) cada llamada a la API espera su turno.
+    Retorna un dict con las celdas escritas, las omitidas y las peticiones enviadas.
+    """
+    acquire = limiter.acquire if limiter is not None else (lambda: None)
+
+    # None se envía como '' para que la celda quede vacía (la API omite los null)
+    rows = [[('' if v is None else v) for v in row]
+            for row in [df.columns.values.tolist()] + df.values.tolist()]
+    width = len(rows[0])
+    new_hashes = [_row_hash(row) for row in rows]
+
+    path = _fingerprint_path(fingerprint_dir, worksheet) if fingerprint_dir else None
+    current = _load_fingerprint(path) if path else None
+    if current is None:
+        current = _read_fingerprint(worksheet, acquire)
+    old_width, old_hashes = current
+
+    # La huella se invalida mientras se escribe: si algo falla, la próxima vez se lee la hoja
+    if path and os.path.exists(path):
+        os.remove(path)
+
+    if old_width > width:
+        # Sobran columnas de la versión anterior: se reescribe todo
+        acquire()
+        metrics.incr('sheets.write_calls')
+        worksheet.clear()
+        old_hashes = []
+    elif len(old_hashes) > len(rows):
+        acquire()
+        metrics.incr('sheets.write_calls')
+        worksheet.batch_clear([f"{rowcol_to_a1(len(rows) + 1, 1)}:{rowcol_to_a1(len(old_hashes), max(old_width, 1))}"])
+
+    ranges = _changed_ranges(old_hashes, new_hashes)
+    requests = 0
+    for batch in _batches(rows, ranges, width, max_cells_per_request):
+        acquire()
+        metrics.incr('sheets.write_calls')
+        worksheet.batch_update(batch)
+        requests += 1
+
+    if path:
+        _save_fingerprint(path, width, new_hashes)
+
+    written = sum(end - start for start, end in ranges) * width
+    stats = {'written': written, 'skipped': len(rows) * width - written, 'requests': requests}
+    metrics.incr('sheets.cells_written', stats['written'])
+    metrics.incr('sheets.cells_skipped', stats['skipped'])
+    logger.info(f"Hoja '{worksheet.title}': {stats['written']} celdas escritas, {stats['skipped']} omitidas "
+                f"sin cambios, en {stats['requests']} peticiones.")
+    return stats
@@ -0,0 +1,78 @@
+# utils/snapshot_cache.py
+
+import logging
+import os
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCache:
+    """
+    Caché local en Parquet de los snapshots de Drive leídos por
+    get_sheets_data_from_folder.
+
+    Un snapshot no cambia una vez escrito, así que cada hoja se guarda bajo
+    (file_id, modifiedTime): si el archivo se modifica en Drive, la clave cambia y
+    se vuelve a descargar.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _version(modified_time):
+        return pd.Timestamp(modified_time).strftime('%Y%m%dT%H%M%S%f')
+
+    def _path(self, file):
+        return os.path.join(self.cache_dir, f"{file['id']}__{self._version(file['modifiedTime'])}.parquet")
+
+    def get(self, file):
+        """Retorna el DataFrame guardado para el archivo de Drive o None si no está en caché."""
+        if 'modifiedTime' not in file:
+            return None
+        path = self._path(file)
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            logger.warning(f"No se pudo leer el snapshot en caché '{path}': {str(e)}")
+            return None
+
+    def set(self, file, df):
+        """Guarda el DataFrame del archivo de Drive, reemplazando versiones anteriores del mismo id."""
+        if 'modifiedTime' not in file:
+            return
+        path = self._path(file)
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(f"{file['id']}__") and os.path.join(self.cache_dir, name) != path:
+                os.remove(os.path.join(self.cache_dir, name))
+        tmp_path = path + '.tmp'
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar en caché el archivo {file.get('name', file['id'])}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def evict(self, cutoff):
+        """Elimina los snapshots cuyo modifiedTime es anterior a cutoff (datetime UTC)."""
+        cutoff = pd.Timestamp(cutoff, tz='UTC') if pd.Timestamp(cutoff).tzinfo is None else pd.Timestamp(cutoff)
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.parquet'):
+                continue
+            version = name[:-len('.parquet')].rsplit('__', 1)[-1]
+            try:
+                modified = pd.Timestamp(pd.to_datetime(version, format='%Y%m%dT%H%M%S%f'), tz='UTC')
+            except ValueError:
+                continue
+            if modified < cutoff:
+                os.remove(os.path.join(self.cache_dir, name))
+                removed += 1
+        if removed:
+            logger.info(f"Eliminados {removed} snapshots antiguos de la caché '{self.cache_dir}'.")
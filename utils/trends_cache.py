@@ -0,0 +1,146 @@
+# utils/trends_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Vigencia (en segundos) de cada periodo: las ventanas horarias caducan antes
+# que las diarias porque Google las actualiza con más frecuencia.
+DEFAULT_TTL_BY_TIMEFRAME = {
+    'now 1-H': 10 * 60,
+    'now 4-H': 30 * 60,
+    'now 1-d': 60 * 60,
+    'now 7-d': 2 * 60 * 60,
+    'today 1-m': 12 * 60 * 60,
+    'today 3-m': 24 * 60 * 60,
+    'today 12-m': 7 * 24 * 60 * 60,
+    'today 5-y': 7 * 24 * 60 * 60,
+}
+DEFAULT_TTL = 6 * 60 * 60
+
+
+def payload_key(keywords, timeframe, geo, hl, tz):
+    """Clave normalizada de un payload: las palabras clave se ordenan para que el orden no importe."""
+    normalized = json.dumps(
+        {'kw': sorted(keywords), 'timeframe': timeframe, 'geo': geo, 'hl': hl, 'tz': tz},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class TrendsCache:
+    """
+    Caché en disco de los DataFrames de interest_over_time de pytrends.
+
+    Cada payload se guarda en un archivo propio. La fecha de creación se guarda
+    dentro del archivo para aplicar el TTL del periodo; la fecha de modificación
+    del archivo se actualiza en cada lectura y sirve como orden LRU para
+    expulsar entradas cuando el tamaño total supera max_bytes.
+    """
+
+    def __init__(self, cache_dir, ttl_by_timeframe=None, default_ttl=DEFAULT_TTL, max_bytes=200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl_by_timeframe = dict(DEFAULT_TTL_BY_TIMEFRAME)
+        if ttl_by_timeframe:
+            self.ttl_by_timeframe.update(ttl_by_timeframe)
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def ttl(self, timeframe):
+        return self.ttl_by_timeframe.get(timeframe, self.default_ttl)
+
+    def get(self, keywords, timeframe, geo, hl, tz):
+        """
+        Retorna el DataFrame guardado para el payload o None si no existe o caducó.
+        Las columnas de palabras clave se devuelven en el orden de `keywords`.
+        """
+        path = self._path(payload_key(keywords, timeframe, geo, hl, tz))
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Entrada de caché corrupta en '{path}', se descarta: {str(e)}")
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        if time.time() - entry['created'] > self.ttl(timeframe):
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        # Marcar como usado recientemente para el orden LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        frame = entry['frame']
+        ordered = [k for k in keywords if k in frame.columns]
+        rest = [c for c in frame.columns if c not in ordered]
+        return frame[ordered + rest]
+
+    def set(self, keywords, timeframe, geo, hl, tz, frame):
+        """Guarda el DataFrame del payload de forma atómica y aplica la expulsión por tamaño."""
+        path = self._path(payload_key(keywords, timeframe, geo, hl, tz))
+        entry = {'created': time.time(), 'frame': frame}
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar la entrada de caché '{path}': {str(e)}")
+            self._remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Elimina las entradas menos usadas recientemente hasta quedar por debajo de max_bytes."""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith('.pkl'):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                return
+
+            for _, size, path in sorted(entries):
+                self._remove(path)
+                total -= size
+                if total <= self.max_bytes:
+                    break
+            logger.info(f"Caché de Trends reducida a {total} bytes.")
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
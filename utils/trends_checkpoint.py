@@ -0,0 +1,140 @@
+# utils/trends_checkpoint.py
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Un checkpoint más antiguo no se reanuda: los datos de Trends ya habrán cambiado
+DEFAULT_MAX_AGE = 6 * 60 * 60
+
+
+def task_key(task):
+    """Clave de un payload (chunk, country_name, geo, timeframe); el orden del chunk no importa."""
+    chunk, country_name, geo, timeframe = task
+    normalized = json.dumps([sorted(chunk), country_name, geo, timeframe], ensure_ascii=False)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def run_key(tasks):
+    """Identificador de una ejecución: el conjunto de payloads planificados."""
+    normalized = json.dumps(sorted(task_key(task) for task in tasks))
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class TrendsCheckpoint:
+    """
+    Diario de los payloads completados por print_trends, para reanudar una
+    ejecución interrumpida sin volver a descargarlos.
+
+    - partials.pkl: archivo de sólo añadidura con un registro pickle por payload
+      (su clave y el DataFrame en formato largo).
+    - manifest.json: identificador de la ejecución, fecha de inicio y posición
+      (offset, tamaño) de cada registro confirmado; se reescribe de forma atómica
+      después de cada añadidura, así que un registro a medio escribir se ignora.
+
+    Si el plan de payloads cambia o el checkpoint tiene más de max_age segundos
+    se descarta y se empieza de cero. Al terminar la ejecución se llama a clear().
+    """
+
+    def __init__(self, directory, max_age=DEFAULT_MAX_AGE):
+        self.directory = directory
+        self.max_age = max_age
+        self.journal_path = os.path.join(directory, 'partials.pkl')
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.run = None
+        self.created = None
+        self.done = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifiesto de checkpoint ilegible en '{self.manifest_path}', se descarta: {str(e)}")
+            return None
+
+    def _save_manifest(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'run': self.run, 'created': self.created, 'done': self.done}, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def start(self, tasks):
+        """
+        Abre el checkpoint para el plan `tasks`. Retorna {task_key: DataFrame} con
+        los payloads ya completados de la misma ejecución (vacío si no hay).
+        """
+        current = run_key(tasks)
+        manifest = self._load_manifest()
+        with self._lock:
+            if (manifest is None or manifest.get('run') != current
+                    or time.time() - manifest.get('created', 0) > self.max_age):
+                if manifest is not None:
+                    logger.info("Checkpoint de Trends de otra ejecución o caducado; se empieza de cero.")
+                self._reset(current)
+                return {}
+
+            self.run = current
+            self.created = manifest['created']
+            self.done = {}
+            partials = {}
+            try:
+                with open(self.journal_path, 'rb') as f:
+                    for key, (offset, length) in manifest['done'].items():
+                        f.seek(offset)
+                        record = pickle.loads(f.read(length))
+                        partials[key] = record['frame']
+                        self.done[key] = [offset, length]
+            except Exception as e:
+                logger.warning(f"Diario de checkpoint dañado en '{self.journal_path}': {str(e)}. "
+                               f"Se conservan {len(partials)} payloads.")
+            # Lo que haya tras el último registro confirmado se sobrescribe
+            end = max((offset + length for offset, length in self.done.values()), default=0)
+            with open(self.journal_path, 'ab') as f:
+                f.truncate(end)
+            self._save_manifest()
+
+        logger.info(f"Reanudando desde checkpoint: {len(partials)} de {len(tasks)} payloads ya completados.")
+        return partials
+
+    def _reset(self, current):
+        self.run = current
+        self.created = time.time()
+        self.done = {}
+        with open(self.journal_path, 'wb'):
+            pass
+        self._save_manifest()
+
+    def record(self, task, frame):
+        """Añade el resultado de un payload al diario y lo confirma en el manifiesto."""
+        key = task_key(task)
+        data = pickle.dumps({'key': key, 'frame': frame}, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            with open(self.journal_path, 'ab') as f:
+                offset = f.tell()
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.done[key] = [offset, len(data)]
+            self._save_manifest()
+
+    def clear(self):
+        """Elimina el checkpoint tras una ejecución completa."""
+        with self._lock:
+            for path in (self.journal_path, self.manifest_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.done = {}
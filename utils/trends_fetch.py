@@ -0,0 +1,47 @@
+# utils/trends_fetch.py
+
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def crear_sesiones(pytrends, n_sesiones):
+    """
+    Crea n_sesiones objetos de la misma clase que pytrends (TrendReq o su sustituto
+    local) con la misma configuración (hl, tz, timeout). La primera sesión es el
+    propio pytrends.
+    """
+    sesiones = [pytrends]
+    for _ in range(n_sesiones - 1):
+        sesiones.append(type(pytrends)(hl=pytrends.hl, tz=pytrends.tz, timeout=pytrends.timeout))
+    return sesiones
+
+
+def run_payloads(tasks, fetch_fn, sessions, max_workers=None):
+    """
+    Ejecuta fetch_fn(session, task) para cada tarea en un pool acotado de hilos.
+
+    Cada hilo toma en exclusiva una sesión del pool mientras procesa su tarea,
+    ya que TrendReq guarda estado del último payload y no es seguro compartirlo.
+    Los resultados se retornan en el mismo orden que `tasks`.
+    """
+    if not sessions:
+        raise ValueError("Se necesita al menos una sesión para ejecutar los payloads.")
+
+    max_workers = min(max_workers or len(sessions), len(sessions))
+    pool = queue.Queue()
+    for session in sessions:
+        pool.put(session)
+
+    def _worker(task):
+        session = pool.get()
+        try:
+            return fetch_fn(session, task)
+        finally:
+            pool.put(session)
+
+    logger.info(f"Ejecutando {len(tasks)} payloads con {max_workers} hilos...")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_worker, tasks))
@@ -0,0 +1,168 @@
+# utils/trends_incremental.py
+
+import logging
+import os
+import pickle
+import tempfile
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Periodos que admiten descarga incremental: (longitud de la ventana, resolución,
+# solapamiento mínimo con la serie guardada para reescalar los puntos nuevos).
+# Google devuelve datos horarios para rangos de 1 a 7 días y diarios hasta ~9 meses,
+# por lo que el solapamiento también garantiza que la delta tenga la misma resolución.
+INCREMENTAL_WINDOWS = {
+    'now 7-d': (timedelta(days=7), 'hourly', timedelta(days=2)),
+    'today 1-m': (timedelta(days=30), 'daily', timedelta(days=7)),
+    'today 3-m': (timedelta(days=90), 'daily', timedelta(days=7)),
+}
+
+
+def delta_timeframe(timeframe, last_date, now):
+    """
+    Retorna el periodo explícito más pequeño que cubre los puntos nuevos desde
+    last_date hasta now (con el solapamiento necesario para reescalar), o None si
+    el periodo no admite descarga incremental o la delta no sería más pequeña que
+    la ventana completa.
+    """
+    if timeframe not in INCREMENTAL_WINDOWS:
+        return None
+    window, resolution, overlap = INCREMENTAL_WINDOWS[timeframe]
+
+    start = last_date - overlap
+    if now - start >= window:
+        return None
+
+    if resolution == 'hourly':
+        return f"{start:%Y-%m-%dT%H} {now:%Y-%m-%dT%H}"
+    return f"{start:%Y-%m-%d} {now:%Y-%m-%d}"
+
+
+def stitch_series(old, new, window):
+    """
+    Une la serie guardada `old` con la serie descargada `new` (ambas indexadas por fecha).
+
+    Los puntos nuevos se reescalan con el cociente de sumas en las fechas que ambas
+    series comparten (el ancla), de modo que la serie unida queda en la escala de la
+    guardada. El último punto de cada descarga puede ser parcial (isPartial) y no
+    entra en el ancla. Retorna la serie sin redondear (la normalización a 0-100 se
+    hace por payload en fetch_incremental) o None si no hay solapamiento utilizable.
+    """
+    old = old.sort_index()
+    new = new.sort_index()
+    overlap = old.index[:-1].intersection(new.index[:-1])
+    if len(overlap) == 0:
+        return None
+
+    old_sum = old.loc[overlap].sum()
+    new_sum = new.loc[overlap].sum()
+    if new_sum > 0:
+        scale = old_sum / new_sum
+    elif old_sum == 0:
+        scale = 1.0
+    else:
+        return None
+
+    stitched = pd.concat([old[~old.index.isin(new.index)], new * scale]).sort_index()
+    # Misma ventana que una descarga completa, con sus dos extremos incluidos
+    stitched = stitched[stitched.index >= stitched.index.max() - window]
+    return stitched
+
+
+class TrendsSeriesStore:
+    """
+    Última serie guardada por (keyword, country, timeframe), persistida en un
+    archivo pickle entre ejecuciones de print_trends.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.series = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    self.series = pickle.load(f)
+                logger.info(f"Cargadas {len(self.series)} series incrementales de '{path}'.")
+            except Exception as e:
+                logger.warning(f"No se pudo leer el almacén incremental '{path}': {str(e)}")
+
+    def get(self, keyword, country, timeframe):
+        return self.series.get((keyword, country, timeframe))
+
+    def last_date(self, keyword, country, timeframe):
+        serie = self.get(keyword, country, timeframe)
+        if serie is None or serie.empty:
+            return None
+        return serie.index.max()
+
+    def update(self, interest_df):
+        """Reemplaza las series guardadas con las de un DataFrame en formato keywords_interest."""
+        if interest_df.empty:
+            return
+        for (keyword, country, timeframe), group in interest_df.groupby(['keyword', 'country', 'timeframe']):
+            self.series[(keyword, country, timeframe)] = group.set_index('date')['interest'].sort_index()
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(self.series, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+        logger.info(f"Guardadas {len(self.series)} series incrementales en '{self.path}'.")
+
+
+def fetch_incremental(chunk, country_name, timeframe, store, fetch_fn, now=None):
+    """
+    Obtiene el interés de un bloque descargando sólo la delta respecto a las series
+    guardadas en `store`. fetch_fn(timeframe) debe retornar un DataFrame largo con
+    columnas ['date', 'keyword', 'interest', 'country', 'timeframe'] o None.
+
+    Si alguna palabra clave no tiene serie guardada, la delta no es más pequeña que
+    la ventana o no se puede reescalar, se descarga la ventana completa.
+    """
+    now = now or datetime.utcnow()
+
+    last_dates = [store.last_date(k, country_name, timeframe) for k in chunk]
+    delta = None
+    if all(d is not None for d in last_dates):
+        delta = delta_timeframe(timeframe, min(last_dates), now)
+    if delta is None:
+        return fetch_fn(timeframe)
+
+    new_df = fetch_fn(delta)
+    if new_df is None:
+        return fetch_fn(timeframe)
+
+    window = INCREMENTAL_WINDOWS[timeframe][0]
+    stitched_series = {}
+    for keyword in chunk:
+        new = new_df[new_df['keyword'] == keyword].set_index('date')['interest']
+        stitched = stitch_series(store.get(keyword, country_name, timeframe), new, window)
+        if stitched is None:
+            logger.info(f"Sin solapamiento para reescalar {keyword} en {country_name}, periodo {timeframe}; "
+                        f"se descarga la ventana completa.")
+            return fetch_fn(timeframe)
+        stitched_series[keyword] = stitched
+
+    # Si algún punto supera 100, todo el payload se normaliza otra vez a 0-100 con un
+    # mismo factor, para que las palabras clave sigan siendo comparables entre sí
+    peak = max(serie.max() for serie in stitched_series.values())
+    factor = 100 / peak if peak > 100 else 1.0
+
+    stitched_frames = []
+    for keyword, stitched in stitched_series.items():
+        stitched_frames.append(pd.DataFrame({
+            'date': stitched.index,
+            'keyword': keyword,
+            'interest': (stitched * factor).round().astype(int).values,
+        }))
+
+    logger.info(f"Delta '{delta}' unida para {chunk} en {country_name}, periodo {timeframe}")
+    result = pd.concat(stitched_frames, ignore_index=True)
+    result['country'] = country_name
+    result['timeframe'] = timeframe
+    return result
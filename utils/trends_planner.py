@@ -0,0 +1,122 @@
+# utils/trends_planner.py
+
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+
+def _resolve_country(value, countries):
+    """Retorna el nombre del país en `countries` que corresponde a value (nombre, 'geo' o 'pn')."""
+    value_norm = str(value).strip().lower()
+    for country_name, codes in countries.items():
+        candidates = [country_name, codes.get('geo', ''), codes.get('pn', '')]
+        if value_norm in (str(c).lower() for c in candidates):
+            return country_name
+    return None
+
+
+def plan_payloads(keywords, countries, timeframes, slots=5, use_anchor=True):
+    """
+    Planifica los payloads de print_trends agrupando las palabras clave por su propio país.
+
+    Parámetros
+    ----------
+    keywords : list of (str, str)
+        Pares (keyword, country), en orden de prioridad (p. ej. por mean_interest descendente).
+    countries : dict
+        Países con sus códigos 'geo' y 'pn', como en print_trends.
+    timeframes : list of str
+        Periodos a consultar.
+    slots : int
+        Número máximo de palabras clave por payload (Google admite 5).
+    use_anchor : bool
+        Si es True, la primera palabra clave de cada país se incluye en todos sus
+        payloads como ancla común para poder comparar bloques entre sí.
+
+    Retorna
+    -------
+    tasks : list of (chunk, country_name, geo, timeframe)
+    anchors : dict
+        Ancla elegida para cada país ({} si use_anchor=False).
+    stats : dict
+        Llamadas del plan ingenuo, del plan nuevo y llamadas ahorradas.
+    """
+    # Eliminar duplicados de todo el listado conservando el orden
+    unique_pairs = list(dict.fromkeys((k, c) for k, c in keywords))
+
+    # Agrupar por país; las palabras clave con un país desconocido se piden en todos
+    by_country = {country_name: [] for country_name in countries}
+    for keyword, country in unique_pairs:
+        country_name = _resolve_country(country, countries)
+        targets = [country_name] if country_name else list(countries)
+        if not country_name:
+            logger.warning(f"País '{country}' de la palabra clave '{keyword}' no reconocido; se consultará en todos.")
+        for target in targets:
+            if keyword not in by_country[target]:
+                by_country[target].append(keyword)
+
+    tasks = []
+    anchors = {}
+    for country_name, country_keywords in by_country.items():
+        if not country_keywords:
+            continue
+        geo = countries[country_name]['geo']
+
+        if use_anchor and len(country_keywords) > slots:
+            anchor = country_keywords[0]
+            anchors[country_name] = anchor
+            rest = country_keywords[1:]
+            chunks = [[anchor] + rest[i:i + slots - 1] for i in range(0, len(rest), slots - 1)]
+        else:
+            chunks = [country_keywords[i:i + slots] for i in range(0, len(country_keywords), slots)]
+
+        for timeframe in timeframes:
+            for chunk in chunks:
+                tasks.append((chunk, country_name, geo, timeframe))
+
+    naive_calls = len(countries) * len(timeframes) * math.ceil(len(keywords) / slots)
+    stats = {
+        'naive_calls': naive_calls,
+        'planned_calls': len(tasks),
+        'saved_calls': naive_calls - len(tasks),
+    }
+    logger.info(f"Plan de payloads: {stats['planned_calls']} llamadas frente a {stats['naive_calls']} "
+                f"del plan ingenuo ({stats['saved_calls']} ahorradas).")
+    return tasks, anchors, stats
+
+
+def align_to_anchor(tasks, results, anchors):
+    """
+    Reescala los resultados de cada payload para que el ancla coincida con la del
+    primer payload de su (país, periodo), y elimina las filas repetidas del ancla.
+
+    `results` es la lista de DataFrames largos (o None) en el mismo orden que `tasks`.
+    """
+    reference = {}
+    aligned = []
+    for (chunk, country_name, _, timeframe), frame in zip(tasks, results):
+        anchor = anchors.get(country_name)
+        if frame is None or anchor is None or anchor not in chunk:
+            aligned.append(frame)
+            continue
+
+        anchor_series = frame.loc[frame['keyword'] == anchor].set_index('date')['interest']
+        key = (country_name, timeframe)
+        if key not in reference:
+            reference[key] = anchor_series
+            aligned.append(frame)
+            continue
+
+        ref_series = reference[key]
+        common = ref_series.index.intersection(anchor_series.index)
+        ref_sum = ref_series.loc[common].sum()
+        new_sum = anchor_series.loc[common].sum()
+        frame = frame[frame['keyword'] != anchor].copy()
+        if ref_sum > 0 and new_sum > 0:
+            # Enteros, como el resto de payloads y las series de utils.trends_incremental
+            frame['interest'] = (frame['interest'] * (ref_sum / new_sum)).round().astype(int)
+        else:
+            logger.warning(f"No se pudo alinear {chunk} con el ancla '{anchor}' en {country_name}, periodo {timeframe}.")
+        aligned.append(frame)
+    return aligned